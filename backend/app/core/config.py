@@ -34,12 +34,103 @@ class Settings(BaseSettings):
     # Gemini LLM settings
     GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY", "")
     GOOGLE_MODEL: str = os.getenv("GOOGLE_MODEL", "gemini-2.0-flash-exp")
+    GEMINI_BASE_URL: str = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com")
+    
+    # OpenRouter LLM settings (optional failover provider)
+    OPENROUTER_API_KEY: str = os.getenv("OPENROUTER_API_KEY", "")
+    OPENROUTER_MODEL: str = os.getenv("OPENROUTER_MODEL", "qwen/qwen3-coder:free")
+    OPENROUTER_BASE_URL: str = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai")
+    
+    # Provider routing (comma-separated preference order; providers without keys are skipped)
+    LLM_PROVIDERS: str = os.getenv("LLM_PROVIDERS", "gemini,openrouter")
+    ROUTER_EWMA_ALPHA: float = float(os.getenv("ROUTER_EWMA_ALPHA", "0.2"))
+    ROUTER_ERROR_PENALTY: float = float(os.getenv("ROUTER_ERROR_PENALTY", "4.0"))
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RECOVERY_TIMEOUT: float = float(os.getenv("CIRCUIT_RECOVERY_TIMEOUT", "30"))
     
     # Request settings
     REQUEST_TIMEOUT: int = int(os.getenv("REQUEST_TIMEOUT", "60"))
     MAX_TOKENS: int = int(os.getenv("MAX_TOKENS", "4000"))
     TEMPERATURE: float = float(os.getenv("TEMPERATURE", "0.7"))
     
+    # Ask providers for bare JSON, constrained to a schema generated from GameSchema
+    STRUCTURED_OUTPUT: bool = os.getenv("STRUCTURED_OUTPUT", "True").lower() == "true"
+    
+    # Retry settings (upstream LLM calls share the REQUEST_TIMEOUT budget)
+    RETRY_MAX_ATTEMPTS: int = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+    RETRY_BASE_DELAY: float = float(os.getenv("RETRY_BASE_DELAY", "0.5"))
+    RETRY_MAX_DELAY: float = float(os.getenv("RETRY_MAX_DELAY", "10"))
+    
+    # Adaptive (AIMD) concurrency limit for upstream LLM calls
+    CONCURRENCY_INITIAL_LIMIT: float = float(os.getenv("CONCURRENCY_INITIAL_LIMIT", "8"))
+    CONCURRENCY_MIN_LIMIT: float = float(os.getenv("CONCURRENCY_MIN_LIMIT", "1"))
+    CONCURRENCY_MAX_LIMIT: float = float(os.getenv("CONCURRENCY_MAX_LIMIT", "64"))
+    CONCURRENCY_DECREASE_FACTOR: float = float(os.getenv("CONCURRENCY_DECREASE_FACTOR", "0.5"))
+    CONCURRENCY_LATENCY_TOLERANCE: float = float(os.getenv("CONCURRENCY_LATENCY_TOLERANCE", "2.0"))
+    
+    # Usage accounting: per-call token counts and cost, persisted periodically
+    USAGE_LEDGER_PATH: str = os.getenv("USAGE_LEDGER_PATH", "cache/usage.json")
+    USAGE_FLUSH_INTERVAL: float = float(os.getenv("USAGE_FLUSH_INTERVAL", "60"))
+    USAGE_PRICES: str = os.getenv("USAGE_PRICES", "")  # JSON: {"model": {"input": .., "cached": .., "output": ..}} USD per 1M tokens
+    
+    # Local game type classifier: untyped prompts it is confident about get a single content template
+    CLASSIFIER_ENABLED: bool = os.getenv("CLASSIFIER_ENABLED", "True").lower() == "true"
+    CLASSIFIER_MIN_CONFIDENCE: float = float(os.getenv("CLASSIFIER_MIN_CONFIDENCE", "0.6"))
+    
+    # Estimated input token budget for the built prompt; optional sections are compacted/dropped to fit (0 = off)
+    PROMPT_TOKEN_BUDGET: int = int(os.getenv("PROMPT_TOKEN_BUDGET", "0"))
+    
+    # Output budgets: maxOutputTokens and attempt timeout from observed sizes per game type/difficulty
+    OUTPUT_BUDGET_ENABLED: bool = os.getenv("OUTPUT_BUDGET_ENABLED", "True").lower() == "true"
+    OUTPUT_BUDGET_WINDOW: int = int(os.getenv("OUTPUT_BUDGET_WINDOW", "200"))
+    OUTPUT_BUDGET_MIN_SAMPLES: int = int(os.getenv("OUTPUT_BUDGET_MIN_SAMPLES", "10"))
+    OUTPUT_BUDGET_PERCENTILE: float = float(os.getenv("OUTPUT_BUDGET_PERCENTILE", "99"))
+    OUTPUT_BUDGET_HEADROOM: float = float(os.getenv("OUTPUT_BUDGET_HEADROOM", "1.3"))
+    OUTPUT_BUDGET_MIN_TOKENS: int = int(os.getenv("OUTPUT_BUDGET_MIN_TOKENS", "1024"))
+    OUTPUT_BUDGET_MAX_TOKENS: int = int(os.getenv("OUTPUT_BUDGET_MAX_TOKENS", "8192"))
+    OUTPUT_BUDGET_TIMEOUT_HEADROOM: float = float(os.getenv("OUTPUT_BUDGET_TIMEOUT_HEADROOM", "1.5"))
+    OUTPUT_BUDGET_MIN_TIMEOUT: float = float(os.getenv("OUTPUT_BUDGET_MIN_TIMEOUT", "10"))
+    
+    # Hedged requests: a second call once the first is slower than HEDGE_PERCENTILE of recent calls
+    HEDGE_ENABLED: bool = os.getenv("HEDGE_ENABLED", "False").lower() == "true"
+    HEDGE_PERCENTILE: float = float(os.getenv("HEDGE_PERCENTILE", "95"))
+    HEDGE_WINDOW: int = int(os.getenv("HEDGE_WINDOW", "200"))
+    HEDGE_MIN_SAMPLES: int = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+    HEDGE_MIN_DELAY: float = float(os.getenv("HEDGE_MIN_DELAY", "1.0"))
+    HEDGE_BUDGET_RATIO: float = float(os.getenv("HEDGE_BUDGET_RATIO", "0.1"))
+    HEDGE_BUDGET_BURST: float = float(os.getenv("HEDGE_BUDGET_BURST", "10"))
+    HEDGE_OTHER_PROVIDER: bool = os.getenv("HEDGE_OTHER_PROVIDER", "True").lower() == "true"
+    
+    # Generated game cache (in-memory LRU in front of an on-disk SQLite store)
+    CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "True").lower() == "true"
+    CACHE_MEMORY_MAX_ENTRIES: int = int(os.getenv("CACHE_MEMORY_MAX_ENTRIES", "512"))
+    CACHE_MEMORY_TTL: int = int(os.getenv("CACHE_MEMORY_TTL", "3600"))
+    CACHE_DISK_TTL: int = int(os.getenv("CACHE_DISK_TTL", "604800"))  # 7 days
+    CACHE_DISK_MAX_ENTRIES: int = int(os.getenv("CACHE_DISK_MAX_ENTRIES", "10000"))
+    CACHE_DB_PATH: str = os.getenv("CACHE_DB_PATH", "cache/games.sqlite3")
+    CACHE_WARM_CONCURRENCY: int = int(os.getenv("CACHE_WARM_CONCURRENCY", "2"))
+    
+    # Batch generation (/generate/batch)
+    BATCH_MAX_PARALLELISM: int = int(os.getenv("BATCH_MAX_PARALLELISM", "4"))
+    
+    # Where the static prompt sections go: system (systemInstruction / system message), prefix (ahead of the
+    # user request in one message) or inline (user request mid-prompt, as before; only without prompt caching)
+    PROMPT_LAYOUT: str = os.getenv("PROMPT_LAYOUT", "system").lower()
+    
+    # Provider-side caching of the static prompt prefix (Gemini cachedContents)
+    PROMPT_CACHE_ENABLED: bool = os.getenv("PROMPT_CACHE_ENABLED", "True").lower() == "true"
+    PROMPT_CACHE_TTL: int = int(os.getenv("PROMPT_CACHE_TTL", "3600"))
+    PROMPT_CACHE_REFRESH_MARGIN: int = int(os.getenv("PROMPT_CACHE_REFRESH_MARGIN", "300"))
+    PROMPT_CACHE_RETRY_INTERVAL: int = int(os.getenv("PROMPT_CACHE_RETRY_INTERVAL", "600"))
+    
+    # Health probing (/health/ready serves the last background snapshot)
+    HEALTH_CHECK_INTERVAL: float = float(os.getenv("HEALTH_CHECK_INTERVAL", "30"))
+    HEALTH_PROBE_TIMEOUT: float = float(os.getenv("HEALTH_PROBE_TIMEOUT", "5"))
+    HEALTH_STALE_AFTER: float = float(os.getenv("HEALTH_STALE_AFTER", "90"))
+    
+    # Admin endpoints (X-Admin-Key header required when set)
+    ADMIN_API_KEY: str = os.getenv("ADMIN_API_KEY", "")
+    
     # Rate limiting
     RATE_LIMIT_REQUESTS: int = int(os.getenv("RATE_LIMIT_REQUESTS", "100"))
     RATE_LIMIT_WINDOW: int = int(os.getenv("RATE_LIMIT_WINDOW", "3600"))  # 1 hour
@@ -8,10 +8,14 @@ from functools import lru_cache
 import logging
 
 from app.core.config import get_settings
+from app.core.health import HealthMonitor
 from app.core.logging_config import get_logger
 from app.services.prompt_builder import PromptBuilder
 from app.services.llm_service import LLMService
 from app.services.response_processor import ResponseProcessor
+from app.services.game_pipeline import GamePipeline
+from app.services.game_cache import GameCache
+from app.services.usage_ledger import UsageLedger
 
 logger = get_logger(__name__)
 
@@ -24,6 +28,7 @@ class ServiceContainer:
         self.logger = logger
         self._services: Dict[str, Any] = {}
         self._initialized = False
+        self.health_monitor: Optional[HealthMonitor] = None
     
     def initialize(self) -> None:
         """Initialize all services"""
@@ -36,10 +41,31 @@ class ServiceContainer:
         self._services['prompt_builder'] = PromptBuilder()
         self._services['llm_service'] = LLMService()
         self._services['response_processor'] = ResponseProcessor()
+        self._services['game_cache'] = GameCache()
+        self._services['usage_ledger'] = UsageLedger.from_settings(self.settings)
+        self._services['game_pipeline'] = GamePipeline(
+            self._services['prompt_builder'],
+            self._services['llm_service'],
+            self._services['response_processor'],
+            self._services['game_cache'],
+            self._services['usage_ledger']
+        )
+        
+        self.health_monitor = HealthMonitor.from_settings(
+            {name: service.health_check for name, service in self._services.items()},
+            self.settings
+        )
         
         self._initialized = True
         self.logger.info("Service container initialized successfully")
     
+    async def start(self) -> None:
+        """Start background work (health probing, usage persistence)"""
+        if not self._initialized:
+            self.initialize()
+        self.health_monitor.start()
+        self._services['usage_ledger'].start()
+    
     def get_prompt_builder(self) -> PromptBuilder:
         """Get PromptBuilder service"""
         if not self._initialized:
@@ -58,45 +84,43 @@ class ServiceContainer:
             self.initialize()
         return self._services['response_processor']
     
-    async def health_check_all(self) -> Dict[str, Any]:
-        """Perform health check on all services"""
+    def get_game_cache(self) -> GameCache:
+        """Get GameCache service"""
         if not self._initialized:
-            return {"status": "unhealthy", "error": "Services not initialized"}
-        
-        health_status = {
-            "status": "healthy",
-            "timestamp": None,
-            "services": {}
-        }
-        
-        try:
-            # Check each service
-            health_status["services"]["prompt_builder"] = self.get_prompt_builder().health_check()
-            health_status["services"]["llm_service"] = await self.get_llm_service().health_check()
-            health_status["services"]["response_processor"] = self.get_response_processor().health_check()
-            
-            # Check if any service is unhealthy
-            for service_name, service_health in health_status["services"].items():
-                if service_health.get("status") != "healthy":
-                    health_status["status"] = "degraded"
-                    
-        except Exception as e:
-            self.logger.error(f"Health check failed: {str(e)}")
-            health_status["status"] = "unhealthy"
-            health_status["error"] = str(e)
-        
-        return health_status
+            self.initialize()
+        return self._services['game_cache']
+    
+    def get_usage_ledger(self) -> UsageLedger:
+        """Get UsageLedger service"""
+        if not self._initialized:
+            self.initialize()
+        return self._services['usage_ledger']
+    
+    def get_game_pipeline(self) -> GamePipeline:
+        """Get GamePipeline service"""
+        if not self._initialized:
+            self.initialize()
+        return self._services['game_pipeline']
+    
+    def health_snapshot(self) -> Dict[str, Any]:
+        """Last background health snapshot, without probing anything"""
+        if not self._initialized:
+            return {"status": "unhealthy", "error": "Services not initialized", "age": None, "stale": True}
+        return self.health_monitor.snapshot()
     
-    def shutdown(self) -> None:
+    async def shutdown(self) -> None:
         """Shutdown all services"""
         self.logger.info("Shutting down service container...")
         
         # Close any async resources
+        if self.health_monitor is not None:
+            await self.health_monitor.stop()
         if 'llm_service' in self._services:
-            llm_service = self._services['llm_service']
-            if hasattr(llm_service, 'client'):
-                # Note: This would need to be handled properly in async context
-                pass
+            await self._services['llm_service'].aclose()
+        if 'game_cache' in self._services:
+            self._services['game_cache'].close()
+        if 'usage_ledger' in self._services:
+            await self._services['usage_ledger'].stop()
         
         self._services.clear()
         self._initialized = False
@@ -0,0 +1,44 @@
+"""
+Per-request deadline budget for GameGPT Backend
+A single Deadline is created per request and shared by every stage and retry
+"""
+
+import time
+from typing import Optional
+
+from app.core.exceptions import GameGPTException, ErrorCode
+
+
+class Deadline:
+    """Monotonic-clock deadline with a fixed time budget"""
+    
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + timeout
+        # Last stage that checked in, for timeout and cancellation reporting
+        self.stage: Optional[str] = None
+    
+    def remaining(self) -> float:
+        """Seconds left in the budget (never negative)"""
+        return max(0.0, self.expires_at - time.monotonic())
+    
+    def elapsed(self) -> float:
+        """Seconds spent since the deadline was created"""
+        return time.monotonic() - self.started_at
+    
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+    
+    def check(self, stage: Optional[str] = None) -> None:
+        """Record the current stage and raise a timeout error if the budget has been spent"""
+        if stage is not None:
+            self.stage = stage
+        if self.expired:
+            raise GameGPTException(
+                message="Request deadline exceeded",
+                error_code=ErrorCode.TIMEOUT_ERROR,
+                details={"stage": stage, "timeout": self.timeout},
+                status_code=504
+            )
@@ -0,0 +1,67 @@
+"""
+Client disconnect handling for GameGPT Backend
+Cancels in-flight request work (upstream LLM calls included) once the
+client that asked for it has gone away
+"""
+
+import asyncio
+from typing import Awaitable, Optional, TypeVar
+
+from fastapi import HTTPException, Request
+
+from app.core.deadline import Deadline
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# nginx's "client closed request"; never actually seen by the client
+CLIENT_CLOSED_REQUEST = 499
+
+
+class ClientDisconnected(HTTPException):
+    """Raised when request work was cancelled because the client disconnected"""
+
+    def __init__(self, stage: Optional[str] = None):
+        super().__init__(status_code=CLIENT_CLOSED_REQUEST, detail={"message": "Client closed request", "stage": stage})
+        self.stage = stage
+
+
+def record_cancelled(endpoint: str, deadline: Optional[Deadline] = None) -> None:
+    """Count work abandoned because nobody is waiting for it any more"""
+    stage = (deadline.stage if deadline else None) or "unknown"
+    get_metrics().increment("requests.cancelled", endpoint=endpoint, stage=stage)
+    logger.info(f"Client disconnected from {endpoint} during {stage}; cancelled in-flight work")
+
+
+async def cancel_on_disconnect(
+    request: Request,
+    work: Awaitable[T],
+    endpoint: str,
+    deadline: Optional[Deadline] = None,
+    poll_interval: float = 0.25
+) -> T:
+    """
+    Await work while polling the client connection
+    On disconnect the work is cancelled (closing any upstream HTTP call) and
+    ClientDisconnected is raised instead of returning a result nobody reads
+    """
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+                record_cancelled(endpoint, deadline)
+                raise ClientDisconnected(deadline.stage if deadline else None)
+    finally:
+        if not task.done():
+            task.cancel()
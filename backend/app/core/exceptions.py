@@ -32,6 +32,9 @@ class ErrorCode(Enum):
     GEMINI_API_ERROR = "GEMINI_API_ERROR"
     GEMINI_RATE_LIMIT = "GEMINI_RATE_LIMIT"
     GEMINI_QUOTA_EXCEEDED = "GEMINI_QUOTA_EXCEEDED"
+    OPENROUTER_API_ERROR = "OPENROUTER_API_ERROR"
+    OPENROUTER_RATE_LIMIT = "OPENROUTER_RATE_LIMIT"
+    PROVIDERS_UNAVAILABLE = "PROVIDERS_UNAVAILABLE"
     
     # System Errors
     INTERNAL_ERROR = "INTERNAL_ERROR"
@@ -260,7 +263,7 @@ def handle_external_service_error(
         "error_type": type(error).__name__
     })
     
-    if isinstance(error, ExternalServiceException):
+    if isinstance(error, GameGPTException):
         return create_error_response(
             error_code=error.error_code,
             message=error.message,
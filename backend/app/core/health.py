@@ -0,0 +1,120 @@
+"""
+Health Monitor
+Probes every service concurrently in the background and serves the last
+snapshot, so health endpoints never wait on (or spend quota with) upstreams
+"""
+
+import asyncio
+import inspect
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+
+logger = get_logger(__name__)
+
+Probe = Callable[[], Union[Dict[str, Any], Awaitable[Dict[str, Any]]]]
+
+# Worst status wins when combining service results
+_SEVERITY = {"healthy": 0, "degraded": 1, "unhealthy": 2}
+
+
+class HealthMonitor:
+    """Runs health probes on an interval and caches the combined result"""
+
+    def __init__(
+        self,
+        probes: Dict[str, Probe],
+        interval: float = 30.0,
+        probe_timeout: float = 5.0,
+        stale_after: float = 90.0
+    ):
+        self.probes = probes
+        self.interval = interval
+        self.probe_timeout = probe_timeout
+        self.stale_after = stale_after
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._checked_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self.logger = logger
+        self.metrics = get_metrics()
+
+    @classmethod
+    def from_settings(cls, probes: Dict[str, Probe], settings: Any) -> "HealthMonitor":
+        return cls(
+            probes,
+            interval=settings.HEALTH_CHECK_INTERVAL,
+            probe_timeout=settings.HEALTH_PROBE_TIMEOUT,
+            stale_after=settings.HEALTH_STALE_AFTER
+        )
+
+    async def _probe(self, name: str, probe: Probe) -> Dict[str, Any]:
+        started = time.monotonic()
+        try:
+            result = probe()
+            if inspect.isawaitable(result):
+                result = await asyncio.wait_for(result, self.probe_timeout)
+        except asyncio.TimeoutError:
+            result = {"status": "unhealthy", "error": f"Health probe timed out after {self.probe_timeout}s"}
+        except Exception as e:
+            self.logger.error(f"Health probe {name} failed: {str(e)}")
+            result = {"status": "unhealthy", "error": str(e)}
+        duration = time.monotonic() - started
+        self.metrics.observe("health.probe_duration", duration, service=name)
+        return {**result, "probe_duration": round(duration, 4)}
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Probe every service concurrently and store the combined snapshot"""
+        names = list(self.probes)
+        results = await asyncio.gather(*(self._probe(name, self.probes[name]) for name in names))
+        services = dict(zip(names, results))
+
+        status = "healthy"
+        for result in services.values():
+            service_status = result.get("status", "unhealthy")
+            if _SEVERITY.get(service_status, 2) > _SEVERITY[status]:
+                status = service_status if service_status in _SEVERITY else "unhealthy"
+
+        self._checked_at = time.monotonic()
+        self._snapshot = {
+            "status": status,
+            "timestamp": datetime.now().isoformat(),
+            "services": services,
+        }
+        self.metrics.set_gauge("health.status", _SEVERITY[status])
+        return self._snapshot
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Last stored snapshot with its age in seconds (no probing)"""
+        if self._snapshot is None:
+            return {"status": "unknown", "age": None, "stale": True, "services": {}}
+        age = time.monotonic() - self._checked_at
+        return {**self._snapshot, "age": round(age, 3), "stale": age > self.stale_after}
+
+    def is_ready(self) -> bool:
+        snapshot = self.snapshot()
+        return not snapshot["stale"] and snapshot["status"] != "unhealthy"
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.logger.error(f"Health refresh failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start refreshing in the background (first probe runs immediately)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,98 @@
+"""
+In-process metrics registry for GameGPT Backend
+Lightweight counters, gauges and rolling histograms exposed on /stats
+"""
+
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Any, Deque, Tuple
+
+
+def _metric_key(name: str, labels: Dict[str, Any]) -> str:
+    """Render a metric name with sorted labels, e.g. llm.retries{reason=429}"""
+    if not labels:
+        return name
+    rendered = ",".join(f"{key}={labels[key]}" for key in sorted(labels))
+    return f"{name}{{{rendered}}}"
+
+
+def percentile(samples, pct: float) -> float:
+    """Nearest-rank percentile of a sequence of numbers (0.0 when empty)"""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return float(ordered[rank])
+
+
+class MetricsRegistry:
+    """Thread-safe registry of counters, gauges and rolling histograms"""
+    
+    HISTOGRAM_WINDOW = 1024
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._histograms: Dict[str, Tuple[Deque[float], list]] = {}
+    
+    def increment(self, name: str, value: float = 1, **labels: Any) -> None:
+        """Increment a counter"""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+    
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """Set a gauge to an absolute value"""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+    
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Record a sample in a rolling histogram"""
+        key = _metric_key(name, labels)
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = (deque(maxlen=self.HISTOGRAM_WINDOW), [0, 0.0])
+            samples, totals = self._histograms[key]
+            samples.append(value)
+            totals[0] += 1
+            totals[1] += value
+    
+    def get_counter(self, name: str, **labels: Any) -> float:
+        """Read the current value of a counter"""
+        with self._lock:
+            return self._counters.get(_metric_key(name, labels), 0)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-serialisable view of every metric"""
+        with self._lock:
+            histograms = {}
+            for key, (samples, (count, total)) in self._histograms.items():
+                window = list(samples)
+                histograms[key] = {
+                    "count": count,
+                    "mean": round(total / count, 6) if count else 0.0,
+                    "p50": percentile(window, 50),
+                    "p95": percentile(window, 95),
+                    "p99": percentile(window, 99),
+                }
+            return {
+                "counters": dict(sorted(self._counters.items())),
+                "gauges": dict(sorted(self._gauges.items())),
+                "histograms": dict(sorted(histograms.items())),
+            }
+    
+    def reset(self) -> None:
+        """Clear all metrics"""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+@lru_cache()
+def get_metrics() -> MetricsRegistry:
+    """Get the global metrics registry"""
+    return MetricsRegistry()
@@ -0,0 +1,141 @@
+"""
+Retry policy for upstream LLM calls
+Exponential backoff with decorrelated jitter, Retry-After support
+and a shared per-request deadline budget
+"""
+
+import asyncio
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from app.core.deadline import Deadline
+from app.core.exceptions import GameGPTException, ErrorCode
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Upstream HTTP statuses that indicate a transient condition
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After value into seconds
+    Accepts delta-seconds ("12"), Google duration strings ("12.5s") and HTTP-dates
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value[:-1] if value.endswith("s") else value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def retry_reason(error: Exception) -> Optional[str]:
+    """
+    Classify an error for retrying
+    Returns a short reason label when the error is transient, otherwise None
+    """
+    if not isinstance(error, GameGPTException):
+        return None
+
+    status_code = error.details.get("external_status_code")
+    if status_code in RETRYABLE_STATUS_CODES:
+        return "rate_limit" if status_code == 429 else f"http_{status_code}"
+    if error.error_code == ErrorCode.TIMEOUT_ERROR:
+        return "timeout"
+    if error.details.get("operation") == "connection":
+        return "connection"
+    return None
+
+
+class RetryPolicy:
+    """Retries transient upstream failures within a deadline budget"""
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 10.0,
+        rng: Optional[random.Random] = None
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng or random.Random()
+        self.logger = logger
+        self.metrics = get_metrics()
+
+    @classmethod
+    def from_settings(cls, settings: Any) -> "RetryPolicy":
+        return cls(
+            max_attempts=settings.RETRY_MAX_ATTEMPTS,
+            base_delay=settings.RETRY_BASE_DELAY,
+            max_delay=settings.RETRY_MAX_DELAY
+        )
+
+    def next_delay(self, previous_delay: float) -> float:
+        """Decorrelated jitter: sleep = min(cap, uniform(base, previous * 3))"""
+        upper = max(self.base_delay, previous_delay * 3)
+        return min(self.max_delay, self.rng.uniform(self.base_delay, upper))
+
+    async def run(
+        self,
+        operation: Callable[[float], Awaitable[T]],
+        deadline: Deadline,
+        name: str = "llm"
+    ) -> T:
+        """
+        Run operation(timeout) until it succeeds, fails permanently,
+        runs out of attempts or the deadline can no longer fit a retry
+        """
+        delay = self.base_delay
+        attempt = 0
+
+        while True:
+            attempt += 1
+            deadline.check(stage=name)
+            self.metrics.increment("retry.attempts", operation=name)
+
+            try:
+                return await operation(deadline.remaining())
+            except Exception as error:
+                reason = retry_reason(error)
+                if reason is None:
+                    raise
+
+                if attempt >= self.max_attempts:
+                    self.metrics.increment("retry.exhausted", operation=name, reason=reason)
+                    self.logger.warning(f"{name}: giving up after {attempt} attempts ({reason})")
+                    raise
+
+                delay = self.next_delay(delay)
+                details: Dict[str, Any] = getattr(error, "details", {})
+                retry_after = details.get("retry_after")
+                if isinstance(retry_after, (int, float)):
+                    delay = max(delay, float(retry_after))
+
+                if delay >= deadline.remaining():
+                    self.metrics.increment("retry.budget_exhausted", operation=name, reason=reason)
+                    self.logger.warning(
+                        f"{name}: not retrying {reason}, backoff {delay:.2f}s exceeds remaining budget "
+                        f"{deadline.remaining():.2f}s"
+                    )
+                    raise
+
+                self.metrics.increment("retry.retries", operation=name, reason=reason)
+                self.logger.info(f"{name}: attempt {attempt} failed ({reason}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
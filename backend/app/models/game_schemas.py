@@ -3,14 +3,28 @@ Pydantic models for GameGPT Backend
 Defines the data structures for API requests and responses
 """
 
-from typing import List, Dict, Any, Optional, Union, Literal
-from pydantic import BaseModel, Field
+from typing import Annotated, List, Dict, Any, Optional, Union, Literal, Type, get_args, get_origin
+from typing_extensions import NotRequired, TypedDict
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, ValidationInfo, field_validator
 from datetime import datetime
 
 
 class GameGenerationRequest(BaseModel):
     """Request model for game generation - equivalent to n8n webhook input"""
     prompt: str = Field(..., description="User's game request prompt", min_length=1, max_length=2000)
+    gameType: Optional[Literal[
+        "quiz",
+        "drag-drop",
+        "memory-match",
+        "word-puzzle",
+        "sorting",
+        "matching",
+        "story-sequence",
+        "fill-blank",
+        "card-flip",
+        "puzzle-assembly",
+        "anxiety-adventure"
+    ]] = Field(None, description="Game type to generate; chosen by the model when omitted")
     
     class Config:
         json_schema_extra = {
@@ -20,6 +34,21 @@ class GameGenerationRequest(BaseModel):
         }
 
 
+class BatchGenerationRequest(BaseModel):
+    """Several game generation requests handled in one call"""
+    items: List[GameGenerationRequest] = Field(..., description="Games to generate", min_length=1, max_length=100)
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {"prompt": "A quiz about recognizing and managing stress for teens"},
+                    {"prompt": "A matching game pairing emotions with coping strategies"}
+                ]
+            }
+        }
+
+
 class GameConfig(BaseModel):
     """Game configuration settings"""
     maxAttempts: Optional[int] = Field(None, ge=1, le=5)
@@ -233,7 +262,11 @@ class PuzzlePiece(BaseModel):
     """Puzzle piece model"""
     id: str
     image: str
-    correctPosition: Dict[str, int]  # {"x": 0, "y": 0}
+    # Listed keys give the map a shape response schemas can express
+    correctPosition: Dict[str, int] = Field(..., json_schema_extra={
+        "properties": {"x": {"type": "integer"}, "y": {"type": "integer"}},
+        "required": ["x", "y"],
+    })
 
 
 class PuzzleAssemblyContent(BaseModel):
@@ -286,6 +319,64 @@ GameContent = Union[
     AnxietyAdventureContent
 ]
 
+# Content model for each game type (GameSchema.content is validated against these)
+CONTENT_MODELS: Dict[str, Type[BaseModel]] = {
+    "quiz": QuizContent,
+    "drag-drop": DragDropContent,
+    "memory-match": MemoryMatchContent,
+    "word-puzzle": WordPuzzleContent,
+    "sorting": SortingContent,
+    "matching": MatchingContent,
+    "story-sequence": StorySequenceContent,
+    "fill-blank": FillBlankContent,
+    "card-flip": CardFlipContent,
+    "puzzle-assembly": PuzzleAssemblyContent,
+    "anxiety-adventure": AnxietyAdventureContent,
+}
+
+
+def _validation_type(annotation: Any) -> Any:
+    """
+    annotation with every content model in it swapped for a TypedDict of the
+    same fields and constraints: pydantic-core checks those as dicts without
+    building model instances, which is most of the cost of validating a game
+    """
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _typed_dict(annotation)
+    origin, args = get_origin(annotation), get_args(annotation)
+    if origin is Literal or not args:
+        return annotation
+    if origin is Union:
+        return Union[tuple(_validation_type(arg) for arg in args)]
+    if origin is list:
+        return List[_validation_type(args[0])]
+    if origin is dict:
+        return Dict[args[0], _validation_type(args[1])]
+    return annotation
+
+
+def _typed_dict(model: Type[BaseModel]) -> Any:
+    fields = {}
+    for name, field in model.model_fields.items():
+        annotation = _validation_type(field.annotation)
+        if field.metadata:
+            annotation = Annotated[(annotation, *field.metadata)]
+        fields[name] = annotation if field.is_required() else NotRequired[annotation]
+    return TypedDict(model.__name__, fields)
+
+
+# The content of every game type as one union discriminated on the game's
+# "type", compiled once: validating a game's content is a single pass through
+# the content model its type selects
+TypedContent = Annotated[
+    Union[tuple(
+        TypedDict(f"Typed{model.__name__}", {"type": Literal[game_type], "content": _typed_dict(model)})
+        for game_type, model in CONTENT_MODELS.items()
+    )],
+    Field(discriminator="type")
+]
+TYPED_CONTENT = TypeAdapter(TypedContent)
+
 
 class GameSchema(BaseModel):
     """Main game schema model - equivalent to n8n workflow output"""
@@ -320,13 +411,29 @@ class GameSchema(BaseModel):
     ]
     estimatedTime: int = Field(..., ge=5, le=30)
     config: GameConfig
-    content: Dict[str, Any]  # Will be validated based on game type
+    content: Dict[str, Any]  # Validated against the content model of the game type, kept as sent
     scoring: ScoringConfig
     ui: UIConfig
     generatedAt: str = Field(default_factory=lambda: datetime.now().isoformat())
     version: str = "1.0"
     theme: str
     
+    @field_validator("content")
+    @classmethod
+    def validate_content(cls, content: Dict[str, Any], info: ValidationInfo) -> Dict[str, Any]:
+        """Check content against the model for the game type (an invalid type is reported on its own)"""
+        if "type" not in info.data:
+            return content
+        try:
+            TYPED_CONTENT.validate_python({"type": info.data["type"], "content": content})
+        except ValidationError as e:
+            # Locations start with the tag and "content"; keep the path inside content
+            raise ValueError("; ".join(
+                f"{'.'.join(str(part) for part in error['loc'][2:]) or 'content'}: {error['msg']}"
+                for error in e.errors()
+            ))
+        return content
+    
     class Config:
         json_schema_extra = {
             "example": {
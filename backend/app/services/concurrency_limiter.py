@@ -0,0 +1,178 @@
+"""
+Adaptive Concurrency Limiter
+AIMD (additive increase, multiplicative decrease) limit on concurrent
+upstream LLM calls, with a FIFO queue for callers waiting on a slot
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from app.core.deadline import Deadline
+from app.core.exceptions import GameGPTException, ErrorCode
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+from app.core.retry import retry_reason
+
+logger = get_logger(__name__)
+
+# Failures that mean "we are sending too much": shrink the limit
+OVERLOAD_REASONS = {"rate_limit", "timeout"}
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limits in-flight upstream calls and adapts the limit to upstream health
+
+    - Success with latency within LATENCY_TOLERANCE x the baseline grows the
+      limit by about one slot per limit's worth of completions
+    - 429s and timeouts cut the limit multiplicatively (at most once per
+      baseline-latency window, so one burst is only punished once)
+    - Callers beyond the limit wait in FIFO order
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = 8,
+        min_limit: float = 1,
+        max_limit: float = 64,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+        name: str = "llm"
+    ):
+        self.min_limit = max(1.0, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(self.max_limit, max(self.min_limit, initial_limit))
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.name = name
+        self.in_flight = 0
+        self.baseline_latency: Optional[float] = None
+        self._last_decrease = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.logger = logger
+        self.metrics = get_metrics()
+
+    @classmethod
+    def from_settings(cls, settings: Any) -> "AdaptiveConcurrencyLimiter":
+        return cls(
+            initial_limit=settings.CONCURRENCY_INITIAL_LIMIT,
+            min_limit=settings.CONCURRENCY_MIN_LIMIT,
+            max_limit=settings.CONCURRENCY_MAX_LIMIT,
+            decrease_factor=settings.CONCURRENCY_DECREASE_FACTOR,
+            latency_tolerance=settings.CONCURRENCY_LATENCY_TOLERANCE
+        )
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "baseline_latency": self.baseline_latency,
+        }
+
+    def _publish(self) -> None:
+        self.metrics.set_gauge("limiter.limit", round(self.limit, 2), limiter=self.name)
+        self.metrics.set_gauge("limiter.in_flight", self.in_flight, limiter=self.name)
+        self.metrics.set_gauge("limiter.queued", self.queued, limiter=self.name)
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    async def acquire(self, timeout: Optional[float] = None) -> None:
+        """Wait for a slot (FIFO); raises a timeout error if none frees up in time"""
+        if self._has_capacity() and not self._waiters:
+            self.in_flight += 1
+            self._publish()
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._publish()
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as error:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up: pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+                self._publish()
+            if isinstance(error, asyncio.TimeoutError):
+                self.metrics.increment("limiter.queue_timeouts", limiter=self.name)
+                raise GameGPTException(
+                    message="Timed out waiting for an upstream LLM slot",
+                    error_code=ErrorCode.TIMEOUT_ERROR,
+                    details={"stage": "queue", "limit": int(self.limit), "queued": self.queued},
+                    status_code=504
+                )
+            raise
+        finally:
+            self.metrics.observe("limiter.queue_wait", time.monotonic() - started, limiter=self.name)
+
+    def release(self) -> None:
+        """Free a slot and hand it to the next queued caller"""
+        self.in_flight = max(0, self.in_flight - 1)
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+        self._publish()
+
+    def on_success(self, latency: float) -> None:
+        """Additive increase while latency holds near the baseline"""
+        if self.baseline_latency is None:
+            self.baseline_latency = latency
+        else:
+            self.baseline_latency = 0.9 * self.baseline_latency + 0.1 * latency
+
+        within_tolerance = latency <= self.baseline_latency * self.latency_tolerance
+        # Only grow when the limit is actually being used
+        if within_tolerance and self.in_flight + 1 >= self.limit / 2:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        self._wake()
+
+    def on_overload(self) -> None:
+        """Multiplicative decrease on throttling or timeouts"""
+        now = time.monotonic()
+        window = self.baseline_latency or 1.0
+        if now - self._last_decrease < window:
+            return
+        self._last_decrease = now
+        previous = self.limit
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        self.metrics.increment("limiter.decreases", limiter=self.name)
+        self.logger.warning(f"{self.name} concurrency limit cut from {previous:.1f} to {self.limit:.1f}")
+        self._publish()
+
+    @asynccontextmanager
+    async def slot(self, deadline: Optional[Deadline] = None) -> AsyncIterator[None]:
+        """Hold a slot for the duration of an upstream call and feed its outcome back"""
+        await self.acquire(deadline.remaining() if deadline else None)
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as error:
+            if retry_reason(error) in OVERLOAD_REASONS:
+                self.on_overload()
+            raise
+        else:
+            self.on_success(time.monotonic() - started)
+        finally:
+            self.release()
@@ -0,0 +1,333 @@
+"""
+Generated Game Cache
+Two tiers: a bounded in-memory LRU with TTL in front of a persistent
+SQLite store that survives restarts
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+from app.models.game_schemas import GameSchema
+
+logger = get_logger(__name__)
+
+
+class MemoryLRUCache:
+    """Bounded LRU cache with a per-entry time-to-live"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + (ttl if ttl is not None else self.ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._entries.keys())
+
+
+class SQLiteGameStore:
+    """
+    Persistent game cache tier backed by a single SQLite file
+    Expired rows are purged, and the oldest rows beyond max_entries deleted,
+    on open and every `prune_every` writes, so the table may run up to
+    prune_every - 1 rows over the limit between prunes
+    """
+
+    def __init__(self, path: str, ttl: float, max_entries: int = 10000, prune_every: int = 100):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.prune_every = max(1, prune_every)
+        self._writes = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS game_cache (
+                key TEXT PRIMARY KEY,
+                prompt TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS game_cache_created_at ON game_cache (created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS game_cache_expires_at ON game_cache (expires_at)")
+        self._conn.commit()
+        self.prune()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires_at FROM game_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            payload, expires_at = row
+            if expires_at <= time.time():
+                self._conn.execute("DELETE FROM game_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE game_cache SET hits = hits + 1 WHERE key = ?", (key,))
+            self._conn.commit()
+        return json.loads(payload)
+
+    def set(self, key: str, prompt: str, value: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO game_cache (key, prompt, payload, created_at, expires_at, hits)
+                VALUES (?, ?, ?, ?, ?, 0)
+                """,
+                (key, prompt, json.dumps(value), now, now + self.ttl)
+            )
+            self._conn.commit()
+            self._writes += 1
+            due = self._writes % self.prune_every == 0
+        if due:
+            self.prune()
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM game_cache WHERE key = ?", (key,))
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def clear(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM game_cache")
+            self._conn.commit()
+            return cursor.rowcount
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM game_cache WHERE expires_at <= ?", (time.time(),))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def trim(self) -> int:
+        """Delete the oldest rows beyond max_entries"""
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                DELETE FROM game_cache WHERE key IN (
+                    SELECT key FROM game_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def prune(self) -> int:
+        """Purge expired rows, then trim to max_entries; returns the rows removed"""
+        removed = self.purge_expired() + self.trim()
+        if removed:
+            logger.info(f"Pruned {removed} rows from the disk game cache")
+        return removed
+
+    def entries(self, limit: int = 100) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT key, prompt, created_at, expires_at, hits, length(payload)
+                FROM game_cache ORDER BY created_at DESC LIMIT ?
+                """,
+                (limit,)
+            ).fetchall()
+        return [
+            {
+                "key": key,
+                "prompt": prompt,
+                "created_at": created_at,
+                "expires_at": expires_at,
+                "hits": hits,
+                "size_bytes": size,
+            }
+            for key, prompt, created_at, expires_at, hits, size in rows
+        ]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM game_cache").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class GameCache:
+    """Memory-then-disk cache of validated GameSchema payloads"""
+
+    def __init__(self, settings: Any = None):
+        self.settings = settings or get_settings()
+        self.logger = logger
+        self.metrics = get_metrics()
+        self.enabled = self.settings.CACHE_ENABLED
+        self.memory = MemoryLRUCache(self.settings.CACHE_MEMORY_MAX_ENTRIES, self.settings.CACHE_MEMORY_TTL)
+        self.disk: Optional[SQLiteGameStore] = None
+        if self.enabled and self.settings.CACHE_DB_PATH:
+            try:
+                self.disk = SQLiteGameStore(
+                    self.settings.CACHE_DB_PATH, self.settings.CACHE_DISK_TTL, self.settings.CACHE_DISK_MAX_ENTRIES
+                )
+            except (sqlite3.Error, OSError) as e:
+                self.logger.error(f"Disk cache unavailable, using memory tier only: {str(e)}")
+        self._hits = 0
+        self._lookups = 0
+
+    def health_check(self) -> Dict[str, Any]:
+        """Health check for the game cache"""
+        return {
+            "status": "healthy",
+            "service": "game_cache",
+            "enabled": self.enabled,
+            "disk": self.disk is not None
+        }
+
+    def _record(self, tier: Optional[str]) -> None:
+        self._lookups += 1
+        if tier is None:
+            self.metrics.increment("cache.misses")
+        else:
+            self._hits += 1
+            self.metrics.increment("cache.hits", tier=tier)
+        self.metrics.set_gauge("cache.hit_ratio", round(self._hits / self._lookups, 4))
+
+    async def get(self, key: str) -> Optional[GameSchema]:
+        """Look up a game, promoting disk hits into memory"""
+        if not self.enabled:
+            return None
+
+        payload = self.memory.get(key)
+        if payload is not None:
+            self._record("memory")
+            return GameSchema(**payload)
+
+        if self.disk is not None:
+            payload = await asyncio.to_thread(self.disk.get, key)
+            if payload is not None:
+                try:
+                    game = GameSchema(**payload)
+                except ValueError as e:
+                    # Stored before a stricter schema; regenerate rather than fail the request
+                    self.logger.warning(f"Dropping cached game that no longer validates: {str(e)[:200]}")
+                    await asyncio.to_thread(self.disk.delete, key)
+                else:
+                    self.memory.set(key, payload)
+                    self._record("disk")
+                    return game
+
+        self._record(None)
+        return None
+
+    async def set(self, key: str, prompt: str, game: GameSchema) -> None:
+        """Store a validated game in both tiers"""
+        if not self.enabled:
+            return
+        payload = game.dict()
+        self.memory.set(key, payload)
+        self.metrics.set_gauge("cache.memory_entries", len(self.memory))
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, prompt, payload)
+
+    async def delete(self, key: str) -> bool:
+        """Evict one entry from both tiers"""
+        removed = self.memory.delete(key)
+        if self.disk is not None:
+            removed = await asyncio.to_thread(self.disk.delete, key) or removed
+        self.metrics.set_gauge("cache.memory_entries", len(self.memory))
+        return removed
+
+    async def clear(self) -> int:
+        """Evict every entry from both tiers"""
+        removed = len(self.memory)
+        self.memory.clear()
+        if self.disk is not None:
+            removed = max(removed, await asyncio.to_thread(self.disk.clear))
+        self.metrics.set_gauge("cache.memory_entries", 0)
+        return removed
+
+    async def inspect(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached payload without counting it as a lookup"""
+        payload = self.memory.get(key)
+        if payload is None and self.disk is not None:
+            payload = await asyncio.to_thread(self.disk.get, key)
+        return payload
+
+    async def stats(self, limit: int = 100) -> Dict[str, Any]:
+        """Summary of both tiers plus the most recent disk entries"""
+        disk_entries: List[Dict[str, Any]] = []
+        disk_count = 0
+        if self.disk is not None:
+            disk_count = await asyncio.to_thread(self.disk.count)
+            disk_entries = await asyncio.to_thread(self.disk.entries, limit)
+        return {
+            "enabled": self.enabled,
+            "hit_ratio": round(self._hits / self._lookups, 4) if self._lookups else 0.0,
+            "lookups": self._lookups,
+            "hits": self._hits,
+            "memory": {
+                "entries": len(self.memory),
+                "max_entries": self.memory.max_entries,
+                "ttl": self.memory.ttl,
+                "keys": self.memory.keys()[-limit:],
+            },
+            "disk": {
+                "path": self.disk.path if self.disk else None,
+                "entries": disk_count,
+                "max_entries": self.disk.max_entries if self.disk else None,
+                "ttl": self.disk.ttl if self.disk else None,
+                "recent": disk_entries,
+            },
+        }
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
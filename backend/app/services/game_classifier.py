@@ -0,0 +1,171 @@
+"""
+Game Classifier
+Fast local guess of the game type and therapeutic category a prompt asks
+for, so an untyped request can be sent with a single content template
+instead of all of them
+"""
+
+import math
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+
+logger = get_logger(__name__)
+
+# Words and phrases that point at each game type; hyphens read as spaces
+GAME_TYPE_KEYWORDS: Dict[str, List[str]] = {
+    "quiz": ["quiz", "test", "trivia", "question", "multiple choice", "true false", "knowledge",
+             "assess", "check understanding", "exam question"],
+    "drag-drop": ["drag drop", "drag", "drop", "place", "put into", "bucket", "zone", "target", "move"],
+    "memory-match": ["memory", "memory game", "remember", "concentration", "recall", "matching pair",
+                     "pair", "match", "flip pair"],
+    "word-puzzle": ["word search", "crossword", "word", "anagram", "scramble", "letter", "vocabulary",
+                    "spell", "puzzle", "hidden word"],
+    "sorting": ["sort", "categorise", "categorize", "category", "classify", "group", "organise",
+                "organize", "separate", "into fact"],
+    "matching": ["match", "pair", "connect", "link", "left right", "corresponding", "with their",
+                 "alternative", "fit"],
+    "story-sequence": ["story", "sequence", "order", "step", "in order", "timeline", "narrative",
+                       "arrange", "put the step", "routine"],
+    "fill-blank": ["fill in", "fill blank", "blank", "complete", "complete sentence", "missing word",
+                   "cloze", "sentence", "statement"],
+    "card-flip": ["flashcard", "flash card", "flip", "flip card", "card", "front", "back", "prompt card"],
+    "puzzle-assembly": ["jigsaw", "assemble", "puzzle piece", "puzzle", "picture", "image", "reveal",
+                        "piece", "visual"],
+    "anxiety-adventure": ["adventure", "choose your own", "scenario", "quest", "journey", "role play",
+                          "explore", "decision", "choice", "handling"],
+}
+
+CATEGORY_KEYWORDS: Dict[str, List[str]] = {
+    "mental-wellness": ["wellness", "wellbeing", "well being", "mental health", "happiness", "positive",
+                        "resilience", "healthy"],
+    "coping-skills": ["coping", "cope", "coping strategy", "coping skill", "strategy", "skill", "manage",
+                      "handle"],
+    "emotional-intelligence": ["emotion", "feeling", "empathy", "facial expression", "expression",
+                               "recognise", "recognize", "identify"],
+    "mindfulness": ["mindfulness", "mindful", "present moment", "meditation", "breathing", "breath",
+                    "grounding", "awareness", "calm", "calming", "visualisation", "visualization"],
+    "anxiety-management": ["anxiety", "anxious", "worry", "panic", "nervous", "fear", "social anxiety"],
+    "depression-support": ["depression", "depressed", "sad", "sadness", "low mood", "hopeless",
+                           "motivation", "lonely"],
+    "stress-reduction": ["stress", "stressful", "relax", "relaxation", "tension", "burnout", "exam stress",
+                         "pressure"],
+    "self-care": ["self care", "routine", "sleep", "bedtime", "gratitude", "hygiene", "rest", "daily"],
+    "cognitive-behavioral": ["cognitive", "cbt", "thought", "distortion", "reframe", "behavioural",
+                             "behavioral", "belief", "self talk", "balanced"],
+    "interpersonal-skills": ["social", "friend", "communication", "conflict", "argument", "relationship",
+                             "listening", "assertive", "party", "presentation"],
+}
+
+_WORD = re.compile(r"[a-z]+")
+
+
+def _stem(word: str) -> str:
+    """Crude suffix stripping so plurals and -ing forms meet their keyword"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 5 and word.endswith("ing"):
+        return word[:-3]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def _words(text: str) -> List[str]:
+    return [_stem(word) for word in _WORD.findall(text.lower().replace("-", " "))]
+
+
+def terms(text: str) -> List[str]:
+    """Stemmed one to three word phrases of the text"""
+    words = _words(text)
+    return [" ".join(words[start:start + size]) for size in (1, 2, 3) for start in range(len(words) - size + 1)]
+
+
+class KeywordClassifier:
+    """
+    TF-IDF weighted keyword match against one keyword document per label
+
+    A label scores the summed IDF of the distinct prompt terms in its
+    document, so words shared by many labels count for little. Confidence is
+    the top label's share of all scores plus `smoothing`, scaled down when
+    the label matched fewer than `min_hits` distinct terms: one keyword ("sort
+    out their feelings", "before a test") is not enough on its own
+    """
+
+    def __init__(self, keywords: Dict[str, List[str]], smoothing: float = 1.5, min_hits: int = 2):
+        self.smoothing = smoothing
+        self.min_hits = min_hits
+        self.documents = {label: {" ".join(_words(phrase)) for phrase in phrases}
+                          for label, phrases in keywords.items()}
+        labels = len(self.documents)
+        self.idf = {
+            term: math.log((1 + labels) / (1 + sum(term in document for document in self.documents.values()))) + 1
+            for document in self.documents.values() for term in document
+        }
+
+    def scores(self, text: str) -> Dict[str, float]:
+        return self._scores(set(terms(text)))
+
+    def _scores(self, query: Set[str]) -> Dict[str, float]:
+        return {label: sum(self.idf[term] for term in query & document) for label, document in self.documents.items()}
+
+    def predict(self, text: str) -> Tuple[Optional[str], float]:
+        """Best label and its confidence (0 when nothing matched)"""
+        query = set(terms(text))
+        scores = self._scores(query)
+        label, best = max(scores.items(), key=lambda item: item[1])
+        if best <= 0:
+            return None, 0.0
+        hits = len(query & self.documents[label])
+        return label, best / (sum(scores.values()) + self.smoothing) * min(1.0, hits / self.min_hits)
+
+
+class Classification(BaseModel):
+    """Predicted game type and category for a prompt"""
+    game_type: Optional[str] = None
+    type_confidence: float = 0.0
+    category: Optional[str] = None
+    category_confidence: float = 0.0
+    confident: bool = False
+
+
+class GameClassifier:
+    """Predicts the game type and therapeutic category of a prompt, CPU only"""
+
+    def __init__(self, enabled: bool = True, min_confidence: float = 0.6):
+        self.enabled = enabled
+        self.min_confidence = min_confidence
+        self.types = KeywordClassifier(GAME_TYPE_KEYWORDS)
+        self.categories = KeywordClassifier(CATEGORY_KEYWORDS)
+        self.logger = logger
+        self.metrics = get_metrics()
+
+    @classmethod
+    def from_settings(cls, settings: Any) -> "GameClassifier":
+        return cls(enabled=settings.CLASSIFIER_ENABLED, min_confidence=settings.CLASSIFIER_MIN_CONFIDENCE)
+
+    def classify(self, prompt: str) -> Classification:
+        game_type, type_confidence = self.types.predict(prompt)
+        category, category_confidence = self.categories.predict(prompt)
+        return Classification(
+            game_type=game_type,
+            type_confidence=round(type_confidence, 3),
+            category=category,
+            category_confidence=round(category_confidence, 3),
+            confident=game_type is not None and type_confidence >= self.min_confidence
+        )
+
+    def resolve_type(self, prompt: str, game_type: Optional[str] = None) -> Optional[str]:
+        """The requested type, else the predicted type when confident enough, else None"""
+        if game_type or not self.enabled:
+            return game_type
+        classification = self.classify(prompt)
+        outcome = "confident" if classification.confident else "fallback"
+        self.metrics.increment("classifier.predictions", outcome=outcome)
+        self.logger.debug(f"Classified prompt as {classification.game_type} "
+                          f"({classification.type_confidence}), {outcome}")
+        return classification.game_type if classification.confident else None
@@ -0,0 +1,295 @@
+"""
+Game Generation Pipeline
+Runs the full n8n-equivalent workflow: Edit Fields (prompt builder) ->
+Basic LLM Chain (LLM service) -> Code node (response processor)
+"""
+
+import asyncio
+import hashlib
+import re
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+from pydantic import BaseModel, Field
+
+from app.core.config import get_settings
+from app.core.deadline import Deadline
+from app.core.exceptions import handle_service_error, handle_external_service_error
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+from app.models.game_schemas import GameSchema
+from app.services.game_cache import GameCache
+from app.services.llm_providers import LLMRequest, LLMResult
+from app.services.llm_service import LLMService
+from app.services.game_classifier import GameClassifier
+from app.services.output_budget import OutputBudgetModel, infer_difficulty
+from app.services.token_estimator import estimate_tokens
+from app.services.usage_ledger import UsageLedger
+from app.services.prompt_builder import PromptBuilder
+from app.services.request_coalescer import RequestCoalescer
+from app.services.response_schema import game_response_schema
+from app.services.response_processor import ResponseProcessor
+
+logger = get_logger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize a user prompt for request identity (case and whitespace insensitive)"""
+    return _WHITESPACE.sub(" ", prompt).strip().lower()
+
+
+class GenerationResult(BaseModel):
+    """Outcome of one pipeline run, including intermediate steps"""
+    game: GameSchema
+    full_prompt: str = ""
+    raw_response: str = ""
+    llm: Optional[LLMResult] = None
+    cache_hit: bool = False
+    # Seconds spent in each stage (prompt_builder, llm, response_processor or cache)
+    timings: Dict[str, float] = Field(default_factory=dict)
+
+
+class GamePipeline:
+    """
+    Prompt -> LLM -> validated game
+    Served from the game cache when possible; identical concurrent misses are coalesced
+    """
+
+    def __init__(
+        self,
+        prompt_builder: PromptBuilder,
+        llm_service: LLMService,
+        response_processor: ResponseProcessor,
+        cache: Optional[GameCache] = None,
+        usage: Optional[UsageLedger] = None
+    ):
+        self.settings = get_settings()
+        self.logger = logger
+        self.metrics = get_metrics()
+        self.prompt_builder = prompt_builder
+        self.llm_service = llm_service
+        self.response_processor = response_processor
+        self.cache = cache
+        self.usage = usage
+        self.coalescer = RequestCoalescer("generate")
+        self.output_budget = OutputBudgetModel.from_settings(self.settings)
+        self.classifier = GameClassifier.from_settings(self.settings)
+
+    def health_check(self):
+        """Health check for the pipeline"""
+        return {
+            "status": "healthy",
+            "service": "game_pipeline",
+            "in_flight": self.coalescer.in_flight,
+            "output_budget": self.output_budget.snapshot()
+        }
+
+    def request_key(self, prompt: str, game_type: Optional[str] = None) -> str:
+        """
+        Identity of a generation request: normalized prompt, requested game type,
+        prompt-template version, and every setting that changes what the model
+        is asked or which model answers (providers and their models, temperature,
+        structured output, prompt layout, prompt token budget, and whether and
+        how confidently the classifier pins a type)
+        """
+        identity = "|".join([
+            normalize_prompt(prompt),
+            game_type or "",
+            self.prompt_builder.template_version,
+            self.settings.LLM_PROVIDERS,
+            self.settings.GOOGLE_MODEL,
+            self.settings.OPENROUTER_MODEL,
+            str(self.settings.TEMPERATURE),
+            str(self.settings.STRUCTURED_OUTPUT),
+            self.settings.PROMPT_LAYOUT,
+            str(self.prompt_builder.token_budget),
+            str(self.classifier.enabled),
+            str(self.classifier.min_confidence),
+        ])
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+    def build_request(self, prompt: str, game_type: Optional[str] = None,
+                      endpoint: str = "generate") -> LLMRequest:
+        """
+        Build the LLM request for a user prompt
+        Unless PROMPT_LAYOUT is inline (and prompt caching is off), the static
+        sections become a byte-stable prefix sent ahead of, or as the system
+        instruction for, the user request, so provider-side prefix caches match
+        everything but the request. With structured output
+        on, the response is constrained to the game schema (per type when known).
+        Without a requested type, a confident local classification picks one so
+        only that type's content template is sent. The output token limit and
+        attempt timeout come from the output budget model, and the labels
+        attribute the call's token usage
+        """
+        game_type = self.classifier.resolve_type(prompt, game_type)
+        layout = self.settings.PROMPT_LAYOUT
+        if layout != "inline" or self.settings.PROMPT_CACHE_ENABLED:
+            prefix, suffix = self.prompt_builder.build_prompt_parts(prompt, game_type)
+            request = LLMRequest(prompt=suffix, prefix=prefix, system_prefix=layout == "system")
+        else:
+            request = LLMRequest(prompt=self.prompt_builder.build_full_prompt(prompt, game_type))
+        
+        budget = self.output_budget.budget(game_type, infer_difficulty(prompt))
+        request.max_output_tokens = budget.max_output_tokens
+        request.timeout = budget.timeout
+        request.labels = {
+            "endpoint": endpoint,
+            "game_type": game_type or "auto",
+            "template_version": self.prompt_builder.template_version,
+        }
+        
+        if self.settings.STRUCTURED_OUTPUT:
+            request.json_output = True
+            request.response_schema = game_response_schema(game_type)
+        return request
+
+    async def generate(
+        self,
+        prompt: str,
+        deadline: Optional[Deadline] = None,
+        use_cache: bool = True,
+        game_type: Optional[str] = None,
+        endpoint: str = "generate"
+    ) -> GenerationResult:
+        """
+        Generate a game for the prompt
+        Cached games are returned directly; concurrent requests with the same
+        key share one upstream call and result (usage is attributed to the
+        endpoint of the request that made the call). With use_cache off the
+        call is made fresh: it neither joins an in-flight call nor is stored
+        """
+        deadline = deadline or Deadline(self.settings.REQUEST_TIMEOUT)
+        if not use_cache:
+            return await self._run(prompt, deadline, game_type, endpoint)
+        key = self.request_key(prompt, game_type)
+        
+        if self.cache is not None:
+            started = time.perf_counter()
+            cached = await self.cache.get(key)
+            if cached is not None:
+                self.logger.info(f"Serving cached game {cached.id} for key {key[:12]}")
+                return GenerationResult(game=cached, cache_hit=True, timings={"cache": time.perf_counter() - started})
+        
+        return await self.coalescer.run(key, lambda: self._run_and_store(key, prompt, deadline, game_type, endpoint))
+    
+    async def generate_batch(
+        self,
+        prompts: List[str],
+        parallelism: int,
+        game_types: Optional[List[Optional[str]]] = None
+    ) -> AsyncIterator[Tuple[int, Union[GenerationResult, Exception]]]:
+        """
+        Generate games for several prompts, at most `parallelism` at a time
+        Yields (index, result or exception) in completion order; a failed item
+        does not stop the rest. Each item gets its own deadline once it starts
+        """
+        semaphore = asyncio.Semaphore(max(1, parallelism))
+        game_types = game_types or [None] * len(prompts)
+        
+        async def run_item(index: int, prompt: str) -> Tuple[int, Union[GenerationResult, Exception]]:
+            async with semaphore:
+                try:
+                    return index, await self.generate(prompt, game_type=game_types[index], endpoint="generate_batch")
+                except Exception as e:
+                    return index, e
+        
+        tasks = [asyncio.create_task(run_item(index, prompt)) for index, prompt in enumerate(prompts)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, outcome = await next_done
+                self.metrics.increment("batch.items", status="error" if isinstance(outcome, Exception) else "ok")
+                yield index, outcome
+        finally:
+            # Client went away (or the consumer stopped early): drop unfinished items
+            for task in tasks:
+                task.cancel()
+    
+    def record_output(self, game: GameSchema, text: str, llm: Optional[LLMResult] = None) -> None:
+        """Feed a successful generation's output size and latency to the output budget model"""
+        output_tokens = (llm.usage.get("output_tokens") if llm else None) or estimate_tokens(text)
+        self.output_budget.record(game.type, game.difficulty, output_tokens, llm.latency if llm else None)
+    
+    def record_truncation(self, request: LLMRequest, prompt: str, llm: LLMResult) -> None:
+        """Tell the output budget when a call hit its token limit, in the bucket its limit came from"""
+        if not llm.truncated:
+            return
+        game_type = request.labels.get("game_type")
+        self.output_budget.record_truncated(
+            None if game_type == "auto" else game_type, infer_difficulty(prompt),
+            request.max_output_tokens or self.settings.MAX_TOKENS
+        )
+    
+    def record_usage(self, request: LLMRequest, llm: LLMResult, game: Optional[GameSchema] = None) -> None:
+        """Add a call's token usage to the ledger, under the generated game's type when known"""
+        if self.usage is None:
+            return
+        labels = {**request.labels, "game_type": game.type} if game is not None else request.labels
+        self.usage.record(labels, llm)
+    
+    async def _run_and_store(self, key: str, prompt: str, deadline: Deadline,
+                             game_type: Optional[str] = None, endpoint: str = "generate") -> GenerationResult:
+        result = await self._run(prompt, deadline, game_type, endpoint)
+        if self.cache is not None:
+            try:
+                await self.cache.set(key, prompt, result.game)
+            except Exception as e:
+                self.logger.error(f"Failed to cache generated game: {str(e)}")
+        return result
+
+    async def _run(self, prompt: str, deadline: Deadline, game_type: Optional[str] = None,
+                   endpoint: str = "generate") -> GenerationResult:
+        timings: Dict[str, float] = {}
+        
+        # Step 1: Build the full therapeutic prompt (equivalent to Edit Fields node)
+        self.logger.info("Building therapeutic prompt...")
+        started = time.perf_counter()
+        try:
+            deadline.check(stage="prompt_builder")
+            llm_request = self.build_request(prompt, game_type, endpoint)
+        except Exception as e:
+            raise handle_service_error(e, "prompt_builder", "build_full_prompt")
+        timings["prompt_builder"] = time.perf_counter() - started
+
+        # Step 2: Process through LLM (equivalent to Basic LLM Chain node)
+        # With hedging, the LLM service validates candidates; keep the parsed game
+        validated: Dict[str, GameSchema] = {}
+
+        def validate(text: str) -> GameSchema:
+            validated[text] = self.response_processor.process_response(text)
+            return validated[text]
+
+        self.logger.info("Processing through LLM...")
+        started = time.perf_counter()
+        try:
+            llm_result = await self.llm_service.generate(llm_request, deadline, validator=validate)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise handle_external_service_error(e, "llm", getattr(e, 'status_code', None))
+        timings["llm"] = time.perf_counter() - started
+        self.record_truncation(llm_request, prompt, llm_result)
+
+        # Step 3: Clean and parse response (equivalent to Code node)
+        self.logger.info("Processing LLM response...")
+        started = time.perf_counter()
+        try:
+            deadline.check(stage="response_processor")
+            game_schema = validated.get(llm_result.text) or self.response_processor.process_response(llm_result.text)
+        except Exception as e:
+            self.record_usage(llm_request, llm_result)
+            raise handle_service_error(e, "response_processor", "process_response")
+        self.record_usage(llm_request, llm_result, game_schema)
+        timings["response_processor"] = time.perf_counter() - started
+        self.record_output(game_schema, llm_result.text, llm_result)
+
+        return GenerationResult(
+            full_prompt=llm_request.full_prompt,
+            raw_response=llm_result.text,
+            game=game_schema,
+            llm=llm_result,
+            timings=timings
+        )
@@ -0,0 +1,92 @@
+"""
+Request Hedging
+Decides when a slow LLM call gets a speculative second request, and keeps
+the extra upstream load within a budget
+"""
+
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics, percentile
+
+logger = get_logger(__name__)
+
+
+class HedgePolicy:
+    """
+    Hedge delay from recent latency, hedge count from a token budget
+
+    - The delay is the configured percentile of the last `window` successful
+      call latencies (never below min_delay); no hedging until min_samples
+      have been seen
+    - Every request earns budget_ratio tokens (up to burst) and every hedge
+      spends one, so over time hedges stay below budget_ratio x requests
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        percentile: float = 95.0,
+        window: int = 200,
+        min_samples: int = 20,
+        min_delay: float = 1.0,
+        budget_ratio: float = 0.1,
+        burst: float = 10.0,
+        prefer_other_provider: bool = True
+    ):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.budget_ratio = budget_ratio
+        self.burst = max(1.0, burst)
+        self.prefer_other_provider = prefer_other_provider
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.tokens = 0.0
+        self.logger = logger
+        self.metrics = get_metrics()
+
+    @classmethod
+    def from_settings(cls, settings: Any) -> "HedgePolicy":
+        return cls(
+            enabled=settings.HEDGE_ENABLED,
+            percentile=settings.HEDGE_PERCENTILE,
+            window=settings.HEDGE_WINDOW,
+            min_samples=settings.HEDGE_MIN_SAMPLES,
+            min_delay=settings.HEDGE_MIN_DELAY,
+            budget_ratio=settings.HEDGE_BUDGET_RATIO,
+            burst=settings.HEDGE_BUDGET_BURST,
+            prefer_other_provider=settings.HEDGE_OTHER_PROVIDER
+        )
+
+    def record(self, latency: float) -> None:
+        """Add the latency of a successful upstream call"""
+        self.latencies.append(latency)
+
+    def on_request(self) -> None:
+        """Earn hedge budget for one request"""
+        self.tokens = min(self.burst, self.tokens + self.budget_ratio)
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little history"""
+        if len(self.latencies) < self.min_samples:
+            return None
+        return max(self.min_delay, percentile(self.latencies, self.percentile))
+
+    def try_acquire(self) -> bool:
+        """Spend one hedge from the budget"""
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        self.metrics.increment("hedge.skipped", reason="budget")
+        return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        delay = self.delay()
+        return {
+            "enabled": self.enabled,
+            "delay": round(delay, 3) if delay is not None else None,
+            "samples": len(self.latencies),
+            "budget_tokens": round(self.tokens, 2),
+        }
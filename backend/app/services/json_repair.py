@@ -0,0 +1,291 @@
+"""
+JSON Repair
+Single-pass extraction and repair of the JSON object in an LLM response:
+finds the outermost object, drops markdown fences and surrounding chatter,
+and fixes the mistakes models make (trailing or missing commas, Python
+literals and quotes, doubled braces, raw control characters in strings,
+unquoted keys, truncated output) in one left-to-right scan, reporting what it changed
+
+Cost: loads() makes at most two json.loads attempts (the whole text, then
+the outermost braces only when there is fence or chatter around them),
+then one tokenizing pass and a final json.loads, each linear in the text.
+The pass is Python, a few microseconds per token, so a broken response
+costs several times a clean one. It stops with ValueError once more than
+MAX_DEPTH containers are open: games nest far less, and brace floods ("{{{{",
+chatter full of "note {") would otherwise be scanned to the end and handed
+to json.loads as one deeply nested document
+"""
+
+import json
+import re
+from typing import Any, List, NamedTuple, Set, Tuple
+
+# Repairs, in the order they are reported when several apply
+REPAIRS = (
+    "fence", "preamble", "trailing_text", "doubled_brace", "trailing_comma", "missing_comma",
+    "python_literal", "single_quotes", "unquoted_key", "control_char", "mismatched_bracket", "truncated",
+)
+
+# Deepest nesting the pass will repair; game JSON stays well under ten
+MAX_DEPTH = 32
+
+# One alternative per token, after the whitespace before it.
+# v is a run of well-formed scalar values or key: scalar members separated by
+# commas, which leaves the container state as it found it and so can be
+# consumed in one step; k is a key whose value is not a scalar; r is any
+# other string (single-quoted, raw control characters, or cut off at the end
+# of the text, possibly right after a backslash)
+_STR = r'"[^"\\\x00-\x1f]*(?:\\.[^"\\\x00-\x1f]*)*"'
+_SCALAR = rf'(?:{_STR}(?!\s*:|\s*\Z)|-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?|(?:true|false|null)(?![\w$]))'
+_ENTRY = rf'(?:{_STR}(?:\s*:\s*{_SCALAR})?(?!\s*:|\s*\Z)|{_SCALAR})'
+_KEYED = re.compile(rf"{_STR}\s*:")
+_TOKEN = re.compile(rf"""\s*(?:
+    (?P<v>{_ENTRY}(?:\s*,\s*{_ENTRY})*)
+  | (?P<k>{_STR}\s*:)
+  | (?P<r>(?P<quote>["'])(?:[^"'\\]|\\.|(?!(?P=quote))["'])*(?:(?P=quote)|\\?\Z))
+  | (?P<p>[{{}}\[\],:])
+  | (?P<n>-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<w>[A-Za-z_$][A-Za-z0-9_$]*)
+  | (?P<x>\S)
+)""", re.VERBOSE | re.DOTALL)
+_CONTROL = re.compile(r"[\x00-\x1f]")
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t", "\b": "\\b", "\f": "\\f"}
+_FENCE_LINE = re.compile(r"```[A-Za-z]*")
+
+# Last significant token, for separators and finishing truncated output
+_OPEN, _KEY, _COLON, _COMMA, _VALUE = range(5)
+
+
+class JSONRepair(NamedTuple):
+    """The extracted JSON text and the repairs applied to get it"""
+    text: str
+    repairs: List[str]
+
+
+def _surroundings(before: str, after: str) -> Set[str]:
+    """Repairs for dropping the text around the object: fences and chatter"""
+    found = set()
+    for text, chatter in ((before, "preamble"), (after, "trailing_text")):
+        text = text.strip()
+        if not text:
+            continue
+        if "```" in text:
+            found.add("fence")
+        if _FENCE_LINE.sub("", text).strip():
+            found.add(chatter)
+    return found
+
+
+def _start(text: str) -> int:
+    """
+    Index of the object's opening brace; when chatter comes first the object
+    inside the first code fence is preferred, since chatter may hold braces too
+    """
+    brace = text.find("{")
+    fence = text.find("```")
+    if brace > 0 and fence != -1 and text[:brace].strip():
+        inner = text.find("{", fence + 3)
+        if inner != -1:
+            return inner
+    return brace
+
+
+def _string(token: str, found: set) -> str:
+    """A string token other than a well-formed double-quoted one, as valid JSON"""
+    quote = token[0]
+    inner = token[1:-1]
+    closed = len(token) > 1 and token[-1] == quote and (len(inner) - len(inner.rstrip("\\"))) % 2 == 0
+    body = token[1:-1] if closed else token[1:]
+    if not closed:
+        found.add("truncated")
+        if body.endswith("\\") and (len(body) - len(body.rstrip("\\"))) % 2:
+            body = body[:-1]
+    if quote == "'":
+        found.add("single_quotes")
+        body = body.replace("\\'", "'").replace('"', '\\"').replace('\\\\"', '\\"')
+    if _CONTROL.search(body):
+        found.add("control_char")
+        body = _CONTROL.sub(lambda match: _ESCAPES.get(match.group(), f"\\u{ord(match.group()):04x}"), body)
+    return f'"{body}"'
+
+
+def repair_json(text: str) -> JSONRepair:
+    """
+    Extract the outermost JSON object from text and repair it in one pass
+    Valid JSON comes back unchanged with no repairs. Raises ValueError when
+    the text holds no object at all or it nests deeper than MAX_DEPTH
+    """
+    start = _start(text)
+    if start == -1:
+        raise ValueError("No JSON object found in response")
+
+    found: Set[str] = set()
+    out: List[str] = []
+    append = out.append
+    last = start          # text[last:] from here on is still to be copied to out
+    end = len(text)
+    # Open containers: the closer, and for objects whether a key comes next
+    closers: List[str] = []
+    expect_key: List[bool] = []
+    doubled: List[bool] = []
+    state = _OPEN
+    comma_at = -1         # a comma not yet known to be followed by a value
+    skip_at = -1          # the second brace of a doubled pair
+
+    for match in _TOKEN.finditer(text, start):
+        kind = match.lastgroup
+        pos = match.start(kind)
+        if pos == skip_at:
+            append(text[last:pos])
+            last = pos + 1
+            continue
+
+        if kind == "p":
+            char = text[pos]
+            if char == ",":
+                if state == _OPEN or state == _COMMA:
+                    append(text[last:pos])
+                    last = pos + 1
+                    found.add("trailing_comma")
+                else:
+                    comma_at = pos
+                    state = _COMMA
+                if expect_key and closers[-1] == "}":
+                    expect_key[-1] = True
+                continue
+            if char == ":":
+                if closers and closers[-1] == "}":
+                    expect_key[-1] = False
+                state = _COLON
+                continue
+            if char == "}" or char == "]":
+                if state == _COMMA:
+                    append(text[last:comma_at])
+                    last = comma_at + 1
+                    found.add("trailing_comma")
+                if not closers:
+                    end = pos
+                    break
+                closer = closers.pop()
+                expect_key.pop()
+                if doubled.pop() and text.startswith("}", pos + 1):
+                    skip_at = pos + 1
+                    found.add("doubled_brace")
+                if char != closer:
+                    append(text[last:pos])
+                    append(closer)
+                    last = pos + 1
+                    found.add("mismatched_bracket")
+                state = _VALUE
+                if not closers:
+                    end = match.end()
+                    break
+                continue
+
+        if kind == "x":
+            # Not JSON; left for json.loads to report
+            continue
+
+        # Anything else starts a value (or a key)
+        if state == _VALUE:
+            append(text[last:pos])
+            append(",")
+            last = pos
+            found.add("missing_comma")
+            if closers and closers[-1] == "}":
+                expect_key[-1] = True
+        is_key = bool(expect_key) and expect_key[-1]
+        state = _VALUE
+
+        if kind == "p":
+            # An opening bracket
+            opened = text[pos] == "{"
+            if opened and text.startswith("{", pos + 1):
+                skip_at = pos + 1
+                found.add("doubled_brace")
+                doubled.append(True)
+            else:
+                doubled.append(False)
+            closers.append("}" if opened else "]")
+            if len(closers) > MAX_DEPTH:
+                raise ValueError(f"JSON nested deeper than {MAX_DEPTH} levels at char {pos}")
+            expect_key.append(opened)
+            state = _OPEN
+        elif kind == "v":
+            if is_key:
+                expect_key[-1] = False
+                if not _KEYED.match(text, pos):
+                    # A key on its own: only the end of truncated output looks like this
+                    state = _KEY
+        elif kind == "k":
+            if is_key:
+                expect_key[-1] = False
+            state = _COLON
+        elif kind == "r":
+            append(text[last:pos])
+            append(_string(match.group(kind), found))
+            last = match.end()
+            if is_key:
+                expect_key[-1] = False
+                state = _KEY
+        elif kind == "w":
+            word = match.group(kind)
+            if is_key:
+                append(text[last:pos])
+                append(f'"{word}"')
+                last = match.end()
+                found.add("unquoted_key")
+                expect_key[-1] = False
+                state = _KEY
+            elif word in _LITERALS:
+                append(text[last:pos])
+                append(_LITERALS[word])
+                last = match.end()
+                found.add("python_literal")
+        # Numbers are values as they are
+
+    closing = ""
+    if closers:
+        found.add("truncated")
+        if state == _KEY:
+            closing = ": null"
+        elif state == _COLON:
+            closing = " null"
+        elif state == _COMMA:
+            append(text[last:comma_at])
+            last = comma_at + 1
+        closing += "".join(reversed(closers))
+
+    found |= _surroundings(text[:start], text[end + 1:] if skip_at == end else text[end:])
+    append(text[last:end])
+    append(closing)
+    return JSONRepair("".join(out), [repair for repair in REPAIRS if repair in found])
+
+
+def loads(text: str) -> Tuple[Any, List[str]]:
+    """
+    Parse the JSON object in an LLM response, repairing it when needed
+    Returns the data and the repairs applied (none for clean JSON).
+    Raises ValueError (json.JSONDecodeError) when it cannot be repaired
+    """
+    try:
+        data = json.loads(text)
+        if isinstance(data, dict):
+            return data, []
+    except (ValueError, RecursionError):
+        # RecursionError: nesting too deep for json; the scan below reports it
+        pass
+    # Valid JSON inside fences or chatter only needs cutting out; with nothing
+    # but whitespace around it the first attempt already parsed this span
+    start, stop = _start(text), text.rfind("}") + 1
+    if 0 <= start < stop and (text[:start].strip() or text[stop:].strip()):
+        try:
+            data = json.loads(text[start:stop])
+            if isinstance(data, dict):
+                found = _surroundings(text[:start], text[stop:])
+                return data, [repair for repair in REPAIRS if repair in found]
+        except (ValueError, RecursionError):
+            pass
+    repaired = repair_json(text)
+    return json.loads(repaired.text), repaired.repairs
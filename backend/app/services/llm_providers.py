@@ -0,0 +1,630 @@
+"""
+LLM Providers
+Provider abstraction used by LLMService and the provider router
+Each provider speaks one upstream wire format (Gemini, OpenRouter)
+"""
+
+import json
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Optional, AsyncIterator, List, Union
+
+import httpx
+from pydantic import BaseModel, Field
+
+from app.core.logging_config import get_logger
+from app.core.exceptions import ExternalServiceException, ErrorCode
+from app.core.metrics import get_metrics
+from app.core.retry import parse_retry_after
+
+logger = get_logger(__name__)
+
+
+def gemini_usage(metadata: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    """Token counts from a Gemini usageMetadata block"""
+    metadata = metadata or {}
+    counts = {
+        "input_tokens": metadata.get("promptTokenCount"),
+        "output_tokens": metadata.get("candidatesTokenCount"),
+        "cached_tokens": metadata.get("cachedContentTokenCount"),
+        "total_tokens": metadata.get("totalTokenCount"),
+    }
+    return {key: int(value) for key, value in counts.items() if value is not None}
+
+
+def openai_usage(usage: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    """Token counts from an OpenAI-style (OpenRouter) usage block"""
+    usage = usage or {}
+    counts = {
+        "input_tokens": usage.get("prompt_tokens"),
+        "output_tokens": usage.get("completion_tokens"),
+        "cached_tokens": (usage.get("prompt_tokens_details") or {}).get("cached_tokens"),
+        "total_tokens": usage.get("total_tokens"),
+    }
+    return {key: int(value) for key, value in counts.items() if value is not None}
+
+
+class LLMResult(BaseModel):
+    """
+    Text returned by a provider together with call metadata
+    usage holds the token counts the provider reported (input_tokens,
+    output_tokens, cached_tokens, total_tokens); missing counts are left out
+    """
+    text: str
+    provider: str
+    model: str
+    latency: float = 0.0
+    usage: Dict[str, int] = Field(default_factory=dict)
+    finish_reason: Optional[str] = None
+
+    @property
+    def truncated(self) -> bool:
+        """The provider stopped because the output token limit was reached"""
+        return (self.finish_reason or "").upper() in ("MAX_TOKENS", "LENGTH")
+
+
+class LLMRequest(BaseModel):
+    """
+    What to send upstream for one call
+    prefix is the static part of the prompt; when cached_context is set the
+    provider already holds the prefix and only prompt is sent. system_prefix
+    sends the prefix as the system instruction (Gemini systemInstruction, a
+    system message on chat APIs) instead of ahead of prompt in the user turn.
+    json_output asks for a bare JSON response, constrained to response_schema
+    where the provider supports it. max_output_tokens and timeout (seconds per
+    upstream attempt) override MAX_TOKENS and the remaining request deadline.
+    labels attribute the call's token usage (endpoint, game type, template version)
+    """
+    prompt: str
+    prefix: Optional[str] = None
+    cached_context: Optional[str] = None
+    json_output: bool = False
+    response_schema: Optional[Dict[str, Any]] = None
+    max_output_tokens: Optional[int] = None
+    timeout: Optional[float] = None
+    labels: Dict[str, str] = Field(default_factory=dict)
+    system_prefix: bool = False
+
+    @classmethod
+    def of(cls, prompt: Union[str, "LLMRequest"]) -> "LLMRequest":
+        """Accept either a plain prompt string or a prepared request"""
+        return prompt if isinstance(prompt, LLMRequest) else cls(prompt=prompt)
+
+    @property
+    def full_prompt(self) -> str:
+        """The prompt as sent without a provider-side cache"""
+        if not self.prefix:
+            return self.prompt
+        return f"{self.prefix}\n\n{self.prompt}"
+
+
+class CachedContext(BaseModel):
+    """A provider-side cached prompt prefix"""
+    name: str
+    provider: str
+    model: str
+    expires_at: float
+
+
+class LLMProvider(ABC):
+    """Base class for upstream LLM providers"""
+
+    name: str = "provider"
+
+    # Whether the provider can hold a prompt prefix as a cached context
+    supports_context_cache: bool = False
+
+    # Error codes used when mapping upstream HTTP failures
+    rate_limit_code: ErrorCode = ErrorCode.LLM_SERVICE_ERROR
+    quota_code: ErrorCode = ErrorCode.LLM_SERVICE_ERROR
+    api_error_code: ErrorCode = ErrorCode.LLM_SERVICE_ERROR
+
+    def __init__(self, client: httpx.AsyncClient, settings: Any, model: str, base_url: str):
+        self.client = client
+        self.settings = settings
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.logger = logger
+
+    @property
+    @abstractmethod
+    def enabled(self) -> bool:
+        """True when the provider is configured (e.g. has an API key)"""
+
+    @abstractmethod
+    async def generate(self, request: LLMRequest, timeout: float) -> LLMResult:
+        """Generate a complete response for the request"""
+
+    @abstractmethod
+    def stream(self, request: LLMRequest, timeout: float, usage: Optional[Dict[str, int]] = None,
+               outcome: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Stream response text deltas for the request, filling usage with reported
+        token counts and outcome with the finish_reason of the last chunk that had one
+        """
+
+    @abstractmethod
+    async def health_check(self) -> Dict[str, Any]:
+        """Check provider connectivity"""
+
+    # Providers without context caching (supports_context_cache False) keep these
+    # defaults: nothing is created, refreshed or deleted, and callers send the full prompt
+
+    async def create_cached_context(self, content: str, ttl: float, timeout: float) -> Optional[CachedContext]:
+        """Register content as a cached context that later requests can reference"""
+        return None
+
+    async def refresh_cached_context(self, context: CachedContext, ttl: float,
+                                     timeout: float) -> Optional[CachedContext]:
+        """Extend the lifetime of a cached context"""
+        return None
+
+    async def delete_cached_context(self, context: CachedContext, timeout: float) -> None:
+        """Drop a cached context before it expires"""
+
+    def _error(self, message: str, error_code: ErrorCode, status_code: Optional[int] = None,
+               details: Optional[Dict[str, Any]] = None) -> ExternalServiceException:
+        return ExternalServiceException(
+            message=message,
+            error_code=error_code,
+            service_name=self.name,
+            status_code=status_code,
+            details=details
+        )
+
+    def _retry_after(self, headers: httpx.Headers, error_text: str) -> Optional[float]:
+        """Read the provider's retry hint in seconds from the Retry-After header"""
+        return parse_retry_after(headers.get("retry-after"))
+
+    def _raise_for_status(self, status_code: int, error_text: str, headers: Optional[httpx.Headers] = None) -> None:
+        """Map a non-200 upstream response to an ExternalServiceException"""
+        self.logger.error(f"{self.name} API error: {status_code} - {error_text[:1000]}")
+
+        if status_code == 429:
+            details = {}
+            retry_after = self._retry_after(headers or httpx.Headers(), error_text)
+            if retry_after is not None:
+                details["retry_after"] = retry_after
+            raise self._error(f"Rate limit exceeded for {self.name} API", self.rate_limit_code, status_code, details)
+        elif status_code == 403:
+            raise self._error(f"API quota exceeded for {self.name}", self.quota_code, status_code)
+        else:
+            raise self._error(
+                f"{self.name} API error: {status_code}",
+                self.api_error_code,
+                status_code,
+                {"error_text": error_text}
+            )
+
+    def _timeout_error(self, timeout: float) -> ExternalServiceException:
+        return self._error(f"{self.name} API request timed out", ErrorCode.TIMEOUT_ERROR, details={"timeout": timeout})
+
+    def _connect_error(self) -> ExternalServiceException:
+        return self._error(f"Failed to connect to {self.name} API", self.api_error_code, details={"operation": "connection"})
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini (Generative Language API v1beta)"""
+
+    name = "gemini"
+    supports_context_cache = True
+    rate_limit_code = ErrorCode.GEMINI_RATE_LIMIT
+    quota_code = ErrorCode.GEMINI_QUOTA_EXCEEDED
+    api_error_code = ErrorCode.GEMINI_API_ERROR
+
+    def __init__(self, client: httpx.AsyncClient, settings: Any, model: str, base_url: str):
+        super().__init__(client, settings, model, base_url)
+        # Response schemas the API refused (older models / API versions), by id;
+        # each one is kept so its id is not reused, and other schemas are still sent
+        self._rejected_schemas: Dict[int, Dict[str, Any]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.settings.GOOGLE_API_KEY)
+
+    def _url(self, method: str) -> str:
+        """Build the Gemini REST URL for a model method (generateContent, streamGenerateContent)"""
+        return f"{self.base_url}/v1beta/models/{self.model}:{method}"
+
+    def _params(self, **extra: str) -> Dict[str, str]:
+        return {"key": self.settings.GOOGLE_API_KEY, **extra}
+
+    def _build_payload(self, request: LLMRequest) -> Dict[str, Any]:
+        """Build the Gemini request body shared by blocking and streaming calls"""
+        # A cachedContent already holds the prefix, and Gemini refuses systemInstruction alongside it
+        system = request.prefix if request.system_prefix and request.prefix and not request.cached_context else None
+        text = request.prompt if request.cached_context or system else request.full_prompt
+        payload = {
+            "contents": [
+                {
+                    "role": "user",
+                    "parts": [
+                        {"text": text}
+                    ]
+                }
+            ],
+            "generationConfig": {
+                "temperature": self.settings.TEMPERATURE,
+                "maxOutputTokens": request.max_output_tokens or self.settings.MAX_TOKENS
+            }
+        }
+        if request.cached_context:
+            payload["cachedContent"] = request.cached_context
+        if system:
+            payload["systemInstruction"] = {"parts": [{"text": system}]}
+        if request.json_output:
+            payload["generationConfig"]["responseMimeType"] = "application/json"
+            if request.response_schema and id(request.response_schema) not in self._rejected_schemas:
+                payload["generationConfig"]["responseSchema"] = request.response_schema
+        return payload
+
+    def _is_schema_rejection(self, request: LLMRequest, error: Exception) -> bool:
+        """A 400 that names the response schema: the model or API version cannot take it"""
+        if not request.response_schema or id(request.response_schema) in self._rejected_schemas:
+            return False
+        details = getattr(error, "details", {})
+        return details.get("external_status_code") == 400 and "schema" in details.get("error_text", "").lower()
+
+    def _reject_schema(self, request: LLMRequest, error: Exception) -> None:
+        """Stop sending this request's schema; requests with other schemas keep theirs"""
+        self._rejected_schemas[id(request.response_schema)] = request.response_schema
+        game_type = request.labels.get("game_type", "auto")
+        get_metrics().increment("structured_output.rejected", provider=self.name, game_type=game_type)
+        self.logger.warning(
+            f"Gemini rejected responseSchema for {game_type}, continuing with plain JSON mode: {str(error)}"
+        )
+
+    def _retry_after(self, headers: httpx.Headers, error_text: str) -> Optional[float]:
+        """
+        Read the provider's retry hint in seconds
+        Prefers the Retry-After header, then Gemini's google.rpc.RetryInfo error detail
+        """
+        retry_after = parse_retry_after(headers.get("retry-after"))
+        if retry_after is not None:
+            return retry_after
+        try:
+            error_details = json.loads(error_text).get("error", {}).get("details", [])
+        except (ValueError, AttributeError):
+            return None
+        for detail in error_details:
+            if isinstance(detail, dict) and "retryDelay" in detail:
+                return parse_retry_after(detail["retryDelay"])
+        return None
+
+    async def generate(self, request: LLMRequest, timeout: float) -> LLMResult:
+        """Call Google Gemini API, dropping the response schema if the API rejects it"""
+        try:
+            return await self._generate(request, timeout)
+        except ExternalServiceException as error:
+            if not self._is_schema_rejection(request, error):
+                raise
+            self._reject_schema(request, error)
+            return await self._generate(request, timeout)
+
+    async def _generate(self, request: LLMRequest, timeout: float) -> LLMResult:
+        """Call Google Gemini API with proper error handling"""
+        self.logger.debug(f"Calling Gemini API with model: {self.model}")
+        started = time.monotonic()
+
+        try:
+            response = await self.client.post(
+                self._url("generateContent"),
+                headers={"Content-Type": "application/json"},
+                json=self._build_payload(request),
+                params=self._params(),
+                timeout=timeout
+            )
+        except httpx.TimeoutException:
+            raise self._timeout_error(timeout)
+        except httpx.ConnectError:
+            raise self._connect_error()
+
+        if response.status_code != 200:
+            self._raise_for_status(response.status_code, response.text, response.headers)
+
+        result = response.json()
+
+        # Extract the generated text from Gemini response
+        try:
+            generated_text = result["candidates"][0]["content"]["parts"][0]["text"]
+            finish_reason = result["candidates"][0].get("finishReason")
+        except (KeyError, IndexError) as e:
+            self.logger.error(f"Unexpected Gemini response format: {result}")
+            raise self._error(
+                f"Unexpected Gemini response format: {str(e)}",
+                self.api_error_code,
+                details={"response_structure": str(result)}
+            )
+
+        self.logger.debug(f"Successfully received response from Gemini (length: {len(generated_text)} chars)")
+        return LLMResult(
+            text=generated_text,
+            provider=self.name,
+            model=self.model,
+            latency=time.monotonic() - started,
+            usage=gemini_usage(result.get("usageMetadata")),
+            finish_reason=finish_reason
+        )
+
+    async def stream(self, request: LLMRequest, timeout: float, usage: Optional[Dict[str, int]] = None,
+                     outcome: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """Stream text deltas, dropping the response schema if the API rejects it"""
+        received_any = False
+        try:
+            async for text in self._stream(request, timeout, usage, outcome):
+                received_any = True
+                yield text
+        except ExternalServiceException as error:
+            if received_any or not self._is_schema_rejection(request, error):
+                raise
+            self._reject_schema(request, error)
+            async for text in self._stream(request, timeout, usage, outcome):
+                yield text
+
+    async def _stream(self, request: LLMRequest, timeout: float, usage: Optional[Dict[str, int]] = None,
+                      outcome: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """Stream text deltas using streamGenerateContent with server-sent events"""
+        try:
+            async with self.client.stream(
+                "POST",
+                self._url("streamGenerateContent"),
+                headers={"Content-Type": "application/json"},
+                json=self._build_payload(request),
+                params=self._params(alt="sse"),
+                timeout=timeout
+            ) as response:
+                if response.status_code != 200:
+                    error_text = (await response.aread()).decode("utf-8", errors="replace")
+                    self._raise_for_status(response.status_code, error_text, response.headers)
+
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if not data:
+                        continue
+                    try:
+                        chunk = json.loads(data)
+                    except json.JSONDecodeError:
+                        self.logger.warning(f"Skipping malformed Gemini stream chunk: {data[:200]}")
+                        continue
+                    if usage is not None and "usageMetadata" in chunk:
+                        usage.update(gemini_usage(chunk["usageMetadata"]))
+
+                    for candidate in chunk.get("candidates", []):
+                        if outcome is not None and candidate.get("finishReason"):
+                            outcome["finish_reason"] = candidate["finishReason"]
+                        for part in candidate.get("content", {}).get("parts", []):
+                            text = part.get("text")
+                            if text:
+                                yield text
+        except httpx.TimeoutException:
+            raise self._timeout_error(timeout)
+        except httpx.ConnectError:
+            raise self._connect_error()
+
+    async def _cache_call(self, method: str, url: str, timeout: float,
+                          payload: Optional[Dict[str, Any]] = None, **params: str) -> Dict[str, Any]:
+        """Send a cachedContents request and return the decoded body"""
+        try:
+            response = await self.client.request(
+                method,
+                url,
+                headers={"Content-Type": "application/json"},
+                json=payload,
+                params=self._params(**params),
+                timeout=timeout
+            )
+        except httpx.TimeoutException:
+            raise self._timeout_error(timeout)
+        except httpx.ConnectError:
+            raise self._connect_error()
+
+        if response.status_code != 200:
+            self._raise_for_status(response.status_code, response.text, response.headers)
+        return response.json() if response.content else {}
+
+    async def create_cached_context(self, content: str, ttl: float, timeout: float) -> CachedContext:
+        """Create a cachedContents entry holding the static prompt prefix"""
+        payload = {
+            "model": f"models/{self.model}",
+            "contents": [{"role": "user", "parts": [{"text": content}]}],
+            "ttl": f"{int(ttl)}s"
+        }
+        result = await self._cache_call("POST", f"{self.base_url}/v1beta/cachedContents", timeout, payload)
+        if "name" not in result:
+            raise self._error(
+                "Unexpected Gemini cachedContents response",
+                self.api_error_code,
+                details={"response_structure": str(result)}
+            )
+        return CachedContext(name=result["name"], provider=self.name, model=self.model, expires_at=time.time() + ttl)
+
+    async def refresh_cached_context(self, context: CachedContext, ttl: float, timeout: float) -> CachedContext:
+        """Extend a cachedContents entry by updating its ttl"""
+        await self._cache_call(
+            "PATCH", f"{self.base_url}/v1beta/{context.name}", timeout, {"ttl": f"{int(ttl)}s"}, updateMask="ttl"
+        )
+        return context.model_copy(update={"expires_at": time.time() + ttl})
+
+    async def delete_cached_context(self, context: CachedContext, timeout: float) -> None:
+        await self._cache_call("DELETE", f"{self.base_url}/v1beta/{context.name}", timeout)
+
+    async def health_check(self) -> Dict[str, Any]:
+        """Health check for Gemini service (models.get, no generation)"""
+        if not self.enabled:
+            return {"status": "unhealthy", "provider": self.name, "error": "No Gemini API key configured"}
+
+        try:
+            # Model metadata lookup: checks key and model without spending generation quota
+            response = await self.client.get(
+                f"{self.base_url}/v1beta/models/{self.model}",
+                params=self._params()
+            )
+            if response.status_code == 200:
+                return {"status": "healthy", "provider": self.name}
+            return {
+                "status": "unhealthy",
+                "provider": self.name,
+                "error": f"API test failed with status {response.status_code}"
+            }
+        except Exception as e:
+            return {"status": "unhealthy", "provider": self.name, "error": str(e)}
+
+
+class OpenRouterProvider(LLMProvider):
+    """OpenRouter (OpenAI-compatible chat completions)"""
+
+    name = "openrouter"
+    rate_limit_code = ErrorCode.OPENROUTER_RATE_LIMIT
+    quota_code = ErrorCode.OPENROUTER_API_ERROR
+    api_error_code = ErrorCode.OPENROUTER_API_ERROR
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.settings.OPENROUTER_API_KEY)
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.settings.OPENROUTER_API_KEY}",
+            "Content-Type": "application/json",
+        }
+
+    def _build_payload(self, request: LLMRequest, stream: bool = False) -> Dict[str, Any]:
+        if request.system_prefix and request.prefix:
+            messages = [{"role": "system", "content": request.prefix}, {"role": "user", "content": request.prompt}]
+        else:
+            messages = [{"role": "user", "content": request.full_prompt}]
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": self.settings.TEMPERATURE,
+            "max_tokens": request.max_output_tokens or self.settings.MAX_TOKENS,
+        }
+        if request.json_output:
+            payload["response_format"] = {"type": "json_object"}
+        if stream:
+            payload["stream"] = True
+            payload["usage"] = {"include": True}
+        return payload
+
+    async def generate(self, request: LLMRequest, timeout: float) -> LLMResult:
+        """Call OpenRouter chat completions"""
+        self.logger.debug(f"Calling OpenRouter API with model: {self.model}")
+        started = time.monotonic()
+
+        try:
+            response = await self.client.post(
+                f"{self.base_url}/api/v1/chat/completions",
+                headers=self._headers(),
+                json=self._build_payload(request),
+                timeout=timeout
+            )
+        except httpx.TimeoutException:
+            raise self._timeout_error(timeout)
+        except httpx.ConnectError:
+            raise self._connect_error()
+
+        if response.status_code != 200:
+            self._raise_for_status(response.status_code, response.text, response.headers)
+
+        result = response.json()
+        try:
+            generated_text = result["choices"][0]["message"]["content"]
+            finish_reason = result["choices"][0].get("finish_reason")
+        except (KeyError, IndexError, TypeError) as e:
+            self.logger.error(f"Unexpected OpenRouter response format: {result}")
+            raise self._error(
+                f"Unexpected OpenRouter response format: {str(e)}",
+                self.api_error_code,
+                details={"response_structure": str(result)}
+            )
+
+        return LLMResult(
+            text=generated_text,
+            provider=self.name,
+            model=self.model,
+            latency=time.monotonic() - started,
+            usage=openai_usage(result.get("usage")),
+            finish_reason=finish_reason
+        )
+
+    async def stream(self, request: LLMRequest, timeout: float, usage: Optional[Dict[str, int]] = None,
+                     outcome: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """Stream text deltas from OpenRouter's SSE chat completions"""
+        try:
+            async with self.client.stream(
+                "POST",
+                f"{self.base_url}/api/v1/chat/completions",
+                headers=self._headers(),
+                json=self._build_payload(request, stream=True),
+                timeout=timeout
+            ) as response:
+                if response.status_code != 200:
+                    error_text = (await response.aread()).decode("utf-8", errors="replace")
+                    self._raise_for_status(response.status_code, error_text, response.headers)
+
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if not data or data == "[DONE]":
+                        continue
+                    try:
+                        chunk = json.loads(data)
+                    except json.JSONDecodeError:
+                        continue
+                    if usage is not None and chunk.get("usage"):
+                        usage.update(openai_usage(chunk["usage"]))
+                    for choice in chunk.get("choices", []):
+                        if outcome is not None and choice.get("finish_reason"):
+                            outcome["finish_reason"] = choice["finish_reason"]
+                        text = (choice.get("delta") or {}).get("content")
+                        if text:
+                            yield text
+        except httpx.TimeoutException:
+            raise self._timeout_error(timeout)
+        except httpx.ConnectError:
+            raise self._connect_error()
+
+    async def health_check(self) -> Dict[str, Any]:
+        """Health check for OpenRouter (model listing, no generation)"""
+        if not self.enabled:
+            return {"status": "unhealthy", "provider": self.name, "error": "No OpenRouter API key configured"}
+
+        try:
+            response = await self.client.get(f"{self.base_url}/api/v1/models", headers=self._headers())
+            if response.status_code == 200:
+                return {"status": "healthy", "provider": self.name}
+            return {
+                "status": "unhealthy",
+                "provider": self.name,
+                "error": f"API test failed with status {response.status_code}"
+            }
+        except Exception as e:
+            return {"status": "unhealthy", "provider": self.name, "error": str(e)}
+
+
+PROVIDER_CLASSES = {
+    GeminiProvider.name: GeminiProvider,
+    OpenRouterProvider.name: OpenRouterProvider,
+}
+
+
+def build_providers(client: httpx.AsyncClient, settings: Any) -> List[LLMProvider]:
+    """Instantiate the providers listed in LLM_PROVIDERS, in preference order"""
+    models = {
+        "gemini": (settings.GOOGLE_MODEL, settings.GEMINI_BASE_URL),
+        "openrouter": (settings.OPENROUTER_MODEL, settings.OPENROUTER_BASE_URL),
+    }
+    providers = []
+    for name in settings.LLM_PROVIDERS.split(","):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in PROVIDER_CLASSES:
+            logger.warning(f"Ignoring unknown LLM provider: {name}")
+            continue
+        model, base_url = models[name]
+        providers.append(PROVIDER_CLASSES[name](client, settings, model, base_url))
+    return providers
@@ -1,197 +1,226 @@
 """
-LLM Service - Gemini Only
+LLM Service
 Equivalent to the "Basic LLM Chain" node in the n8n workflow
-Handles communication with Google Gemini API
+Routes prompts to the configured LLM providers (Gemini first, OpenRouter as failover)
 """
 
 import logging
 import json
 import asyncio
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, List, Optional, AsyncIterator, Union
 import httpx
 from app.core.config import get_settings
 from app.core.logging_config import get_logger
-from app.core.exceptions import ExternalServiceException, ErrorCode
+from app.core.exceptions import GameGPTException, ExternalServiceException, ErrorCode
+from app.core.deadline import Deadline
+from app.core.metrics import get_metrics
+from app.core.retry import RetryPolicy
+from app.services.hedging import HedgePolicy
+from app.services.llm_providers import LLMRequest, LLMResult, build_providers
+from app.services.prompt_cache import PromptPrefixCache
+from app.services.provider_router import ProviderRouter
+from app.services.concurrency_limiter import AdaptiveConcurrencyLimiter
 
 logger = get_logger(__name__)
 
 
 class LLMService:
-    """Service for handling Gemini API calls"""
-    
+    """Service for handling LLM provider calls"""
+
     def __init__(self):
         self.settings = get_settings()
         self.logger = logger
         self.client = httpx.AsyncClient(timeout=self.settings.REQUEST_TIMEOUT)
-        
+        self.retry_policy = RetryPolicy.from_settings(self.settings)
+        self.prompt_cache = PromptPrefixCache.from_settings(self.settings)
+        self.router = ProviderRouter(build_providers(self.client, self.settings), self.settings, self.prompt_cache)
+        self.limiter = AdaptiveConcurrencyLimiter.from_settings(self.settings)
+        self.hedging = HedgePolicy.from_settings(self.settings)
+        self.metrics = get_metrics()
+
     async def __aenter__(self):
         return self
-        
+
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Drop cached prompt prefixes and close the shared HTTP client"""
+        await self.prompt_cache.close()
         await self.client.aclose()
-    
+
     async def health_check(self) -> Dict[str, Any]:
-        """Health check for Gemini service"""
-        try:
-            if not self.settings.GOOGLE_API_KEY:
-                return {
-                    "status": "unhealthy", 
-                    "provider": "gemini", 
-                    "service": "llm", 
-                    "error": "No Gemini API key configured"
-                }
-            
-            # Test API connectivity with a minimal request
-            test_payload = {
-                "contents": [{"parts": [{"text": "test"}]}],
-                "generationConfig": {"maxOutputTokens": 10}
-            }
-            
-            response = await self.client.post(
-                f"https://generativelanguage.googleapis.com/v1beta/models/{self.settings.GOOGLE_MODEL}:generateContent",
-                headers={"Content-Type": "application/json"},
-                json=test_payload,
-                params={"key": self.settings.GOOGLE_API_KEY}
-            )
-            
-            if response.status_code == 200:
-                return {"status": "healthy", "provider": "gemini", "service": "llm"}
-            else:
-                return {
-                    "status": "unhealthy", 
-                    "provider": "gemini", 
-                    "service": "llm", 
-                    "error": f"API test failed with status {response.status_code}"
-                }
-                
-        except Exception as e:
+        """Health check across all configured providers"""
+        if not self.router.providers:
             return {
-                "status": "unhealthy", 
-                "provider": "gemini", 
-                "service": "llm", 
-                "error": str(e)
+                "status": "unhealthy",
+                "service": "llm",
+                "error": "No LLM provider configured"
             }
-    
-    async def generate_response(self, prompt: str) -> str:
+
+        checks = await asyncio.gather(*(provider.health_check() for provider in self.router.providers))
+        routing = self.router.snapshot()
+        providers = {}
+        for check in checks:
+            name = check.pop("provider")
+            providers[name] = {**check, **routing.get(name, {})}
+
+        healthy = [name for name, check in providers.items() if check.get("status") == "healthy"]
+        status = "healthy" if len(healthy) == len(providers) else ("degraded" if healthy else "unhealthy")
+        return {
+            "status": status,
+            "service": "llm",
+            "providers": providers,
+            "concurrency": self.limiter.snapshot(),
+            "prompt_cache": self.prompt_cache.snapshot(),
+            "hedging": self.hedging.snapshot()
+        }
+
+    async def generate(
+        self,
+        prompt: Union[str, LLMRequest],
+        deadline: Optional[Deadline] = None,
+        validator: Optional[Callable[[str], Any]] = None
+    ) -> LLMResult:
         """
-        Generate response from Gemini - equivalent to Basic LLM Chain node
+        Generate a response with provider metadata
+        Pass an LLMRequest with a prefix to let providers serve the static part
+        of the prompt from a cached context
+        Each attempt waits for a concurrency slot, then goes to the best available
+        provider (failing over between providers); transient failures are retried
+        within the request deadline without holding a slot during backoff
+        With hedging on, validator (raising on unusable text) decides which of
+        the primary and hedged responses wins
         """
-        self.logger.info("Generating response using Gemini API")
-        
+        deadline = deadline or Deadline(self.settings.REQUEST_TIMEOUT)
+        request = LLMRequest.of(prompt)
+
         try:
-            return await self._call_gemini(prompt)
-                
-        except ExternalServiceException:
-            # Re-raise external service exceptions as-is
+            if self.hedging.enabled:
+                return await self._generate_hedged(request, deadline, validator)
+            return await self._generate(request, deadline)
+        except GameGPTException:
+            # Re-raise structured service exceptions as-is
             raise
         except Exception as e:
-            self.logger.error(f"Gemini generation failed: {str(e)}")
-            raise ExternalServiceException(
-                message=f"Gemini generation failed: {str(e)}",
-                error_code=ErrorCode.GEMINI_API_ERROR,
-                service_name="gemini",
-                details={"operation": "generate_response"}
-            )
-    
-    async def _call_gemini(self, prompt: str) -> str:
-        """Call Google Gemini API with proper error handling"""
-        if not self.settings.GOOGLE_API_KEY:
+            self.logger.error(f"LLM generation failed: {str(e)}")
             raise ExternalServiceException(
-                message="Gemini API key not configured",
-                error_code=ErrorCode.CONFIGURATION_ERROR,
-                service_name="gemini",
+                message=f"LLM generation failed: {str(e)}",
+                error_code=ErrorCode.LLM_SERVICE_ERROR,
+                service_name="llm",
                 details={"operation": "generate_response"}
             )
-        
-        # Gemini API endpoint
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.settings.GOOGLE_MODEL}:generateContent"
-        
-        headers = {
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "contents": [
-                {
-                    "parts": [
-                        {"text": prompt}
-                    ]
-                }
-            ],
-            "generationConfig": {
-                "temperature": self.settings.TEMPERATURE,
-                "maxOutputTokens": self.settings.MAX_TOKENS
-            }
-        }
-        
-        params = {"key": self.settings.GOOGLE_API_KEY}
-        
-        self.logger.debug(f"Calling Gemini API with model: {self.settings.GOOGLE_MODEL}")
-        
+
+    async def _generate(self, request: LLMRequest, deadline: Deadline) -> LLMResult:
+        async def attempt(timeout: float) -> LLMResult:
+            async with self.limiter.slot(deadline):
+                return await self.router.generate(request, deadline)
+
+        return await self.retry_policy.run(attempt, deadline, name="llm")
+
+    async def _hedge(self, request: LLMRequest, deadline: Deadline, exclude: Optional[List[str]]) -> LLMResult:
+        """One speculative attempt (no retries), preferably on another provider"""
+        async with self.limiter.slot(deadline):
+            return await self.router.generate(request, deadline, exclude=exclude)
+
+    def _start_hedge(self, request: LLMRequest, deadline: Deadline) -> Optional[asyncio.Future]:
+        if deadline.remaining() <= 0 or not self.hedging.try_acquire():
+            return None
+        exclude = None
+        if self.hedging.prefer_other_provider:
+            ranked = self.router.ranked()
+            if len(ranked) > 1:
+                exclude = [ranked[0].name]
+        self.metrics.increment("hedge.sent", target="other_provider" if exclude else "same_provider")
+        self.logger.info(f"Hedging slow LLM request (excluding {exclude or 'none'})")
+        return asyncio.ensure_future(self._hedge(request, deadline, exclude))
+
+    def _accept(self, result: LLMResult, validator: Optional[Callable[[str], Any]]) -> bool:
+        if validator is None:
+            return True
         try:
-            response = await self.client.post(
-                url,
-                headers=headers,
-                json=payload,
-                params=params
-            )
-            
-            if response.status_code != 200:
-                error_text = response.text
-                self.logger.error(f"Gemini API error: {response.status_code} - {error_text}")
-                
-                # Map specific error codes
-                if response.status_code == 429:
-                    raise ExternalServiceException(
-                        message="Rate limit exceeded for Gemini API",
-                        error_code=ErrorCode.GEMINI_RATE_LIMIT,
-                        service_name="gemini",
-                        status_code=response.status_code,
-                        details={"retry_after": "60s"}
-                    )
-                elif response.status_code == 403:
-                    raise ExternalServiceException(
-                        message="API quota exceeded for Gemini",
-                        error_code=ErrorCode.GEMINI_QUOTA_EXCEEDED,
-                        service_name="gemini",
-                        status_code=response.status_code
-                    )
-                else:
-                    raise ExternalServiceException(
-                        message=f"Gemini API error: {response.status_code}",
-                        error_code=ErrorCode.GEMINI_API_ERROR,
-                        service_name="gemini",
-                        status_code=response.status_code,
-                        details={"error_text": error_text}
-                    )
-                
-            result = response.json()
-            
-            # Extract the generated text from Gemini response
-            try:
-                generated_text = result["candidates"][0]["content"]["parts"][0]["text"]
-                self.logger.debug(f"Successfully received response from Gemini (length: {len(generated_text)} chars)")
-                return generated_text
-            except (KeyError, IndexError) as e:
-                self.logger.error(f"Unexpected Gemini response format: {result}")
-                raise ExternalServiceException(
-                    message=f"Unexpected Gemini response format: {str(e)}",
-                    error_code=ErrorCode.GEMINI_API_ERROR,
-                    service_name="gemini",
-                    details={"response_structure": str(result)}
-                )
-                
-        except httpx.TimeoutException:
-            raise ExternalServiceException(
-                message="Gemini API request timed out",
-                error_code=ErrorCode.TIMEOUT_ERROR,
-                service_name="gemini",
-                details={"timeout": self.settings.REQUEST_TIMEOUT}
-            )
-        except httpx.ConnectError:
-            raise ExternalServiceException(
-                message="Failed to connect to Gemini API",
-                error_code=ErrorCode.GEMINI_API_ERROR,
-                service_name="gemini",
-                details={"operation": "connection"}
-            )
+            validator(result.text)
+            return True
+        except Exception as e:
+            self.metrics.increment("hedge.invalid", provider=result.provider)
+            self.logger.warning(f"Discarding invalid response from {result.provider}: {str(e)}")
+            return False
+
+    async def _generate_hedged(self, request: LLMRequest, deadline: Deadline,
+                               validator: Optional[Callable[[str], Any]]) -> LLMResult:
+        """
+        Race a hedge against a slow (or invalid) primary response
+        The hedge starts once the primary has run for the hedge delay, or as
+        soon as the primary returns text that fails validation; the first valid
+        response wins and the other call is cancelled
+        """
+        self.hedging.on_request()
+        delay = self.hedging.delay()
+        primary = asyncio.ensure_future(self._generate(request, deadline))
+        hedge: Optional[asyncio.Future] = None
+        pending = {primary}
+        failures: List[Exception] = []
+        rejected: Optional[LLMResult] = None
+
+        try:
+            while pending:
+                timeout = delay if hedge is None else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedge = self._start_hedge(request, deadline)
+                    if hedge is None:
+                        delay = None
+                    else:
+                        pending.add(hedge)
+                    continue
+
+                for task in done:
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        failures.append(e)
+                        continue
+                    self.hedging.record(result.latency)
+                    if self._accept(result, validator):
+                        if hedge is not None:
+                            self.metrics.increment("hedge.won", winner="hedge" if task is hedge else "primary")
+                        return result
+                    rejected = rejected or result
+
+                if not pending and hedge is None and rejected is not None:
+                    hedge = self._start_hedge(request, deadline)
+                    if hedge is not None:
+                        pending.add(hedge)
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+        # Nothing valid: hand back the invalid text so the caller reports why
+        if rejected is not None:
+            return rejected
+        raise failures[0]
+
+    async def generate_response(self, prompt: str, deadline: Optional[Deadline] = None) -> str:
+        """
+        Generate response text - equivalent to Basic LLM Chain node
+        """
+        self.logger.info("Generating response using LLM providers")
+        result = await self.generate(prompt, deadline)
+        return result.text
+
+    async def stream_response(self, prompt: Union[str, LLMRequest],
+                              deadline: Optional[Deadline] = None,
+                              on_complete: Optional[Callable[[LLMResult], None]] = None) -> AsyncIterator[str]:
+        """
+        Stream response text as it is generated
+        Falls over to another provider only if the first fails before any text arrives;
+        on_complete receives the finished call with its usage
+        """
+        self.logger.info("Streaming response using LLM providers")
+        deadline = deadline or Deadline(self.settings.REQUEST_TIMEOUT)
+        request = LLMRequest.of(prompt)
+
+        async with self.limiter.slot(deadline):
+            async for text in self.router.stream(request, deadline, on_complete):
+                yield text
@@ -0,0 +1,150 @@
+"""
+Output Budget Model
+Picks maxOutputTokens and the per-attempt upstream timeout for a request from
+rolling percentiles of past output sizes and latencies, per game type and
+difficulty
+"""
+
+import math
+import re
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics, percentile
+
+logger = get_logger(__name__)
+
+BudgetKey = Tuple[Optional[str], Optional[str]]
+
+_DIFFICULTY_WORDS = {
+    "easy": re.compile(r"\b(easy|simple|beginners?|basic)\b", re.IGNORECASE),
+    "medium": re.compile(r"\b(medium|intermediate|moderate)\b", re.IGNORECASE),
+    "hard": re.compile(r"\b(hard|advanced|challenging|difficult|expert)\b", re.IGNORECASE),
+}
+
+
+def infer_difficulty(prompt: str) -> Optional[str]:
+    """Difficulty asked for in the prompt, if exactly one is mentioned"""
+    found = [difficulty for difficulty, pattern in _DIFFICULTY_WORDS.items() if pattern.search(prompt)]
+    return found[0] if len(found) == 1 else None
+
+
+class OutputBudget(BaseModel):
+    """Limits for one request"""
+    max_output_tokens: int
+    timeout: Optional[float] = None
+    samples: int = 0
+    key: str = "default"
+
+
+class OutputBudgetModel:
+    """
+    Rolling output-size and latency samples per (game type, difficulty)
+
+    Lookups fall back from (type, difficulty) to (type, any), (any, difficulty)
+    and (any, any) until a bucket has min_samples. The token budget is the
+    chosen percentile of output sizes times headroom, the timeout the same
+    percentile of call latency times timeout_headroom; with no usable history
+    the defaults apply
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        default_tokens: int = 4000,
+        window: int = 200,
+        min_samples: int = 10,
+        percentile: float = 99.0,
+        headroom: float = 1.3,
+        min_tokens: int = 1024,
+        max_tokens: int = 8192,
+        timeout_headroom: float = 1.5,
+        min_timeout: float = 10.0
+    ):
+        self.enabled = enabled
+        self.default_tokens = default_tokens
+        self.window = window
+        self.min_samples = min_samples
+        self.percentile = percentile
+        self.headroom = headroom
+        self.min_tokens = min_tokens
+        self.max_tokens = max(min_tokens, max_tokens)
+        self.timeout_headroom = timeout_headroom
+        self.min_timeout = min_timeout
+        self.tokens: Dict[BudgetKey, Deque[int]] = {}
+        self.latencies: Dict[BudgetKey, Deque[float]] = {}
+        self.logger = logger
+        self.metrics = get_metrics()
+
+    @classmethod
+    def from_settings(cls, settings: Any) -> "OutputBudgetModel":
+        return cls(
+            enabled=settings.OUTPUT_BUDGET_ENABLED,
+            default_tokens=settings.MAX_TOKENS,
+            window=settings.OUTPUT_BUDGET_WINDOW,
+            min_samples=settings.OUTPUT_BUDGET_MIN_SAMPLES,
+            percentile=settings.OUTPUT_BUDGET_PERCENTILE,
+            headroom=settings.OUTPUT_BUDGET_HEADROOM,
+            min_tokens=settings.OUTPUT_BUDGET_MIN_TOKENS,
+            max_tokens=settings.OUTPUT_BUDGET_MAX_TOKENS,
+            timeout_headroom=settings.OUTPUT_BUDGET_TIMEOUT_HEADROOM,
+            min_timeout=settings.OUTPUT_BUDGET_MIN_TIMEOUT
+        )
+
+    @staticmethod
+    def _keys(game_type: Optional[str], difficulty: Optional[str]) -> List[BudgetKey]:
+        """Buckets from most to least specific"""
+        keys = [(game_type, difficulty), (game_type, None), (None, difficulty), (None, None)]
+        return list(dict.fromkeys(keys))
+
+    def record(self, game_type: Optional[str], difficulty: Optional[str],
+               output_tokens: int, latency: Optional[float] = None) -> None:
+        """Add one generation's output size (and upstream latency) to every bucket it belongs to"""
+        for key in self._keys(game_type, difficulty):
+            self.tokens.setdefault(key, deque(maxlen=self.window)).append(output_tokens)
+            if latency is not None:
+                self.latencies.setdefault(key, deque(maxlen=self.window)).append(latency)
+
+    def record_truncated(self, game_type: Optional[str], difficulty: Optional[str], limit: int) -> None:
+        """
+        The output hit its token limit, so its real size is unknown
+        Record twice the limit so the next budget for this bucket grows
+        """
+        self.metrics.increment("output_budget.truncated", game_type=game_type or "any")
+        self.logger.warning(f"Output truncated at {limit} tokens for {game_type or 'any'}/{difficulty or 'any'}")
+        self.record(game_type, difficulty, min(self.max_tokens, limit * 2))
+
+    def budget(self, game_type: Optional[str], difficulty: Optional[str] = None) -> OutputBudget:
+        """Token limit and attempt timeout for a request"""
+        if not self.enabled:
+            return OutputBudget(max_output_tokens=self.default_tokens)
+
+        for key in self._keys(game_type, difficulty):
+            samples = self.tokens.get(key)
+            if not samples or len(samples) < self.min_samples:
+                continue
+            tokens = math.ceil(percentile(samples, self.percentile) * self.headroom)
+            timeout = None
+            latencies = self.latencies.get(key)
+            if latencies and len(latencies) >= self.min_samples:
+                timeout = max(self.min_timeout, percentile(latencies, self.percentile) * self.timeout_headroom)
+            return OutputBudget(
+                max_output_tokens=min(self.max_tokens, max(self.min_tokens, tokens)),
+                timeout=timeout,
+                samples=len(samples),
+                key=f"{key[0] or 'any'}/{key[1] or 'any'}"
+            )
+        return OutputBudget(max_output_tokens=self.default_tokens)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current budget per bucket with enough samples"""
+        budgets = {}
+        for game_type, difficulty in self.tokens:
+            budget = self.budget(game_type, difficulty)
+            label = f"{game_type or 'any'}/{difficulty or 'any'}"
+            if budget.key == label:
+                budgets[label] = budget.dict(exclude={"key"})
+        return {"enabled": self.enabled, "budgets": budgets}
@@ -5,9 +5,12 @@ Builds the comprehensive therapeutic prompt for AI game generation
 """
 
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+from app.core.config import get_settings
 from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
 from app.services.prompt_templates import PromptBuilder as ModularPromptBuilder
+from app.services.token_estimator import PromptSize, Section
 
 logger = get_logger(__name__)
 
@@ -15,15 +18,26 @@ logger = get_logger(__name__)
 class PromptBuilder:
     """Builds comprehensive therapeutic prompts for game generation"""
     
-    def __init__(self):
+    def __init__(self, token_budget: Optional[int] = None):
         self.logger = logger
+        self.metrics = get_metrics()
         self.modular_builder = ModularPromptBuilder()
+        self.template_version = self.modular_builder.template_version
+        if token_budget is None:
+            token_budget = get_settings().PROMPT_TOKEN_BUDGET
+        self.token_budget = token_budget or None
         
     def health_check(self) -> Dict[str, Any]:
         """Health check for prompt builder service"""
-        return {"status": "healthy", "service": "prompt_builder"}
+        return {
+            "status": "healthy",
+            "service": "prompt_builder",
+            "template_version": self.template_version,
+            "token_budget": self.token_budget,
+            "segments": {name: segment.version for name, segment in self.modular_builder.segments.items()}
+        }
     
-    def build_full_prompt(self, user_prompt: str) -> str:
+    def build_full_prompt(self, user_prompt: str, game_type: Optional[str] = None) -> str:
         """
         Build the full therapeutic prompt - equivalent to Edit Fields node
         Uses modular templates for better maintainability
@@ -31,9 +45,46 @@ class PromptBuilder:
         self.logger.info(f"Building full prompt for user request: {user_prompt[:100]}...")
         
         try:
-            full_prompt = self.modular_builder.build_full_prompt(user_prompt)
+            sections, size = self.fit(user_prompt, game_type)
+            if size.trimmed:
+                full_prompt = self.modular_builder.assemble(sections)
+            else:
+                full_prompt = self.modular_builder.build_full_prompt(user_prompt, game_type)
             self.logger.debug(f"Generated full prompt of length: {len(full_prompt)}")
             return full_prompt
         except Exception as e:
             self.logger.error(f"Failed to build prompt: {str(e)}")
-            raise Exception(f"Prompt building failed: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Prompt building failed: {str(e)}")
+    
+    def build_prompt_parts(self, user_prompt: str, game_type: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Build the prompt split into a static prefix and the per-request suffix
+        Used when the static prefix is sent as a provider-side cached context
+        """
+        self.logger.info(f"Building prompt parts for user request: {user_prompt[:100]}...")
+        
+        try:
+            sections, size = self.fit(user_prompt, game_type)
+            if size.trimmed:
+                return self.modular_builder.assemble_parts(sections)
+            return self.modular_builder.build_prompt_parts(user_prompt, game_type)
+        except Exception as e:
+            self.logger.error(f"Failed to build prompt: {str(e)}")
+            raise Exception(f"Prompt building failed: {str(e)}")
+    
+    def fit(self, user_prompt: str, game_type: Optional[str] = None) -> Tuple[List[Section], PromptSize]:
+        """
+        Prompt sections within PROMPT_TOKEN_BUDGET, recording the estimated size
+        Optional sections are compacted, then dropped, until the prompt fits
+        """
+        sections, size = self.modular_builder.fit(user_prompt, game_type, self.token_budget)
+        label = game_type or "auto"
+        self.metrics.observe("prompt.tokens", size.total, game_type=label)
+        if size.trimmed:
+            self.metrics.increment("prompt.trimmed", game_type=label)
+            self.logger.debug(f"Prompt trimmed to ~{size.total} tokens (compacted {size.compacted}, "
+                              f"dropped {size.dropped})")
+        if size.over_budget:
+            self.logger.warning(f"Prompt of ~{size.total} tokens is over the {self.token_budget} token budget "
+                                f"with every optional section dropped")
+        return sections, size
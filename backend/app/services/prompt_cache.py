@@ -0,0 +1,191 @@
+"""
+Prompt Prefix Cache
+Registers the static part of the game prompt as a provider-side cached
+context so each request only sends its per-request suffix
+"""
+
+import asyncio
+import hashlib
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+from app.services.llm_providers import CachedContext, LLMProvider
+
+logger = get_logger(__name__)
+
+CacheKey = Tuple[str, str, str]
+
+
+class PromptPrefixCache:
+    """
+    Keeps one cached context per (provider, model, prefix)
+
+    - Created lazily on first use, under a per-key lock so concurrent
+      requests do not create duplicates
+    - Refreshed once it is within refresh_margin of expiry, both on use and
+      by a background task so an idle service does not let it lapse
+    - Any failure falls back to sending the full prompt; creation is not
+      retried until retry_interval has passed
+    """
+
+    def __init__(
+        self,
+        ttl: float = 3600,
+        refresh_margin: float = 300,
+        retry_interval: float = 600,
+        enabled: bool = True
+    ):
+        self.ttl = ttl
+        self.refresh_margin = min(refresh_margin, ttl / 2)
+        self.retry_interval = retry_interval
+        self.enabled = enabled
+        self._contexts: Dict[CacheKey, CachedContext] = {}
+        self._sources: Dict[CacheKey, Tuple[LLMProvider, str]] = {}
+        self._locks: Dict[CacheKey, asyncio.Lock] = {}
+        self._failed_until: Dict[CacheKey, float] = {}
+        self._refresher: Optional[asyncio.Task] = None
+        self.logger = logger
+        self.metrics = get_metrics()
+
+    @classmethod
+    def from_settings(cls, settings: Any) -> "PromptPrefixCache":
+        return cls(
+            ttl=settings.PROMPT_CACHE_TTL,
+            refresh_margin=settings.PROMPT_CACHE_REFRESH_MARGIN,
+            retry_interval=settings.PROMPT_CACHE_RETRY_INTERVAL,
+            enabled=settings.PROMPT_CACHE_ENABLED
+        )
+
+    @staticmethod
+    def _key(provider: LLMProvider, prefix: str) -> CacheKey:
+        digest = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        return provider.name, provider.model, digest
+
+    def _is_fresh(self, context: Optional[CachedContext]) -> bool:
+        return context is not None and context.expires_at - time.time() > self.refresh_margin
+
+    async def get(self, provider: LLMProvider, prefix: str, timeout: float = 10.0) -> Optional[CachedContext]:
+        """Return a usable cached context for the prefix, or None to send the full prompt"""
+        if not self.enabled or not provider.supports_context_cache:
+            return None
+
+        key = self._key(provider, prefix)
+        context = self._contexts.get(key)
+        if self._is_fresh(context):
+            self.metrics.increment("prompt_cache.hits", provider=provider.name)
+            return context
+        if time.time() < self._failed_until.get(key, 0.0):
+            return None
+
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            context = self._contexts.get(key)
+            if self._is_fresh(context):
+                self.metrics.increment("prompt_cache.hits", provider=provider.name)
+                return context
+            context = await self._renew(key, provider, prefix, context, timeout)
+
+        self._ensure_refresher()
+        return context
+
+    async def _renew(self, key: CacheKey, provider: LLMProvider, prefix: str,
+                     context: Optional[CachedContext], timeout: float) -> Optional[CachedContext]:
+        """Refresh a live context or create a new one; None on failure"""
+        alive = context is not None and context.expires_at > time.time()
+        try:
+            if alive:
+                try:
+                    context = await provider.refresh_cached_context(context, self.ttl, timeout)
+                    if context is None:
+                        raise ValueError("provider returned no cached context")
+                    self.metrics.increment("prompt_cache.refreshes", provider=provider.name)
+                except Exception as e:
+                    # The old context may already be gone upstream: start over
+                    self.logger.warning(f"Refreshing cached prompt on {provider.name} failed, recreating: {str(e)}")
+                    context = await provider.create_cached_context(prefix, self.ttl, timeout)
+                    if context is None:
+                        raise ValueError("provider returned no cached context")
+                    self.metrics.increment("prompt_cache.creates", provider=provider.name)
+            else:
+                context = await provider.create_cached_context(prefix, self.ttl, timeout)
+                if context is None:
+                    raise ValueError("provider returned no cached context")
+                self.metrics.increment("prompt_cache.creates", provider=provider.name)
+                self.logger.info(f"Registered cached prompt prefix on {provider.name}: {context.name}")
+        except Exception as e:
+            self.logger.warning(f"Prompt prefix caching unavailable on {provider.name}, sending full prompt: {str(e)}")
+            self.metrics.increment("prompt_cache.failures", provider=provider.name)
+            self._failed_until[key] = time.time() + self.retry_interval
+            self._contexts.pop(key, None)
+            return None
+
+        self._contexts[key] = context
+        self._sources[key] = (provider, prefix)
+        self._failed_until.pop(key, None)
+        return context
+
+    def invalidate_name(self, name: str) -> None:
+        """Forget a context the provider no longer recognises"""
+        for key, cached in list(self._contexts.items()):
+            if cached.name == name:
+                del self._contexts[key]
+                self.metrics.increment("prompt_cache.invalidations", provider=cached.provider)
+
+    async def refresh_expiring(self) -> int:
+        """Renew every known context that is close to expiry"""
+        renewed = 0
+        for key, (provider, prefix) in list(self._sources.items()):
+            if self._is_fresh(self._contexts.get(key)):
+                continue
+            if await self.get(provider, prefix) is not None:
+                renewed += 1
+        return renewed
+
+    def _ensure_refresher(self) -> None:
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self) -> None:
+        interval = max(1.0, self.refresh_margin / 2)
+        while self._sources:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh_expiring()
+            except Exception as e:
+                self.logger.error(f"Background prompt cache refresh failed: {str(e)}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "contexts": [
+                {
+                    "provider": context.provider,
+                    "model": context.model,
+                    "name": context.name,
+                    "expires_in": round(context.expires_at - time.time(), 1),
+                }
+                for context in self._contexts.values()
+            ],
+        }
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """Stop refreshing and delete the contexts so they stop accruing storage"""
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._refresher = None
+
+        for key, context in list(self._contexts.items()):
+            provider, _ = self._sources[key]
+            if not provider.supports_context_cache:
+                continue
+            try:
+                await provider.delete_cached_context(context, timeout)
+            except Exception as e:
+                self.logger.warning(f"Could not delete cached prompt {context.name}: {str(e)}")
+        self._contexts.clear()
+        self._sources.clear()
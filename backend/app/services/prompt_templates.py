@@ -3,9 +3,12 @@ Prompt Templates for GameGPT Backend
 Modular prompt building with reusable templates
 """
 
-from typing import Dict, Any, List
+import hashlib
+from typing import Dict, List, NamedTuple, Optional, Tuple
 from enum import Enum
 
+from app.services.token_estimator import PromptSize, Section, compact, estimate_tokens, fit_sections
+
 
 class GameType(Enum):
     """Supported game types"""
@@ -395,46 +398,140 @@ OUTPUT REQUIREMENT:
 Return ONLY the JSON object. No markdown code blocks, no explanations, no additional text. Just pure, valid JSON that can be parsed immediately by the frontend game engine."""
 
 
+class PromptSegment(NamedTuple):
+    """One static prompt section with the content hash it was compiled from"""
+    name: str
+    text: str
+    version: str
+
+
+def _content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+
 class PromptBuilder:
-    """Builds comprehensive therapeutic prompts using modular templates"""
+    """
+    Builds comprehensive therapeutic prompts using modular templates
+
+    Every static section is compiled once into immutable segments; a prompt is
+    then the pre-joined text before the user request, the per-request section
+    (the only substitution slot) and the pre-joined text after it. When the
+    game type is known the tail carries only that type's description and
+    content template
+    """
+    
+    # Static sections before and after the user request, in prompt order
+    HEAD_SECTIONS = ("system", "therapeutic_foundations", "game_mechanics_mapping", "implementation_strategy")
+    TAIL_SECTIONS = ("analysis_requirements", "game_type_selection", "json_schema", "content_templates",
+                     "therapeutic_guidelines", "output_requirements")
+    
+    # Sections that may be compacted, then dropped, to meet a token budget; first goes first
+    OPTIONAL_SECTIONS = ("implementation_strategy", "game_mechanics_mapping", "therapeutic_foundations",
+                         "analysis_requirements", "therapeutic_guidelines")
     
     def __init__(self):
         self.templates = PromptTemplates()
+        self.segments = self._compile_segments()
+        head = "\n\n".join(self.segments[name].text for name in self.HEAD_SECTIONS)
+        self._head = head + "\n\n\n"
+        self._tails: Dict[Optional[str], str] = {}
+        self._prefixes: Dict[Optional[str], str] = {}
+        for game_type in [None] + [game_type.value for game_type in self.templates.CONTENT_TEMPLATES]:
+            tail = "\n\n".join(self._segment(name, game_type).text for name in self.TAIL_SECTIONS)
+            self._tails[game_type] = "\n\n" + tail
+            self._prefixes[game_type] = head + "\n\n" + tail
+        self._tokens = {name: estimate_tokens(segment.text) for name, segment in self.segments.items()}
+        self._compacted = {name: compact(self.segments[name].text) for name in self.OPTIONAL_SECTIONS}
+        self.template_version = self._compute_template_version()
+    
+    def _compile_segments(self) -> Dict[str, PromptSegment]:
+        texts = {
+            "system": self.templates.SYSTEM_PROMPT,
+            "therapeutic_foundations": self.templates.THERAPEUTIC_FOUNDATIONS,
+            "game_mechanics_mapping": self.templates.GAME_MECHANICS_MAPPING,
+            "implementation_strategy": self.templates.IMPLEMENTATION_STRATEGY,
+            "analysis_requirements": self.templates.ANALYSIS_REQUIREMENTS,
+            "game_type_selection": self._build_game_type_selection(),
+            "json_schema": self.templates.JSON_SCHEMA_TEMPLATE,
+            "content_templates": self._build_content_templates(),
+            "therapeutic_guidelines": self.templates.THERAPEUTIC_GUIDELINES,
+            "output_requirements": self.templates.OUTPUT_REQUIREMENTS,
+        }
+        for game_type in self.templates.CONTENT_TEMPLATES:
+            texts[f"game_type_selection:{game_type.value}"] = self._build_game_type_selection(game_type)
+            texts[f"content_templates:{game_type.value}"] = self._build_content_templates(game_type)
+        return {name: PromptSegment(name, text, _content_hash(text)) for name, text in texts.items()}
+    
+    def _segment(self, name: str, game_type: Optional[str]) -> PromptSegment:
+        """The per-type variant of a section when there is one"""
+        return self.segments.get(f"{name}:{game_type}", self.segments[name])
+    
+    def _compute_template_version(self) -> str:
+        """Short content hash of everything in the prompt except the user text, over every type variant"""
+        return _content_hash("\x00".join(self.build_full_prompt("\x00", game_type) for game_type in self._tails))
+    
+    def build_full_prompt(self, user_prompt: str, game_type: Optional[str] = None) -> str:
+        """Build the complete prompt from the compiled segments"""
+        tail = self._tails.get(game_type, self._tails[None])
+        return self._head + self._build_user_request(user_prompt, game_type) + tail
+    
+    def build_prompt_parts(self, user_prompt: str, game_type: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Build the prompt as (static_prefix, request_suffix)
+        The prefix holds every static section and is identical across requests
+        for the same game type, so it can be registered once as a provider-side
+        cached context
+        """
+        prefix = self._prefixes.get(game_type, self._prefixes[None])
+        return prefix, self._build_user_request(user_prompt, game_type)
+    
+    def sections(self, user_prompt: str, game_type: Optional[str] = None) -> List[Section]:
+        """The prompt as (section name, text) in order, with the user request in its slot"""
+        variant = game_type if game_type in self._tails else None
+        head = [(name, self.segments[name].text) for name in self.HEAD_SECTIONS]
+        tail = [(name, self._segment(name, variant).text) for name in self.TAIL_SECTIONS]
+        return head + [("user_request", self._build_user_request(user_prompt, game_type))] + tail
+    
+    def fit(self, user_prompt: str, game_type: Optional[str] = None,
+            budget: Optional[int] = None) -> Tuple[List[Section], PromptSize]:
+        """
+        Sections of the prompt within an input token budget, and their estimated sizes
+        Optional sections are compacted, then dropped, in OPTIONAL_SECTIONS order
+        """
+        variant = game_type if game_type in self._tails else None
+        tokens = {name: self._tokens[self._segment(name, variant).name] for name in self.HEAD_SECTIONS + self.TAIL_SECTIONS}
+        return fit_sections(self.sections(user_prompt, game_type), budget, self.OPTIONAL_SECTIONS,
+                            tokens=tokens, compacted=self._compacted)
+    
+    def assemble(self, sections: List[Section]) -> str:
+        """Full prompt from a (possibly trimmed) section list"""
+        slot = [name for name, _ in sections].index("user_request")
+        head = "\n\n".join(text for _, text in sections[:slot])
+        tail = "\n\n".join(text for _, text in sections[slot + 1:])
+        return head + "\n\n\n" + sections[slot][1] + "\n\n" + tail
+    
+    def assemble_parts(self, sections: List[Section]) -> Tuple[str, str]:
+        """(static prefix, request suffix) from a (possibly trimmed) section list"""
+        prefix = "\n\n".join(text for name, text in sections if name != "user_request")
+        return prefix, dict(sections)["user_request"]
     
-    def build_full_prompt(self, user_prompt: str) -> str:
-        """Build the complete prompt using modular templates"""
-        
-        # Build the full prompt by combining all sections
-        prompt_sections = [
-            self.templates.SYSTEM_PROMPT,
-            self.templates.THERAPEUTIC_FOUNDATIONS,
-            self.templates.GAME_MECHANICS_MAPPING,
-            self.templates.IMPLEMENTATION_STRATEGY,
-            f"\nUser Request: {user_prompt}",
-            self.templates.ANALYSIS_REQUIREMENTS,
-            self._build_game_type_selection(),
-            self.templates.JSON_SCHEMA_TEMPLATE,
-            self._build_content_templates(),
-            self.templates.THERAPEUTIC_GUIDELINES,
-            self.templates.OUTPUT_REQUIREMENTS
-        ]
-        
-        return "\n\n".join(prompt_sections)
+    def _build_user_request(self, user_prompt: str, game_type: Optional[str] = None) -> str:
+        """Build the per-request section, pinning the game type when the caller chose one"""
+        if game_type:
+            return f"User Request: {user_prompt}\nRequired Game Type: {game_type} (use this type and its content template)"
+        return f"User Request: {user_prompt}"
     
-    def _build_game_type_selection(self) -> str:
-        """Build the game type selection section"""
-        game_types_text = "GAME TYPE SELECTION\n\nChoose the most appropriate type:\n\n"
-        
-        for game_type, description in self.templates.GAME_TYPE_DESCRIPTIONS.items():
-            game_types_text += f"{game_type.value} - {description}\n\n"
-        
-        return game_types_text
+    def _build_game_type_selection(self, game_type: Optional[GameType] = None) -> str:
+        """Build the game type selection section (compiled once), or the chosen type's line"""
+        if game_type is not None:
+            return f"GAME TYPE\n\n{game_type.value} - {self.templates.GAME_TYPE_DESCRIPTIONS[game_type]}\n\n"
+        lines = [f"{game_type.value} - {description}\n\n"
+                 for game_type, description in self.templates.GAME_TYPE_DESCRIPTIONS.items()]
+        return "GAME TYPE SELECTION\n\nChoose the most appropriate type:\n\n" + "".join(lines)
     
-    def _build_content_templates(self) -> str:
-        """Build content structure templates for all game types"""
-        content_section = "CONTENT STRUCTURES BY GAME TYPE\n\n"
-        
-        for game_type, template in self.templates.CONTENT_TEMPLATES.items():
-            content_section += template + "\n\n"
-        
-        return content_section
+    def _build_content_templates(self, game_type: Optional[GameType] = None) -> str:
+        """Build content structure templates for all game types, or the chosen type's (compiled once)"""
+        if game_type is not None:
+            return "CONTENT STRUCTURE\n\n" + self.templates.CONTENT_TEMPLATES[game_type] + "\n\n"
+        templates = [template + "\n\n" for template in self.templates.CONTENT_TEMPLATES.values()]
+        return "CONTENT STRUCTURES BY GAME TYPE\n\n" + "".join(templates)
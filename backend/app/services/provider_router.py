@@ -0,0 +1,321 @@
+"""
+Provider Router
+Routes each LLM call to the healthiest, fastest provider using EWMA
+latency and error rates, with a circuit breaker per provider
+"""
+
+import time
+from typing import Dict, Any, List, Optional, AsyncIterator, Callable, Union
+
+from app.core.deadline import Deadline
+from app.core.exceptions import ExternalServiceException, ServiceException, ErrorCode
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+from app.core.retry import retry_reason
+from app.services.llm_providers import LLMProvider, LLMRequest, LLMResult
+from app.services.prompt_cache import PromptPrefixCache
+
+logger = get_logger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Classic three-state circuit breaker
+
+    closed    -> requests flow; consecutive failures are counted
+    open      -> requests are rejected until the recovery timeout elapses
+    half_open -> a single probe request is let through; success closes
+                 the circuit, failure re-opens it
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent (claims the probe slot when half-open)"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def is_available(self) -> bool:
+        """Non-mutating check used for ranking and health reporting"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            return time.monotonic() - self.opened_at >= self.recovery_timeout
+        return not self._probe_in_flight
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+        self._probe_in_flight = False
+
+    def release(self) -> None:
+        """Release a claimed probe slot without recording an outcome"""
+        self._probe_in_flight = False
+
+
+class ProviderStats:
+    """Exponentially weighted latency and error rate for one provider"""
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.requests = 0
+
+    def record(self, latency: float, success: bool) -> None:
+        self.requests += 1
+        if success:
+            self.latency = latency if self.latency is None else (
+                self.alpha * latency + (1 - self.alpha) * self.latency
+            )
+        self.error_rate = self.alpha * (0.0 if success else 1.0) + (1 - self.alpha) * self.error_rate
+
+    def score(self, error_penalty: float) -> float:
+        """Lower is better; unmeasured providers score 0 so they get explored"""
+        if self.latency is None:
+            return 0.0
+        return self.latency * (1 + error_penalty * self.error_rate)
+
+
+class ProviderRouter:
+    """Chooses a provider per request and fails over on provider errors"""
+
+    def __init__(self, providers: List[LLMProvider], settings: Any,
+                 prompt_cache: Optional[PromptPrefixCache] = None):
+        self.settings = settings
+        self.prompt_cache = prompt_cache
+        self.logger = logger
+        self.metrics = get_metrics()
+        self.providers = [provider for provider in providers if provider.enabled]
+        self.error_penalty = settings.ROUTER_ERROR_PENALTY
+        self.stats: Dict[str, ProviderStats] = {
+            provider.name: ProviderStats(settings.ROUTER_EWMA_ALPHA) for provider in self.providers
+        }
+        self.breakers: Dict[str, CircuitBreaker] = {
+            provider.name: CircuitBreaker(settings.CIRCUIT_FAILURE_THRESHOLD, settings.CIRCUIT_RECOVERY_TIMEOUT)
+            for provider in self.providers
+        }
+
+    def ranked(self, exclude: Optional[List[str]] = None) -> List[LLMProvider]:
+        """Available providers ordered best-first (configured order breaks ties)"""
+        exclude = exclude or []
+        candidates = [
+            provider for provider in self.providers
+            if provider.name not in exclude and self.breakers[provider.name].is_available()
+        ]
+        return sorted(candidates, key=lambda provider: self.stats[provider.name].score(self.error_penalty))
+
+    def _record(self, provider: LLMProvider, latency: float, error: Optional[Exception] = None) -> None:
+        stats = self.stats[provider.name]
+        breaker = self.breakers[provider.name]
+
+        if error is None:
+            stats.record(latency, success=True)
+            breaker.record_success()
+            outcome = "success"
+        elif self._is_provider_failure(error):
+            stats.record(latency, success=False)
+            breaker.record_failure()
+            outcome = "failure"
+        else:
+            # Request-level errors (e.g. 400) say nothing about provider health
+            breaker.release()
+            outcome = "rejected"
+
+        self.metrics.increment("router.requests", provider=provider.name, outcome=outcome)
+        self.metrics.set_gauge("router.ewma_latency", stats.latency or 0.0, provider=provider.name)
+        self.metrics.set_gauge("router.error_rate", round(stats.error_rate, 4), provider=provider.name)
+        self.metrics.set_gauge("router.circuit_open", int(breaker.state != CircuitBreaker.CLOSED), provider=provider.name)
+
+    @staticmethod
+    def _is_provider_failure(error: Exception) -> bool:
+        if retry_reason(error) is not None:
+            return True
+        status_code = getattr(error, "details", {}).get("external_status_code")
+        return status_code in (401, 403)
+
+    def _unavailable(self) -> Exception:
+        if not self.providers:
+            return ExternalServiceException(
+                message="No LLM provider configured",
+                error_code=ErrorCode.CONFIGURATION_ERROR,
+                service_name="llm",
+                details={"operation": "generate_response", "providers": self.settings.LLM_PROVIDERS}
+            )
+        return ServiceException(
+            message="All LLM providers are unavailable (circuit open)",
+            error_code=ErrorCode.PROVIDERS_UNAVAILABLE,
+            service_name="llm",
+            details={"breakers": {name: breaker.state for name, breaker in self.breakers.items()}}
+        )
+
+    async def _with_cached_prefix(self, provider: LLMProvider, request: LLMRequest, deadline: Deadline) -> LLMRequest:
+        """Point the request at the provider's cached prefix when one is available"""
+        if self.prompt_cache is None or not request.prefix:
+            return request
+        context = await self.prompt_cache.get(provider, request.prefix, timeout=deadline.remaining())
+        if context is None:
+            return request
+        return request.model_copy(update={"cached_context": context.name})
+
+    def _cached_context_rejected(self, request: LLMRequest, error: Exception) -> bool:
+        """
+        A 400/404 on a cached request usually means the context expired upstream
+        (a 403 is a bad key, which is a provider failure, not a stale context)
+        """
+        if not request.cached_context or self.prompt_cache is None:
+            return False
+        return getattr(error, "details", {}).get("external_status_code") in (400, 404)
+
+    @staticmethod
+    def _call_timeout(request: LLMRequest, deadline: Deadline) -> float:
+        """Per-attempt upstream timeout: the request's own budget, never past the deadline"""
+        if request.timeout is None:
+            return deadline.remaining()
+        return min(request.timeout, deadline.remaining())
+
+    async def _generate_with(self, provider: LLMProvider, request: LLMRequest, deadline: Deadline) -> LLMResult:
+        cached_request = await self._with_cached_prefix(provider, request, deadline)
+        try:
+            return await provider.generate(cached_request, timeout=self._call_timeout(request, deadline))
+        except Exception as error:
+            if not self._cached_context_rejected(cached_request, error):
+                raise
+            self.logger.warning(f"{provider.name} rejected cached prompt prefix, resending full prompt")
+            self.prompt_cache.invalidate_name(cached_request.cached_context)
+            return await provider.generate(request, timeout=self._call_timeout(request, deadline))
+
+    async def _stream_with(self, provider: LLMProvider, request: LLMRequest, deadline: Deadline,
+                           usage: Dict[str, int], outcome: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream from one provider; a rejected cached prefix is resent in full if nothing was yielded yet"""
+        cached_request = await self._with_cached_prefix(provider, request, deadline)
+        received_any = False
+        try:
+            async for text in provider.stream(cached_request, timeout=self._call_timeout(request, deadline),
+                                              usage=usage, outcome=outcome):
+                received_any = True
+                yield text
+            return
+        except Exception as error:
+            if received_any or not self._cached_context_rejected(cached_request, error):
+                raise
+            self.logger.warning(f"{provider.name} rejected cached prompt prefix, resending full prompt")
+            self.prompt_cache.invalidate_name(cached_request.cached_context)
+        async for text in provider.stream(request, timeout=self._call_timeout(request, deadline),
+                                          usage=usage, outcome=outcome):
+            yield text
+
+    async def generate(self, request: Union[str, LLMRequest], deadline: Deadline,
+                       exclude: Optional[List[str]] = None) -> LLMResult:
+        """Send the request to the best provider, failing over to the next on provider errors"""
+        request = LLMRequest.of(request)
+        last_error: Optional[Exception] = None
+
+        for index, provider in enumerate(self.ranked(exclude)):
+            if not self.breakers[provider.name].allow_request():
+                continue
+            deadline.check(stage="llm")
+            if index > 0:
+                self.metrics.increment("router.failovers", provider=provider.name)
+                self.logger.info(f"Failing over to provider {provider.name}")
+
+            started = time.monotonic()
+            try:
+                result = await self._generate_with(provider, request, deadline)
+            except Exception as error:
+                self._record(provider, time.monotonic() - started, error)
+                if not self._is_provider_failure(error):
+                    raise
+                last_error = error
+                continue
+            except BaseException:
+                # Cancellation: free a half-open probe slot without judging the provider
+                self.breakers[provider.name].release()
+                raise
+
+            self._record(provider, result.latency)
+            return result
+
+        raise last_error or self._unavailable()
+
+    async def stream(self, request: Union[str, LLMRequest], deadline: Deadline,
+                     on_complete: Optional[Callable[[LLMResult], None]] = None) -> AsyncIterator[str]:
+        """
+        Stream from the best provider; failover is only possible before the first token
+        on_complete receives the finished call (full text, provider, latency, usage, finish reason)
+        """
+        request = LLMRequest.of(request)
+        last_error: Optional[Exception] = None
+
+        for provider in self.ranked():
+            if not self.breakers[provider.name].allow_request():
+                continue
+            deadline.check(stage="llm")
+
+            started = time.monotonic()
+            received_any = False
+            chunks: List[str] = []
+            usage: Dict[str, int] = {}
+            outcome: Dict[str, Any] = {}
+            try:
+                async for text in self._stream_with(provider, request, deadline, usage, outcome):
+                    received_any = True
+                    chunks.append(text)
+                    yield text
+            except Exception as error:
+                self._record(provider, time.monotonic() - started, error)
+                if received_any or not self._is_provider_failure(error):
+                    raise
+                last_error = error
+                continue
+            except BaseException:
+                self.breakers[provider.name].release()
+                raise
+
+            latency = time.monotonic() - started
+            self._record(provider, latency)
+            if on_complete is not None:
+                on_complete(LLMResult(text="".join(chunks), provider=provider.name, model=provider.model,
+                                      latency=latency, usage=usage, finish_reason=outcome.get("finish_reason")))
+            return
+
+        raise last_error or self._unavailable()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Per-provider routing state for health and stats endpoints"""
+        return {
+            provider.name: {
+                "model": provider.model,
+                "circuit": self.breakers[provider.name].state,
+                "ewma_latency": self.stats[provider.name].latency,
+                "error_rate": round(self.stats[provider.name].error_rate, 4),
+                "requests": self.stats[provider.name].requests,
+            }
+            for provider in self.providers
+        }
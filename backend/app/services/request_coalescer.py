@@ -0,0 +1,80 @@
+"""
+Request Coalescer
+Single-flight execution: concurrent callers with the same key share one
+in-flight operation and its result (or exception)
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class _Flight:
+    """One shared in-flight operation and the number of callers awaiting it"""
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+
+class RequestCoalescer:
+    """
+    Coalesces concurrent identical operations
+
+    The operation runs in its own task, so cancelling any one caller
+    (e.g. a client disconnect) does not cancel the shared work. The task
+    is only cancelled once every caller waiting on it has gone away.
+    """
+
+    def __init__(self, name: str = "coalescer"):
+        self.name = name
+        self.logger = logger
+        self.metrics = get_metrics()
+        self._flights: Dict[str, _Flight] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def waiters(self, key: str) -> int:
+        flight = self._flights.get(key)
+        return flight.waiters if flight else 0
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """Run factory() once per key among concurrent callers and share its outcome"""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task, key=key, flight=flight: self._finish(key, flight))
+            self.metrics.increment("coalescer.leaders", coalescer=self.name)
+        else:
+            self.metrics.increment("coalescer.followers", coalescer=self.name)
+            self.logger.debug(f"{self.name}: joining in-flight request {key[:12]} ({flight.waiters} waiting)")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Last interested caller went away: abandon the shared work
+                self.metrics.increment("coalescer.abandoned", coalescer=self.name)
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def _finish(self, key: str, flight: _Flight) -> None:
+        self._forget(key, flight)
+        if not flight.task.cancelled():
+            # Mark the exception as retrieved even when no caller is left to see it
+            flight.task.exception()
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
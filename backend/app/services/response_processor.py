@@ -5,21 +5,31 @@ Processes and validates LLM responses into game schemas
 """
 
 import json
-import re
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
 from app.models.game_schemas import GameSchema
 from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+from app.services import json_repair
+
+try:
+    import orjson
+except ImportError:  # optional: the fast path falls back to the stdlib decoder
+    orjson = None
 
 logger = get_logger(__name__)
 
+# Decoder for the fast path; both raise ValueError on anything but strict JSON
+_loads = orjson.loads if orjson is not None else json.loads
+
 
 class ResponseProcessor:
     """Processes LLM responses into validated game schemas"""
     
     def __init__(self):
         self.logger = logger
+        self.metrics = get_metrics()
     
     def health_check(self) -> Dict[str, Any]:
         """Health check for response processor service"""
@@ -33,14 +43,18 @@ class ResponseProcessor:
         self.logger.info("Processing LLM response...")
         
         try:
-            # Clean up potential markdown code fences (exact logic from n8n Code node)
-            cleaned_text = self._clean_markdown_fences(raw_response)
+            # Well-formed responses are decoded and validated in one step
+            game_schema = self._parse_game(raw_response)
             
-            # Parse the cleaned text into a real JSON object
-            json_data = self._parse_json(cleaned_text)
-            
-            # Validate and convert to GameSchema
-            game_schema = self._validate_game_schema(json_data)
+            if game_schema is None:
+                # Extract (and if needed repair) the JSON object
+                json_data = self._parse_json(raw_response)
+                
+                # Validate and convert to GameSchema
+                game_schema = self._validate_game_schema(json_data)
+                self.metrics.increment("response.parse", path="repair")
+            else:
+                self.metrics.increment("response.parse", path="fast")
             
             self.logger.info(f"Successfully processed response into game: {game_schema.id}")
             return game_schema
@@ -53,162 +67,43 @@ class ResponseProcessor:
             self.logger.error(f"Full traceback: {traceback.format_exc()}")
             raise Exception(f"Failed to process LLM response: {str(e)}")
     
-    def _clean_markdown_fences(self, raw_text: str) -> str:
+    def _parse_game(self, raw_text: str) -> Optional[GameSchema]:
         """
-        Clean up potential markdown code fences
-        Exact logic from n8n Code node
+        Fast path: parse a well-formed response straight into GameSchema
+        The compiled decoder (orjson when installed) and pydantic-core validation,
+        with none of the repair path's checks and fix-ups. Returns None when the
+        response needs the repair path instead (fences, chatter, broken JSON,
+        or values the repair path clamps)
         """
-        self.logger.debug("Cleaning markdown fences from response...")
-        
-        # Remove leading/trailing whitespace
-        raw_text = raw_text.strip()
-        
-        # Handle ```json and ``` fences (exact logic from n8n)
-        if raw_text.startswith("```json"):
-            raw_text = raw_text[7:-3].strip()  # Remove ```json from start and ``` from end
-        elif raw_text.startswith("```"):
-            raw_text = raw_text[3:-3].strip()   # Remove ``` from start and end
-        
-        # Additional cleaning for other common LLM artifacts
-        raw_text = self._remove_additional_artifacts(raw_text)
-        
-        return raw_text
-    
-    def _remove_additional_artifacts(self, text: str) -> str:
-        """Remove additional LLM response artifacts"""
-        # Remove common prefixes
-        prefixes_to_remove = [
-            "Here's the JSON:",
-            "Here is the JSON:",
-            "JSON:",
-            "Response:",
-            "Game:",
-            "```json",
-            "```"
-        ]
-        
-        for prefix in prefixes_to_remove:
-            if text.startswith(prefix):
-                text = text[len(prefix):].strip()
-        
-        # Remove common suffixes
-        suffixes_to_remove = [
-            "```",
-            "End of JSON",
-            "That's it!",
-            "Hope this helps!"
-        ]
-        
-        for suffix in suffixes_to_remove:
-            if text.endswith(suffix):
-                text = text[:-len(suffix)].strip()
-        
-        # Remove any remaining markdown artifacts
-        text = re.sub(r'^```[a-zA-Z]*\n?', '', text)  # Remove opening code blocks
-        text = re.sub(r'\n?```$', '', text)           # Remove closing code blocks
-        
-        return text
+        try:
+            return GameSchema.model_validate(_loads(raw_text))
+        except (ValueError, TypeError) as e:
+            # ValidationError is a ValueError
+            self.logger.debug(f"Fast path declined, repairing: {str(e)[:200]}")
+            return None
     
-    def _parse_json(self, cleaned_text: str) -> Dict[str, Any]:
-        """Parse cleaned text into JSON object"""
-        self.logger.debug("Parsing cleaned text as JSON...")
+    def _parse_json(self, raw_text: str) -> Dict[str, Any]:
+        """
+        Extract the JSON object from the response and parse it
+        Fences, chatter and common LLM mistakes are repaired in a single pass
+        (see app/services/json_repair.py); each repair is counted in /stats
+        """
+        self.logger.debug("Parsing response as JSON...")
         
         try:
-            json_data = json.loads(cleaned_text)
-            return json_data
-        except json.JSONDecodeError as e:
+            json_data, repairs = json_repair.loads(raw_text)
+        except ValueError as e:
             self.logger.error(f"JSON parsing failed: {str(e)}")
-            self.logger.debug(f"Problematic text (first 500 chars): {cleaned_text[:500]}")
-            
-            # Attempt to fix common JSON issues
-            fixed_text = self._attempt_json_fix(cleaned_text)
-            try:
-                return json.loads(fixed_text)
-            except json.JSONDecodeError as e2:
-                self.logger.error(f"JSON fix also failed: {str(e2)}")
-                raise Exception(f"Invalid JSON in LLM response: {str(e)}")
-    
-    def _attempt_json_fix(self, text: str) -> str:
-        """Attempt to fix common JSON formatting issues"""
-        self.logger.debug("Attempting to fix JSON formatting issues...")
-        
-        # First, try to extract JSON from markdown if present
-        text = self._extract_json_from_markdown(text)
-        
-        # Common fixes - apply in order of specificity
-        fixes = [
-            # Fix double curly braces (common LLM issue) - do this first
-            (r'\{\{', r'{'),
-            (r'\}\}', r'}'),
-            # Fix boolean values (Python style to JSON)
-            (r':\s*True\b', ': true'),
-            (r':\s*False\b', ': false'),
-            (r':\s*None\b', ': null'),
-            # Fix trailing commas
-            (r',(\s*[}\]])', r'\1'),
-            # Fix missing commas between objects
-            (r'}(\s*){', r'},\1{'),
-            # Fix missing commas between array elements
-            (r'}(\s*)\[', r'},\1['),
-            (r'\](\s*){', r'],\1{'),
-        ]
-        
-        for pattern, replacement in fixes:
-            text = re.sub(pattern, replacement, text)
-        
-        # Additional cleaning
-        text = self._clean_json_text(text)
-        
-        return text
-    
-    def _extract_json_from_markdown(self, text: str) -> str:
-        """Extract JSON from markdown code blocks"""
-        # Look for JSON in code blocks with more flexible matching
-        json_patterns = [
-            r'```(?:json)?\s*(\{.*?\})\s*```',  # Standard markdown
-            r'```json\s*(\{.*?\})\s*```',        # Explicit json
-            r'```\s*(\{.*?\})\s*```',            # Generic code block
-        ]
-        
-        for pattern in json_patterns:
-            match = re.search(pattern, text, re.DOTALL)
-            if match:
-                return match.group(1)
-        
-        # Look for JSON without code blocks but with extra text
-        json_start = text.find('{')
-        json_end = text.rfind('}')
-        if json_start != -1 and json_end != -1 and json_end > json_start:
-            return text[json_start:json_end + 1]
+            self.logger.debug(f"Problematic text (first 500 chars): {raw_text[:500]}")
+            raise Exception(f"Invalid JSON in LLM response: {str(e)}")
         
-        return text
-    
-    def _clean_json_text(self, text: str) -> str:
-        """Clean up common JSON text issues"""
-        # Remove any leading/trailing whitespace
-        text = text.strip()
-        
-        # Remove any text before the first {
-        first_brace = text.find('{')
-        if first_brace > 0:
-            text = text[first_brace:]
-        
-        # Remove any text after the last }
-        last_brace = text.rfind('}')
-        if last_brace != -1 and last_brace < len(text) - 1:
-            text = text[:last_brace + 1]
-        
-        # Remove control characters that can break JSON parsing
-        import string
-        printable = set(string.printable)
-        text = ''.join(char for char in text if char in printable or char in '\n\t')
-        
-        # Fix common string escaping issues
-        text = text.replace('\\"', '"')  # Unescape quotes
-        text = text.replace('\\n', '\\n')  # Keep newlines as \n
-        text = text.replace('\\t', '\\t')  # Keep tabs as \t
-        
-        return text
+        if repairs:
+            self.logger.warning(f"Repaired LLM JSON: {', '.join(repairs)}")
+            for repair in repairs:
+                self.metrics.increment("response.repairs", kind=repair)
+        if not isinstance(json_data, dict):
+            raise Exception(f"Expected a JSON object in LLM response, got {type(json_data).__name__}")
+        return json_data
     
     def _validate_game_schema(self, json_data: Dict[str, Any]) -> GameSchema:
         """Validate JSON data against GameSchema"""
@@ -237,12 +132,9 @@ class ResponseProcessor:
             # Fix scoring values to be within valid ranges
             self._fix_scoring_values(json_data)
             
-            # Validate and create GameSchema
+            # Validate and create GameSchema (content against its game type's model)
             game_schema = GameSchema(**json_data)
             
-            # Additional validation
-            self._validate_content_structure(game_schema)
-            
             return game_schema
             
         except Exception as e:
@@ -305,123 +197,3 @@ class ResponseProcessor:
             elif bonus < 0:
                 self.logger.warning(f"Clamping bonusForStreak from {bonus} to 0")
                 scoring['bonusForStreak'] = 0
-    
-    def _validate_content_structure(self, game_schema: GameSchema) -> None:
-        """Validate game content structure based on game type"""
-        self.logger.debug(f"Validating content structure for game type: {game_schema.type}")
-        
-        content = game_schema.content
-        game_type = game_schema.type
-        
-        # Validate content structure based on game type
-        validation_rules = {
-            'quiz': self._validate_quiz_content,
-            'drag-drop': self._validate_drag_drop_content,
-            'memory-match': self._validate_memory_match_content,
-            'sorting': self._validate_sorting_content,
-            'matching': self._validate_matching_content,
-            'story-sequence': self._validate_story_sequence_content,
-            'fill-blank': self._validate_fill_blank_content,
-            'card-flip': self._validate_card_flip_content,
-            'word-puzzle': self._validate_word_puzzle_content,
-            'puzzle-assembly': self._validate_puzzle_assembly_content,
-            'anxiety-adventure': self._validate_anxiety_adventure_content
-        }
-        
-        if game_type in validation_rules:
-            try:
-                validation_rules[game_type](content)
-                self.logger.debug(f"Content validation successful for game type: {game_type}")
-            except Exception as e:
-                self.logger.warning(f"Content validation failed for game type {game_type}: {str(e)}")
-                # Log the content for debugging
-                self.logger.debug(f"Content that failed validation: {content}")
-                # Don't re-raise the exception for now to make it less strict
-                pass
-        else:
-            self.logger.warning(f"No validation rule for game type: {game_type}")
-    
-    def _validate_quiz_content(self, content: Dict[str, Any]) -> None:
-        """Validate quiz game content"""
-        if 'questions' not in content:
-            raise ValueError("Quiz content must have 'questions' field")
-        
-        questions = content['questions']
-        if not isinstance(questions, list) or len(questions) == 0:
-            raise ValueError("Quiz must have at least one question")
-        
-        for question in questions:
-            required_fields = ['id', 'question', 'type', 'options', 'correctAnswer', 'explanation']
-            for field in required_fields:
-                if field not in question:
-                    raise ValueError(f"Quiz question missing field: {field}")
-    
-    def _validate_drag_drop_content(self, content: Dict[str, Any]) -> None:
-        """Validate drag-drop game content"""
-        required_fields = ['items', 'dropZones', 'instructions']
-        for field in required_fields:
-            if field not in content:
-                raise ValueError(f"Drag-drop content missing field: {field}")
-    
-    def _validate_memory_match_content(self, content: Dict[str, Any]) -> None:
-        """Validate memory match game content"""
-        if 'pairs' not in content:
-            raise ValueError("Memory match content must have 'pairs' field")
-        
-        pairs = content['pairs']
-        if not isinstance(pairs, list) or len(pairs) == 0:
-            raise ValueError("Memory match must have at least one pair")
-    
-    def _validate_sorting_content(self, content: Dict[str, Any]) -> None:
-        """Validate sorting game content"""
-        required_fields = ['items', 'categories', 'instructions']
-        for field in required_fields:
-            if field not in content:
-                raise ValueError(f"Sorting content missing field: {field}")
-    
-    def _validate_matching_content(self, content: Dict[str, Any]) -> None:
-        """Validate matching game content"""
-        required_fields = ['pairs', 'instructions']
-        for field in required_fields:
-            if field not in content:
-                raise ValueError(f"Matching content missing field: {field}")
-    
-    def _validate_story_sequence_content(self, content: Dict[str, Any]) -> None:
-        """Validate story sequence game content"""
-        required_fields = ['events', 'title', 'theme']
-        for field in required_fields:
-            if field not in content:
-                raise ValueError(f"Story sequence content missing field: {field}")
-    
-    def _validate_fill_blank_content(self, content: Dict[str, Any]) -> None:
-        """Validate fill blank game content"""
-        if 'passages' not in content:
-            raise ValueError("Fill blank content must have 'passages' field")
-    
-    def _validate_card_flip_content(self, content: Dict[str, Any]) -> None:
-        """Validate card flip game content"""
-        required_fields = ['cards', 'instructions']
-        for field in required_fields:
-            if field not in content:
-                raise ValueError(f"Card flip content missing field: {field}")
-    
-    def _validate_word_puzzle_content(self, content: Dict[str, Any]) -> None:
-        """Validate word puzzle game content"""
-        required_fields = ['words', 'gridSize', 'theme']
-        for field in required_fields:
-            if field not in content:
-                raise ValueError(f"Word puzzle content missing field: {field}")
-    
-    def _validate_puzzle_assembly_content(self, content: Dict[str, Any]) -> None:
-        """Validate puzzle assembly game content"""
-        required_fields = ['pieces', 'targetImage', 'gridSize']
-        for field in required_fields:
-            if field not in content:
-                raise ValueError(f"Puzzle assembly content missing field: {field}")
-    
-    def _validate_anxiety_adventure_content(self, content: Dict[str, Any]) -> None:
-        """Validate anxiety adventure game content"""
-        required_fields = ['startId', 'scenarios']
-        for field in required_fields:
-            if field not in content:
-                raise ValueError(f"Anxiety adventure content missing field: {field}")
@@ -0,0 +1,115 @@
+"""
+Response Schema
+Generates Gemini responseSchema objects (OpenAPI subset) from the pydantic
+game models so the provider constrains decoding to valid game JSON.
+Gemini refuses an OBJECT without properties, so maps (Dict[str, X]) need
+their keys listed in the model; a game type with a free-keyed map gets no
+schema at all
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, Optional, Type
+
+from pydantic import BaseModel
+
+from app.core.logging_config import get_logger
+from app.models.game_schemas import CONTENT_MODELS, GameSchema
+
+logger = get_logger(__name__)
+
+# Filled in by the server after generation, never asked of the model
+SERVER_FIELDS = ("generatedAt", "version")
+
+_TYPES = {
+    "string": "STRING",
+    "integer": "INTEGER",
+    "number": "NUMBER",
+    "boolean": "BOOLEAN",
+    "array": "ARRAY",
+    "object": "OBJECT",
+}
+
+# JSON Schema keywords carried over unchanged
+_PASSTHROUGH = ("minimum", "maximum", "minItems", "maxItems", "maxLength")
+
+
+def _convert(node: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert one pydantic JSON Schema node into the Gemini schema dialect
+    Raises ValueError for an object with no listed properties
+    """
+    if "$ref" in node:
+        return _convert(defs[node["$ref"].split("/")[-1]], defs)
+
+    if "anyOf" in node:
+        options = [option for option in node["anyOf"] if option.get("type") != "null"]
+        if len(options) == 1:
+            schema = _convert(options[0], defs)
+        else:
+            schema = {"anyOf": [_convert(option, defs) for option in options]}
+        if len(options) < len(node["anyOf"]):
+            schema["nullable"] = True
+        return schema
+
+    if "enum" in node:
+        return {"type": "STRING", "enum": [str(value) for value in node["enum"]]}
+    if "const" in node:
+        return {"type": "STRING", "enum": [str(node["const"])]}
+
+    schema: Dict[str, Any] = {"type": _TYPES[node.get("type", "string")]}
+    for keyword in _PASSTHROUGH:
+        if keyword in node:
+            schema[keyword] = node[keyword]
+
+    if schema["type"] == "ARRAY":
+        schema["items"] = _convert(node.get("items", {}), defs)
+    elif schema["type"] == "OBJECT":
+        properties = node.get("properties")
+        if not properties:
+            raise ValueError(f"{node.get('title', 'object')} has no fixed keys for a response schema")
+        schema["properties"] = {name: _convert(value, defs) for name, value in properties.items()}
+        schema["propertyOrdering"] = list(properties)
+        if node.get("required"):
+            schema["required"] = list(node["required"])
+    return schema
+
+
+def to_gemini_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """Gemini responseSchema for a pydantic model (ValueError if it holds a free-keyed map)"""
+    json_schema = model.model_json_schema()
+    return _convert(json_schema, json_schema.get("$defs", {}))
+
+
+@lru_cache(maxsize=None)
+def game_response_schema(game_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Response schema for a generated game
+    With a known game type, `type` is pinned and `content` uses that type's
+    content model; otherwise `content` may be any of the content models.
+    None when a content model that could be asked for cannot be expressed
+    (the request then uses plain JSON mode). The result is shared between
+    calls and must not be mutated
+    """
+    try:
+        return _game_response_schema(game_type)
+    except ValueError as e:
+        logger.info(f"No response schema for game type {game_type or 'auto'}: {str(e)}")
+        return None
+
+
+def _game_response_schema(game_type: Optional[str]) -> Dict[str, Any]:
+    json_schema = GameSchema.model_json_schema()
+    fields = [name for name in json_schema["properties"] if name not in SERVER_FIELDS]
+    # content is declared as a free map; the content models fill it in below
+    json_schema["properties"] = {name: json_schema["properties"][name] for name in fields if name != "content"}
+    schema = _convert(json_schema, json_schema.get("$defs", {}))
+    properties = schema["properties"]
+    schema["propertyOrdering"] = fields
+    schema["required"] = [name for name in json_schema.get("required", []) if name in fields]
+
+    if game_type:
+        properties["type"] = {"type": "STRING", "enum": [game_type]}
+        properties["content"] = to_gemini_schema(CONTENT_MODELS[game_type])
+    else:
+        properties["content"] = {"anyOf": [to_gemini_schema(model) for model in CONTENT_MODELS.values()]}
+    return schema
@@ -0,0 +1,107 @@
+"""
+Incremental Stream Parser
+Watches a streamed LLM response and extracts top-level game fields
+before the full JSON document has arrived
+"""
+
+import json
+from typing import Dict, Any, Iterable, Optional
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+# Fields that make up the early "preview" event sent to the frontend
+PREVIEW_FIELDS = ("title", "type", "description")
+
+
+class GameHeaderParser:
+    """
+    Scans streamed text for top-level string fields of the game object
+
+    Only string values at depth 1 of the outermost JSON object are captured,
+    so nested keys such as content.title or scenario titles are ignored.
+    Markdown fences and chatter before the first '{' are skipped naturally.
+    """
+
+    def __init__(self, fields: Iterable[str] = PREVIEW_FIELDS):
+        self.logger = logger
+        self.fields = tuple(fields)
+        self.values: Dict[str, str] = {}
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._token: list = []
+        self._pending_key: Optional[str] = None
+        self._expect_value = False
+        self._done = False
+
+    @property
+    def complete(self) -> bool:
+        """True once every requested field has been captured"""
+        return all(field in self.values for field in self.fields)
+
+    def preview(self) -> Dict[str, Any]:
+        """Return the captured fields in request order"""
+        return {field: self.values.get(field) for field in self.fields}
+
+    def feed(self, chunk: str) -> bool:
+        """
+        Consume a chunk of streamed text
+        Returns True when this chunk completed the preview fields
+        """
+        if self._done or self.complete:
+            return False
+
+        for char in chunk:
+            if self._in_string:
+                self._token.append(char)
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._on_string("".join(self._token))
+                    self._token = []
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._token = [char]
+            elif char in "{[":
+                self._depth += 1
+                if self._depth > 1:
+                    self._reset_pair()
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth <= 0:
+                    self._done = True
+                    break
+            elif char == ":" and self._depth == 1 and self._pending_key is not None:
+                self._expect_value = True
+            elif char == "," and self._depth == 1:
+                self._reset_pair()
+
+        return self.complete
+
+    def _on_string(self, literal: str) -> None:
+        """Handle a completed string literal at the top level of the object"""
+        try:
+            value = json.loads(literal)
+        except json.JSONDecodeError:
+            self._reset_pair()
+            return
+
+        if self._expect_value and self._pending_key is not None:
+            if self._pending_key in self.fields and self._pending_key not in self.values:
+                self.values[self._pending_key] = value
+                self.logger.debug(f"Captured streamed field '{self._pending_key}'")
+            self._reset_pair()
+        else:
+            self._pending_key = value
+
+    def _reset_pair(self) -> None:
+        self._pending_key = None
+        self._expect_value = False
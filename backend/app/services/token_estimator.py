@@ -0,0 +1,122 @@
+"""
+Token Estimator
+Offline token counts for prompts and responses, and fitting a sectioned
+prompt into an input token budget by compacting, then dropping, optional
+sections in priority order
+"""
+
+import math
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+
+# Words, digit runs, newline runs and single punctuation marks each start a token
+_PIECES = re.compile(r"[A-Za-z]+|\d+|\n+|[^\sA-Za-z\d]")
+_BLANK_LINES = re.compile(r"\n\s*\n+")
+_SPACES = re.compile(r"[ \t]{2,}")
+# A list item's first clause, and the rest of the item after it
+_BULLET_TAIL = re.compile(r"^(\s*(?:[-*•]|\d+\.)\s+)([^,;\n(]+)[,;(][^\n]*$", re.MULTILINE)
+
+Section = Tuple[str, str]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough BPE-style token count without a tokenizer
+    Common words are one token and long ones a token per six letters,
+    digits a token per three, punctuation and newline runs a token each
+    """
+    count = 0
+    for piece in _PIECES.findall(text):
+        first = piece[0]
+        if first.isalpha():
+            count += math.ceil(len(piece) / 6)
+        elif first.isdigit():
+            count += math.ceil(len(piece) / 3)
+        else:
+            count += 1
+    return max(1, count)
+
+
+def _first_clause(match: "re.Match[str]") -> str:
+    marker, clause = match.group(1), match.group(2).rstrip()
+    # Two words rarely stand alone ("Use compassionate, non-judgmental language")
+    return marker + clause if len(clause.split()) >= 3 else match.group(0)
+
+
+def compact(text: str) -> str:
+    """
+    Cheaper form of a prose section: headings and list items are kept, but
+    each item is cut to its first clause, and blank lines and runs of spaces go
+    """
+    text = _BULLET_TAIL.sub(_first_clause, text)
+    return _SPACES.sub(" ", _BLANK_LINES.sub("\n", text)).strip()
+
+
+class PromptSize(BaseModel):
+    """Estimated size of one built prompt, per section in prompt order"""
+    sections: Dict[str, int]
+    total: int
+    budget: Optional[int] = None
+    compacted: List[str] = []
+    dropped: List[str] = []
+
+    @property
+    def trimmed(self) -> bool:
+        return bool(self.compacted or self.dropped)
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.total > self.budget
+
+
+def fit_sections(
+    sections: Sequence[Section],
+    budget: Optional[int],
+    optional: Sequence[str],
+    tokens: Optional[Dict[str, int]] = None,
+    compacted: Optional[Dict[str, str]] = None,
+    separator_tokens: int = 1
+) -> Tuple[List[Section], PromptSize]:
+    """
+    Keep the sections within budget tokens
+    The optional sections are first compacted, then dropped, each in the
+    given order, until the total fits; required sections are never touched,
+    so the result can still be over budget. tokens and compacted may carry
+    precomputed counts and compact texts keyed by section name
+    """
+    tokens = dict(tokens or {})
+    compacted = compacted or {}
+    sections = list(sections)
+    counts = {name: tokens[name] if name in tokens else estimate_tokens(text) for name, text in sections}
+    overhead = separator_tokens * max(0, len(sections) - 1)
+    total = sum(counts.values()) + overhead
+    size = PromptSize(sections=counts, total=total, budget=budget or None)
+    if not size.over_budget:
+        return sections, size
+
+    present = [name for name in optional if name in counts]
+    for name in present:
+        if size.total <= budget:
+            break
+        text = compacted.get(name) or compact(dict(sections)[name])
+        saved = counts[name] - estimate_tokens(text)
+        if saved <= 0:
+            continue
+        sections = [(section, text if section == name else body) for section, body in sections]
+        counts[name] -= saved
+        size.total -= saved
+        size.compacted.append(name)
+
+    for name in present:
+        if size.total <= budget:
+            break
+        sections = [(section, body) for section, body in sections if section != name]
+        size.total -= counts.pop(name) + separator_tokens
+        size.dropped.append(name)
+        if name in size.compacted:
+            size.compacted.remove(name)
+
+    size.sections = counts
+    return sections, size
@@ -0,0 +1,215 @@
+"""
+Usage Ledger
+Token counts and estimated cost of every LLM call, aggregated by endpoint,
+game type, prompt-template version, provider and model, and persisted to a
+JSON file so totals survive restarts
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+from app.services.llm_providers import LLMResult
+
+logger = get_logger(__name__)
+
+DIMENSIONS = ("endpoint", "game_type", "template_version", "provider", "model")
+COUNTS = ("calls", "input_tokens", "output_tokens", "cached_tokens", "total_tokens", "latency", "cost")
+
+# USD per million tokens; cached input tokens are billed at the cached rate
+# instead of the input rate. Models ending in ":free" cost nothing
+DEFAULT_PRICES: Dict[str, Dict[str, float]] = {
+    "gemini-2.0-flash": {"input": 0.10, "cached": 0.025, "output": 0.40},
+    "gemini-2.0-flash-lite": {"input": 0.075, "cached": 0.01875, "output": 0.30},
+    "gemini-2.0-flash-exp": {"input": 0.0, "cached": 0.0, "output": 0.0},
+    "gemini-1.5-flash": {"input": 0.075, "cached": 0.01875, "output": 0.30},
+    "gemini-1.5-pro": {"input": 1.25, "cached": 0.3125, "output": 5.00},
+}
+
+UsageKey = Tuple[str, ...]
+
+
+def parse_prices(raw: str) -> Dict[str, Dict[str, float]]:
+    """Price overrides from a JSON object of model -> {input, cached, output}"""
+    if not raw:
+        return {}
+    try:
+        prices = json.loads(raw)
+        return {model: {kind: float(rate) for kind, rate in rates.items()} for model, rates in prices.items()}
+    except (ValueError, AttributeError, TypeError) as e:
+        logger.error(f"Ignoring invalid USAGE_PRICES: {str(e)}")
+        return {}
+
+
+class UsageLedger:
+    """
+    In-memory usage totals per (endpoint, game type, template version, provider, model)
+
+    Totals are loaded from `path` on start and written back every
+    flush_interval seconds while they change, and once more on stop
+    """
+
+    def __init__(self, path: Optional[str] = None, flush_interval: float = 60.0,
+                 prices: Optional[Dict[str, Dict[str, float]]] = None):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.prices = {**DEFAULT_PRICES, **(prices or {})}
+        self.rows: Dict[UsageKey, Dict[str, float]] = {}
+        self.since = time.time()
+        self.last_flush: Optional[float] = None
+        self._dirty = False
+        self._task: Optional[asyncio.Task] = None
+        self.logger = logger
+        self.metrics = get_metrics()
+        self.load()
+
+    @classmethod
+    def from_settings(cls, settings: Any) -> "UsageLedger":
+        return cls(
+            path=settings.USAGE_LEDGER_PATH or None,
+            flush_interval=settings.USAGE_FLUSH_INTERVAL,
+            prices=parse_prices(settings.USAGE_PRICES)
+        )
+
+    def cost(self, model: str, usage: Dict[str, int]) -> float:
+        """Estimated USD cost of one call"""
+        if model.endswith(":free"):
+            return 0.0
+        rates = self.prices.get(model)
+        if rates is None:
+            return 0.0
+        cached = usage.get("cached_tokens", 0)
+        uncached = max(0, usage.get("input_tokens", 0) - cached)
+        return (
+            uncached * rates.get("input", 0.0)
+            + cached * rates.get("cached", rates.get("input", 0.0))
+            + usage.get("output_tokens", 0) * rates.get("output", 0.0)
+        ) / 1_000_000
+
+    def record(self, labels: Dict[str, str], result: LLMResult) -> None:
+        """Add one completed call"""
+        key = (
+            labels.get("endpoint", "unknown"),
+            labels.get("game_type", "auto"),
+            labels.get("template_version", "unknown"),
+            result.provider,
+            result.model,
+        )
+        row = self.rows.setdefault(key, {count: 0 for count in COUNTS})
+        row["calls"] += 1
+        for count in ("input_tokens", "output_tokens", "cached_tokens", "total_tokens"):
+            row[count] += result.usage.get(count, 0)
+        row["latency"] += result.latency
+        row["cost"] += self.cost(result.model, result.usage)
+        self._dirty = True
+
+        for kind in ("input", "output", "cached"):
+            tokens = result.usage.get(f"{kind}_tokens")
+            if tokens:
+                self.metrics.increment("llm.tokens", tokens, provider=result.provider, kind=kind)
+
+    def report(self, group_by: Sequence[str] = DIMENSIONS) -> Dict[str, Any]:
+        """Totals grouped by the given dimensions, most expensive first"""
+        unknown = [dimension for dimension in group_by if dimension not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown usage dimension(s): {', '.join(unknown)}")
+
+        grouped: Dict[UsageKey, Dict[str, float]] = {}
+        for key, row in self.rows.items():
+            labels = dict(zip(DIMENSIONS, key))
+            group = grouped.setdefault(tuple(labels[d] for d in group_by), {count: 0 for count in COUNTS})
+            for count in COUNTS:
+                group[count] += row[count]
+
+        rows = [self._format(dict(zip(group_by, key)), totals) for key, totals in grouped.items()]
+        rows.sort(key=lambda row: (row["cost"], row["total_tokens"]), reverse=True)
+
+        totals = {count: 0 for count in COUNTS}
+        for row in self.rows.values():
+            for count in COUNTS:
+                totals[count] += row[count]
+        return {"since": self.since, "group_by": list(group_by), "totals": self._format({}, totals), "rows": rows}
+
+    @staticmethod
+    def _format(labels: Dict[str, str], totals: Dict[str, float]) -> Dict[str, Any]:
+        calls = totals["calls"] or 1
+        return {
+            **labels,
+            **{count: int(totals[count]) for count in COUNTS if count not in ("latency", "cost")},
+            "avg_output_tokens": round(totals["output_tokens"] / calls, 1),
+            "avg_latency": round(totals["latency"] / calls, 3),
+            "cost": round(totals["cost"], 6),
+        }
+
+    def _payload(self) -> Dict[str, Any]:
+        return {
+            "since": self.since,
+            "rows": [{**dict(zip(DIMENSIONS, key)), **row} for key, row in self.rows.items()],
+        }
+
+    def load(self) -> None:
+        """Continue from the totals persisted by a previous run"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                payload = json.load(handle)
+            self.since = payload.get("since", self.since)
+            for row in payload.get("rows", []):
+                key = tuple(row[dimension] for dimension in DIMENSIONS)
+                self.rows[key] = {count: row.get(count, 0) for count in COUNTS}
+        except (OSError, ValueError, KeyError) as e:
+            self.logger.error(f"Could not load usage ledger {self.path}: {str(e)}")
+
+    def _write(self, payload: Dict[str, Any]) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as handle:
+            json.dump(payload, handle)
+        os.replace(temporary, self.path)
+
+    async def flush(self) -> None:
+        """Write the totals to disk if they changed since the last flush"""
+        if not self.path or not self._dirty:
+            return
+        self._dirty = False
+        try:
+            await asyncio.to_thread(self._write, self._payload())
+            self.last_flush = time.time()
+        except OSError as e:
+            self._dirty = True
+            self.logger.error(f"Could not write usage ledger {self.path}: {str(e)}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self) -> None:
+        """Start flushing in the background"""
+        if self.path and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def health_check(self) -> Dict[str, Any]:
+        return {
+            "status": "healthy",
+            "service": "usage_ledger",
+            "path": self.path,
+            "groups": len(self.rows),
+            "last_flush": self.last_flush,
+        }
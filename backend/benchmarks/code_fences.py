@@ -0,0 +1,226 @@
+"""
+pyserver JSON Extraction Benchmark
+Cost of pulling the game JSON out of a model response in pyserver: the
+linear brace scanner (find_json_object in pyserver/main.py) against the
+previous strip_code_fences, which ran re.findall with the nested pattern
+\\{(?:[^{}]*|\\{[^{}]*\\})*\\} over the whole response and json.loads on every
+match, longest first. That pattern backtracks exponentially on an unclosed
+brace (any truncated response), so each legacy call runs under a time limit
+and shows as "timeout" when it hits it. --fuzz also checks the scanner on
+seeded random mutations of generated games:
+
+    python -m benchmarks.code_fences --iterations 200
+    python -m benchmarks.code_fences --fuzz 2000
+"""
+
+import argparse
+import json
+import random
+import re
+import signal
+import time
+import timeit
+from typing import Callable, Dict, List, Optional
+
+from tools.prompt_tokens import load_pyserver
+from tools.sample_games import sample_game
+
+
+def legacy_strip_code_fences(text: str) -> str:
+    """
+    Extract JSON from AI responses that might contain extra text or markdown.
+    """
+    t = text.strip()
+
+    # First, try to extract markdown code blocks
+    if t.startswith("```json") and t.endswith("```"):
+        return t[7:-3].strip()
+    if t.startswith("```") and t.endswith("```"):
+        return t[3:-3].strip()
+
+    # Look for JSON objects in the text using regex
+    # This will find content between { and } including nested objects
+    json_pattern = r'\{(?:[^{}]*|\{[^{}]*\})*\}'
+    matches = re.findall(json_pattern, t, re.DOTALL)
+
+    if matches:
+        # Try to find the largest/most complete JSON object
+        for match in sorted(matches, key=len, reverse=True):
+            try:
+                # Test if it's valid JSON
+                json.loads(match)
+                return match
+            except:
+                continue
+
+    # If no valid JSON found in brackets, try to find JSON starting with {
+    if '{' in t:
+        start_idx = t.find('{')
+        # Find the end by counting braces
+        brace_count = 0
+        end_idx = start_idx
+        for i, char in enumerate(t[start_idx:], start_idx):
+            if char == '{':
+                brace_count += 1
+            elif char == '}':
+                brace_count -= 1
+                if brace_count == 0:
+                    end_idx = i
+                    break
+
+        potential_json = t[start_idx:end_idx + 1]
+        try:
+            # Test if it's valid JSON
+            json.loads(potential_json)
+            return potential_json
+        except:
+            pass
+
+    # If all else fails, return the original text
+    return t
+
+
+class Timeout(Exception):
+    pass
+
+
+def _game(game_type: str, seed: int, indent: Optional[int] = 2) -> str:
+    return json.dumps(sample_game(game_type, random.Random(seed)), indent=indent)
+
+
+def inputs() -> Dict[str, str]:
+    game = _game("anxiety-adventure", 1)
+    large = json.dumps({**sample_game("quiz", random.Random(2)),
+                        "content": {"questions": [sample_game("quiz", random.Random(i))["content"]["questions"][0]
+                                                  for i in range(2000)]}}, indent=2)
+    return {
+        "clean": game,
+        "fenced": f"```json\n{game}\n```",
+        "chatter": f"Here is your game:\n\n{game}\n\nLet me know if you want another game!",
+        "large_chatter": f"Sure!\n{large}\nEnjoy.",
+        "unclosed_brace_16": "{" + "x" * 16,
+        "unclosed_brace_20": "{" + "x" * 20,
+        "unclosed_brace_24": "{" + "x" * 24,
+        "truncated": game[: len(game) // 3],
+        "brace_fragments": "Use {placeholders} like {name} or {age}. " * 2000 + game,
+        "broken_candidates": '{"step": 1, "note": "draft"' * 2000 + "} " + game,
+        "braces_in_strings": json.dumps({"title": "{not} {json", "text": "\\\"}{\\\"" * 5000, "content": {}}),
+        "many_open_braces": "{" * 20000,
+        "deep_nesting": '{"a":' * 2000 + "1" + "}" * 2000,
+    }
+
+
+def limited(case: Callable[[], object], seconds: float) -> Callable[[], object]:
+    """case, raising Timeout when one call takes longer than seconds (needs SIGALRM)"""
+    if not hasattr(signal, "setitimer"):
+        return case
+
+    def run() -> object:
+        def expire(signum, frame):
+            raise Timeout()
+        previous = signal.signal(signal.SIGALRM, expire)
+        signal.setitimer(signal.ITIMER_REAL, seconds)
+        try:
+            return case()
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+    return run
+
+
+def measure(case: Callable[[], object], iterations: int, repeat: int, budget: float) -> Optional[float]:
+    """Best-of-repeat microseconds per call, or None when one call exceeds budget seconds"""
+    started = time.perf_counter()
+    try:
+        case()
+    except Timeout:
+        return None
+    once = time.perf_counter() - started
+    # Slow cases get fewer iterations so a row stays within the budget
+    iterations = max(1, min(iterations, int(budget / max(once, 1e-9))))
+    try:
+        return min(timeit.repeat(case, number=iterations, repeat=repeat)) / iterations * 1e6
+    except Timeout:
+        return None
+
+
+def _parses(extract: Callable[[str], str], text: str, budget: float) -> str:
+    try:
+        return "yes" if isinstance(json.loads(limited(lambda: extract(text), budget)()), dict) else "no"
+    except Timeout:
+        return "-"
+    except (ValueError, RecursionError):
+        return "no"
+
+
+def mutate(text: str, rng: random.Random) -> str:
+    """A model-output-like mangling of a JSON document"""
+    choice = rng.randrange(6)
+    if choice == 0:
+        return text[: rng.randrange(len(text))]
+    if choice == 1:
+        junk = rng.choice(["{", "}", "{x}", '"', "\\", "{\"a\": ", "```json\n"])
+        at = rng.randrange(len(text))
+        return text[:at] + junk * rng.randint(1, 50) + text[at:]
+    if choice == 2:
+        return rng.choice(["Here you go: {draft} ", "Note: use {name}.\n", "```json\n"]) + text + "\n```"
+    if choice == 3:
+        return "".join(rng.choice("{}\"\\:, a1\n") for _ in range(rng.randint(0, 400)))
+    if choice == 4:
+        return "{" * rng.randint(1, 500) + text
+    return text + rng.choice(["}", "}}", "\n\nHope this helps {friend}!", " {\"extra\": 1}"])
+
+
+def fuzz(find: Callable[[str], Optional[str]], runs: int, seed: int = 0) -> float:
+    """
+    Check find_json_object on seeded random mutations: whatever it returns is a
+    dict-valued JSON slice of the input, an intact game with no other braces
+    around it is found, and a cut-off game never yields one of its parts.
+    Returns the slowest microseconds per input character over inputs of 2000+ characters
+    """
+    rng = random.Random(seed)
+    games = [_game(game_type, seed, rng.choice([None, 2])) for seed, game_type in
+             enumerate(["quiz", "sorting", "matching", "anxiety-adventure", "breathing"])]
+    slowest = 0.0
+    for _ in range(runs):
+        game = rng.choice(games)
+        text = mutate(game, rng)
+        started = time.perf_counter()
+        found = find(text)
+        if len(text) >= 2000:
+            slowest = max(slowest, (time.perf_counter() - started) * 1e6 / len(text))
+        if found is not None:
+            assert found in text and isinstance(json.loads(found), dict), text[:200]
+        if game in text and "{" not in text.replace(game, ""):
+            assert found == game, text[:200]
+        if game.startswith(text):
+            assert found is None, text[:200]
+    return slowest
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=1.0, help="Seconds a single call may take")
+    parser.add_argument("--fuzz", type=int, default=0, help="Also fuzz the scanner with this many inputs")
+    args = parser.parse_args(argv)
+
+    pyserver = load_pyserver()
+    print(f"{'input':<22}{'chars':>9}{'before (us)':>14}{'after (us)':>12}{'speedup':>9}  parsed before/after")
+    for name, text in inputs().items():
+        before = measure(limited(lambda: legacy_strip_code_fences(text), args.budget),
+                         args.iterations, args.repeat, args.budget)
+        after = measure(lambda: pyserver.strip_code_fences(text), args.iterations, args.repeat, args.budget)
+        parsed = f"{_parses(legacy_strip_code_fences, text, args.budget)}/{_parses(pyserver.strip_code_fences, text, args.budget)}"
+        before_column = f"{before:>14.1f}" if before is not None else f"{'timeout':>14}"
+        speedup = f"{before / after:>8.1f}x" if before is not None else f"{'-':>9}"
+        print(f"{name:<22}{len(text):>9}{before_column}{after:>12.1f}{speedup}  {parsed}")
+
+    if args.fuzz:
+        slowest = fuzz(pyserver.find_json_object, args.fuzz)
+        print(f"\nfuzz: {args.fuzz} inputs ok, slowest {slowest:.3f} us/char")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Content Validation Benchmark
+Cost of validating a parsed game: GameSchema now checks content against the
+model of its game type through one union discriminated on "type" (compiled
+once at import), against the previous two passes, GameSchema with untyped
+content followed by ResponseProcessor walking the dict again with a
+hand-written check per type whose failures were only logged. The corpus has
+games of every type. The last column counts how many mutated games (one value
+dropped or replaced by an object) each approach rejects; dropping an optional
+field leaves a game valid, so not every mutation should be rejected:
+
+    python -m benchmarks.content_validation --iterations 2000
+"""
+
+import argparse
+import copy
+import random
+import timeit
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError, create_model
+
+from app.core.logging_config import get_logger
+from app.models.game_schemas import GameSchema
+from tools.sample_games import CONTENT_BUILDERS, sample_game
+
+# GameSchema's fields without its content validator: content is any dict again
+LegacyGameSchema = create_model(
+    "LegacyGameSchema", __base__=BaseModel,
+    **{name: (field.annotation, field) for name, field in GameSchema.model_fields.items()}
+)
+
+
+class LegacyContentValidator:
+    """The per-type content checks ResponseProcessor ran after GameSchema"""
+
+    def __init__(self):
+        self.logger = get_logger(__name__)
+
+    def validate(self, data: Dict[str, Any]) -> BaseModel:
+        game_schema = LegacyGameSchema(**data)
+        self._validate_content_structure(game_schema)
+        return game_schema
+
+    def _validate_content_structure(self, game_schema: GameSchema) -> None:
+        """Validate game content structure based on game type"""
+        self.logger.debug(f"Validating content structure for game type: {game_schema.type}")
+        
+        content = game_schema.content
+        game_type = game_schema.type
+        
+        # Validate content structure based on game type
+        validation_rules = {
+            'quiz': self._validate_quiz_content,
+            'drag-drop': self._validate_drag_drop_content,
+            'memory-match': self._validate_memory_match_content,
+            'sorting': self._validate_sorting_content,
+            'matching': self._validate_matching_content,
+            'story-sequence': self._validate_story_sequence_content,
+            'fill-blank': self._validate_fill_blank_content,
+            'card-flip': self._validate_card_flip_content,
+            'word-puzzle': self._validate_word_puzzle_content,
+            'puzzle-assembly': self._validate_puzzle_assembly_content,
+            'anxiety-adventure': self._validate_anxiety_adventure_content
+        }
+        
+        if game_type in validation_rules:
+            try:
+                validation_rules[game_type](content)
+                self.logger.debug(f"Content validation successful for game type: {game_type}")
+            except Exception as e:
+                self.logger.warning(f"Content validation failed for game type {game_type}: {str(e)}")
+                # Log the content for debugging
+                self.logger.debug(f"Content that failed validation: {content}")
+                # Don't re-raise the exception for now to make it less strict
+                pass
+        else:
+            self.logger.warning(f"No validation rule for game type: {game_type}")
+    
+    def _validate_quiz_content(self, content: Dict[str, Any]) -> None:
+        """Validate quiz game content"""
+        if 'questions' not in content:
+            raise ValueError("Quiz content must have 'questions' field")
+        
+        questions = content['questions']
+        if not isinstance(questions, list) or len(questions) == 0:
+            raise ValueError("Quiz must have at least one question")
+        
+        for question in questions:
+            required_fields = ['id', 'question', 'type', 'options', 'correctAnswer', 'explanation']
+            for field in required_fields:
+                if field not in question:
+                    raise ValueError(f"Quiz question missing field: {field}")
+    
+    def _validate_drag_drop_content(self, content: Dict[str, Any]) -> None:
+        """Validate drag-drop game content"""
+        required_fields = ['items', 'dropZones', 'instructions']
+        for field in required_fields:
+            if field not in content:
+                raise ValueError(f"Drag-drop content missing field: {field}")
+    
+    def _validate_memory_match_content(self, content: Dict[str, Any]) -> None:
+        """Validate memory match game content"""
+        if 'pairs' not in content:
+            raise ValueError("Memory match content must have 'pairs' field")
+        
+        pairs = content['pairs']
+        if not isinstance(pairs, list) or len(pairs) == 0:
+            raise ValueError("Memory match must have at least one pair")
+    
+    def _validate_sorting_content(self, content: Dict[str, Any]) -> None:
+        """Validate sorting game content"""
+        required_fields = ['items', 'categories', 'instructions']
+        for field in required_fields:
+            if field not in content:
+                raise ValueError(f"Sorting content missing field: {field}")
+    
+    def _validate_matching_content(self, content: Dict[str, Any]) -> None:
+        """Validate matching game content"""
+        required_fields = ['pairs', 'instructions']
+        for field in required_fields:
+            if field not in content:
+                raise ValueError(f"Matching content missing field: {field}")
+    
+    def _validate_story_sequence_content(self, content: Dict[str, Any]) -> None:
+        """Validate story sequence game content"""
+        required_fields = ['events', 'title', 'theme']
+        for field in required_fields:
+            if field not in content:
+                raise ValueError(f"Story sequence content missing field: {field}")
+    
+    def _validate_fill_blank_content(self, content: Dict[str, Any]) -> None:
+        """Validate fill blank game content"""
+        if 'passages' not in content:
+            raise ValueError("Fill blank content must have 'passages' field")
+    
+    def _validate_card_flip_content(self, content: Dict[str, Any]) -> None:
+        """Validate card flip game content"""
+        required_fields = ['cards', 'instructions']
+        for field in required_fields:
+            if field not in content:
+                raise ValueError(f"Card flip content missing field: {field}")
+    
+    def _validate_word_puzzle_content(self, content: Dict[str, Any]) -> None:
+        """Validate word puzzle game content"""
+        required_fields = ['words', 'gridSize', 'theme']
+        for field in required_fields:
+            if field not in content:
+                raise ValueError(f"Word puzzle content missing field: {field}")
+    
+    def _validate_puzzle_assembly_content(self, content: Dict[str, Any]) -> None:
+        """Validate puzzle assembly game content"""
+        required_fields = ['pieces', 'targetImage', 'gridSize']
+        for field in required_fields:
+            if field not in content:
+                raise ValueError(f"Puzzle assembly content missing field: {field}")
+    
+    def _validate_anxiety_adventure_content(self, content: Dict[str, Any]) -> None:
+        """Validate anxiety adventure game content"""
+        required_fields = ['startId', 'scenarios']
+        for field in required_fields:
+            if field not in content:
+                raise ValueError(f"Anxiety adventure content missing field: {field}")
+
+
+def corpus(per_type: int) -> Dict[str, List[Dict[str, Any]]]:
+    return {game_type: [sample_game(game_type, random.Random(seed)) for seed in range(per_type)]
+            for game_type in CONTENT_BUILDERS}
+
+
+def invalidate(game: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    """The game with one content value removed or replaced by one of the wrong type"""
+    game = copy.deepcopy(game)
+    node: Any = game["content"]
+    while True:
+        keys = list(node) if isinstance(node, dict) else list(range(len(node)))
+        key = rng.choice(keys)
+        if isinstance(node[key], (dict, list)) and node[key] and rng.random() < 0.7:
+            node = node[key]
+            continue
+        if isinstance(node, dict) and rng.random() < 0.5:
+            del node[key]
+        else:
+            node[key] = {"unexpected": True}
+        return game
+
+
+def measure(case: Callable[[], object], iterations: int, repeat: int) -> float:
+    """Best-of-repeat microseconds per call"""
+    return min(timeit.repeat(case, number=iterations, repeat=repeat)) / iterations * 1e6
+
+
+def rejects(validate: Callable[[Dict[str, Any]], object], games: List[Dict[str, Any]]) -> int:
+    rejected = 0
+    for game in games:
+        try:
+            validate(copy.deepcopy(game))
+        except ValidationError:
+            rejected += 1
+    return rejected
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--per-type", type=int, default=5, help="Games of each type in the corpus")
+    args = parser.parse_args(argv)
+
+    legacy = LegacyContentValidator()
+    legacy.logger.disabled = True
+    rng = random.Random(0)
+    total: Tuple[float, float] = (0.0, 0.0)
+    print(f"{'type':<20}{'before (us)':>14}{'after (us)':>12}{'speedup':>9}  mutated rejected before/after")
+    for game_type, games in corpus(args.per_type).items():
+        def run_before() -> None:
+            for game in games:
+                legacy.validate(game)
+
+        def run_after() -> None:
+            for game in games:
+                GameSchema(**game)
+
+        before = measure(run_before, args.iterations, args.repeat) / len(games)
+        after = measure(run_after, args.iterations, args.repeat) / len(games)
+        total = (total[0] + before, total[1] + after)
+        mutated = [invalidate(game, rng) for game in games for _ in range(4)]
+        rejected = f"{rejects(legacy.validate, mutated)}/{rejects(lambda game: GameSchema(**game), mutated)} of {len(mutated)}"
+        print(f"{game_type:<20}{before:>14.1f}{after:>12.1f}{before / after:>8.1f}x  {rejected}")
+    print(f"{'total':<20}{total[0]:>14.1f}{total[1]:>12.1f}{total[0] / total[1]:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
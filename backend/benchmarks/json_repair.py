@@ -0,0 +1,252 @@
+"""
+JSON Repair Benchmark
+Cost of getting the game JSON out of an LLM response: the single-pass
+extractor/repairer (app/services/json_repair.py) against the previous
+ResponseProcessor chain, which stripped fences with prefix/suffix lists and
+regexes, then on a parse error ran lazy DOTALL fence regexes, nine re.sub
+fixes and a character filter over the whole text. Inputs range from clean
+JSON through chatty, fenced and broken responses to large and adversarial
+ones; each row also says whether the result parsed:
+
+    python -m benchmarks.json_repair --iterations 200
+"""
+
+import argparse
+import json
+import random
+import re
+import timeit
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.logging_config import get_logger
+from app.services.json_repair import loads
+from tools.sample_games import sample_game
+
+
+class LegacyResponseParser:
+    """The fence stripping and JSON fixing ResponseProcessor used before json_repair"""
+
+    def __init__(self):
+        self.logger = get_logger(__name__)
+
+    def loads(self, raw_text: str) -> Dict[str, Any]:
+        return self._parse_json(self._clean_markdown_fences(raw_text))
+
+    def _clean_markdown_fences(self, raw_text: str) -> str:
+        """
+        Clean up potential markdown code fences
+        Exact logic from n8n Code node
+        """
+        self.logger.debug("Cleaning markdown fences from response...")
+        
+        # Remove leading/trailing whitespace
+        raw_text = raw_text.strip()
+        
+        # Handle ```json and ``` fences (exact logic from n8n)
+        if raw_text.startswith("```json"):
+            raw_text = raw_text[7:-3].strip()  # Remove ```json from start and ``` from end
+        elif raw_text.startswith("```"):
+            raw_text = raw_text[3:-3].strip()   # Remove ``` from start and end
+        
+        # Additional cleaning for other common LLM artifacts
+        raw_text = self._remove_additional_artifacts(raw_text)
+        
+        return raw_text
+    
+    def _remove_additional_artifacts(self, text: str) -> str:
+        """Remove additional LLM response artifacts"""
+        # Remove common prefixes
+        prefixes_to_remove = [
+            "Here's the JSON:",
+            "Here is the JSON:",
+            "JSON:",
+            "Response:",
+            "Game:",
+            "```json",
+            "```"
+        ]
+        
+        for prefix in prefixes_to_remove:
+            if text.startswith(prefix):
+                text = text[len(prefix):].strip()
+        
+        # Remove common suffixes
+        suffixes_to_remove = [
+            "```",
+            "End of JSON",
+            "That's it!",
+            "Hope this helps!"
+        ]
+        
+        for suffix in suffixes_to_remove:
+            if text.endswith(suffix):
+                text = text[:-len(suffix)].strip()
+        
+        # Remove any remaining markdown artifacts
+        text = re.sub(r'^```[a-zA-Z]*\n?', '', text)  # Remove opening code blocks
+        text = re.sub(r'\n?```$', '', text)           # Remove closing code blocks
+        
+        return text
+    
+    def _parse_json(self, cleaned_text: str) -> Dict[str, Any]:
+        """Parse cleaned text into JSON object"""
+        self.logger.debug("Parsing cleaned text as JSON...")
+        
+        try:
+            json_data = json.loads(cleaned_text)
+            return json_data
+        except json.JSONDecodeError as e:
+            self.logger.error(f"JSON parsing failed: {str(e)}")
+            self.logger.debug(f"Problematic text (first 500 chars): {cleaned_text[:500]}")
+            
+            # Attempt to fix common JSON issues
+            fixed_text = self._attempt_json_fix(cleaned_text)
+            try:
+                return json.loads(fixed_text)
+            except json.JSONDecodeError as e2:
+                self.logger.error(f"JSON fix also failed: {str(e2)}")
+                raise Exception(f"Invalid JSON in LLM response: {str(e)}")
+    
+    def _attempt_json_fix(self, text: str) -> str:
+        """Attempt to fix common JSON formatting issues"""
+        self.logger.debug("Attempting to fix JSON formatting issues...")
+        
+        # First, try to extract JSON from markdown if present
+        text = self._extract_json_from_markdown(text)
+        
+        # Common fixes - apply in order of specificity
+        fixes = [
+            # Fix double curly braces (common LLM issue) - do this first
+            (r'\{\{', r'{'),
+            (r'\}\}', r'}'),
+            # Fix boolean values (Python style to JSON)
+            (r':\s*True\b', ': true'),
+            (r':\s*False\b', ': false'),
+            (r':\s*None\b', ': null'),
+            # Fix trailing commas
+            (r',(\s*[}\]])', r'\1'),
+            # Fix missing commas between objects
+            (r'}(\s*){', r'},\1{'),
+            # Fix missing commas between array elements
+            (r'}(\s*)\[', r'},\1['),
+            (r'\](\s*){', r'],\1{'),
+        ]
+        
+        for pattern, replacement in fixes:
+            text = re.sub(pattern, replacement, text)
+        
+        # Additional cleaning
+        text = self._clean_json_text(text)
+        
+        return text
+    
+    def _extract_json_from_markdown(self, text: str) -> str:
+        """Extract JSON from markdown code blocks"""
+        # Look for JSON in code blocks with more flexible matching
+        json_patterns = [
+            r'```(?:json)?\s*(\{.*?\})\s*```',  # Standard markdown
+            r'```json\s*(\{.*?\})\s*```',        # Explicit json
+            r'```\s*(\{.*?\})\s*```',            # Generic code block
+        ]
+        
+        for pattern in json_patterns:
+            match = re.search(pattern, text, re.DOTALL)
+            if match:
+                return match.group(1)
+        
+        # Look for JSON without code blocks but with extra text
+        json_start = text.find('{')
+        json_end = text.rfind('}')
+        if json_start != -1 and json_end != -1 and json_end > json_start:
+            return text[json_start:json_end + 1]
+        
+        return text
+    
+    def _clean_json_text(self, text: str) -> str:
+        """Clean up common JSON text issues"""
+        # Remove any leading/trailing whitespace
+        text = text.strip()
+        
+        # Remove any text before the first {
+        first_brace = text.find('{')
+        if first_brace > 0:
+            text = text[first_brace:]
+        
+        # Remove any text after the last }
+        last_brace = text.rfind('}')
+        if last_brace != -1 and last_brace < len(text) - 1:
+            text = text[:last_brace + 1]
+        
+        # Remove control characters that can break JSON parsing
+        import string
+        printable = set(string.printable)
+        text = ''.join(char for char in text if char in printable or char in '\n\t')
+        
+        # Fix common string escaping issues
+        text = text.replace('\\"', '"')  # Unescape quotes
+        text = text.replace('\\n', '\\n')  # Keep newlines as \n
+        text = text.replace('\\t', '\\t')  # Keep tabs as \t
+        
+        return text
+
+
+def _game(game_type: str, seed: int) -> str:
+    return json.dumps(sample_game(game_type, random.Random(seed)), indent=2)
+
+
+def inputs() -> Dict[str, str]:
+    game = _game("anxiety-adventure", 1)
+    large = json.dumps({**sample_game("quiz", random.Random(2)),
+                        "content": {"questions": [sample_game("quiz", random.Random(i))["content"]["questions"][0]
+                                                  for i in range(2000)]}}, indent=2)
+    return {
+        "clean": game,
+        "fenced": f"```json\n{game}\n```",
+        "chatter": f"Here is your game:\n\n{game}\n\nLet me know if you want another game!",
+        "trailing_commas": re.sub(r"(\n\s*)([}\]])", r",\1\2", game),
+        "python_literals": game.replace("true", "True").replace("false", "False"),
+        "doubled_braces": "{" + game + "}",
+        "truncated": game[: len(game) * 2 // 3],
+        "large_fenced_broken": "```json\n" + large.replace("true", "True") + "\n```",
+        "many_open_braces": "{" * 20000,
+        "many_open_brackets": '{"a": ' + "[" * 20000,
+        "brace_chatter": "note {" * 5000 + game,
+        "long_escaped_string": '{"a": "' + '\\"' * 50000 + '"}',
+    }
+
+
+def _parses(parse: Callable[[str], Any], text: str) -> bool:
+    try:
+        return isinstance(parse(text), (dict, tuple))
+    except Exception:
+        return False
+
+
+def measure(case: Callable[[], object], iterations: int, repeat: int) -> float:
+    """Best-of-repeat microseconds per call"""
+    def safe() -> None:
+        try:
+            case()
+        except Exception:
+            pass
+    return min(timeit.repeat(safe, number=iterations, repeat=repeat)) / iterations * 1e6
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    legacy = LegacyResponseParser()
+    legacy.logger.disabled = True
+    print(f"{'input':<22}{'chars':>9}{'before (us)':>14}{'after (us)':>12}{'speedup':>9}  parsed before/after")
+    for name, text in inputs().items():
+        before = measure(lambda: legacy.loads(text), args.iterations, args.repeat)
+        after = measure(lambda: loads(text), args.iterations, args.repeat)
+        parsed = f"{'yes' if _parses(legacy.loads, text) else 'no'}/{'yes' if _parses(loads, text) else 'no'}"
+        print(f"{name:<22}{len(text):>9}{before:>14.1f}{after:>12.1f}{before / after:>8.1f}x  {parsed}")
+
+
+if __name__ == "__main__":
+    main()
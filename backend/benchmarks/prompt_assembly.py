@@ -0,0 +1,110 @@
+"""
+Prompt Assembly Benchmark
+Per-request cost of building the generation prompt: the compiled PromptBuilder
+against the previous assembly, which re-joined every static section (and
+rebuilt the game type and content template sections with string +=) on each
+call. Untyped prompts are identical in both, which is checked before timing;
+typed prompts now carry only that type's content template, so they are shorter:
+
+    python -m benchmarks.prompt_assembly --iterations 20000
+"""
+
+import argparse
+import timeit
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.services.prompt_templates import PromptBuilder, PromptTemplates
+
+PROMPT = "A calming quiz about breathing exercises for anxious teenagers"
+
+
+class LegacyPromptBuilder:
+    """The per-request assembly PromptBuilder used before its segments were compiled"""
+
+    def __init__(self):
+        self.templates = PromptTemplates()
+
+    def build_full_prompt(self, user_prompt: str, game_type: Optional[str] = None) -> str:
+        return "\n\n".join([
+            self.templates.SYSTEM_PROMPT,
+            self.templates.THERAPEUTIC_FOUNDATIONS,
+            self.templates.GAME_MECHANICS_MAPPING,
+            self.templates.IMPLEMENTATION_STRATEGY,
+            "\n" + self._build_user_request(user_prompt, game_type),
+            self.templates.ANALYSIS_REQUIREMENTS,
+            self._build_game_type_selection(),
+            self.templates.JSON_SCHEMA_TEMPLATE,
+            self._build_content_templates(),
+            self.templates.THERAPEUTIC_GUIDELINES,
+            self.templates.OUTPUT_REQUIREMENTS
+        ])
+
+    def build_prompt_parts(self, user_prompt: str, game_type: Optional[str] = None) -> Tuple[str, str]:
+        static_sections = [
+            self.templates.SYSTEM_PROMPT,
+            self.templates.THERAPEUTIC_FOUNDATIONS,
+            self.templates.GAME_MECHANICS_MAPPING,
+            self.templates.IMPLEMENTATION_STRATEGY,
+            self.templates.ANALYSIS_REQUIREMENTS,
+            self._build_game_type_selection(),
+            self.templates.JSON_SCHEMA_TEMPLATE,
+            self._build_content_templates(),
+            self.templates.THERAPEUTIC_GUIDELINES,
+            self.templates.OUTPUT_REQUIREMENTS
+        ]
+        return "\n\n".join(static_sections), self._build_user_request(user_prompt, game_type)
+
+    def _build_user_request(self, user_prompt: str, game_type: Optional[str] = None) -> str:
+        section = f"User Request: {user_prompt}"
+        if game_type:
+            section += f"\nRequired Game Type: {game_type} (use this type and its content template)"
+        return section
+
+    def _build_game_type_selection(self) -> str:
+        game_types_text = "GAME TYPE SELECTION\n\nChoose the most appropriate type:\n\n"
+        for game_type, description in self.templates.GAME_TYPE_DESCRIPTIONS.items():
+            game_types_text += f"{game_type.value} - {description}\n\n"
+        return game_types_text
+
+    def _build_content_templates(self) -> str:
+        content_section = "CONTENT STRUCTURES BY GAME TYPE\n\n"
+        for game_type, template in self.templates.CONTENT_TEMPLATES.items():
+            content_section += template + "\n\n"
+        return content_section
+
+
+def cases(builder) -> Dict[str, Callable[[], object]]:
+    return {
+        "build_full_prompt": lambda: builder.build_full_prompt(PROMPT),
+        "build_full_prompt(type)": lambda: builder.build_full_prompt(PROMPT, "quiz"),
+        "build_prompt_parts": lambda: builder.build_prompt_parts(PROMPT, "quiz"),
+    }
+
+
+def measure(case: Callable[[], object], iterations: int, repeat: int) -> float:
+    """Best-of-repeat microseconds per call"""
+    return min(timeit.repeat(case, number=iterations, repeat=repeat)) / iterations * 1e6
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    legacy, compiled = LegacyPromptBuilder(), PromptBuilder()
+    assert legacy.build_full_prompt(PROMPT) == compiled.build_full_prompt(PROMPT), \
+        "compiled prompt differs from the legacy assembly"
+
+    print(f"{'case':<26}{'before (us)':>12}{'after (us)':>12}{'speedup':>10}")
+    for name in cases(compiled):
+        before = measure(cases(legacy)[name], args.iterations, args.repeat)
+        after = measure(cases(compiled)[name], args.iterations, args.repeat)
+        print(f"{name:<26}{before:>12.2f}{after:>12.2f}{before / after:>9.1f}x")
+    print(f"\nprompt length {len(compiled.build_full_prompt(PROMPT))} chars untyped, "
+          f"{len(compiled.build_full_prompt(PROMPT, 'quiz'))} typed (was {len(legacy.build_full_prompt(PROMPT, 'quiz'))}), "
+          f"template version {compiled.template_version}")
+
+
+if __name__ == "__main__":
+    main()
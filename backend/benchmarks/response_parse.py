@@ -0,0 +1,80 @@
+"""
+Response Parse Benchmark
+Cost of turning an LLM response into a GameSchema: the fast path, where
+the compiled decoder (orjson when installed) feeds pydantic-core validation
+directly, against the previous route that every response took,
+json_repair.loads to a dict and then the checked GameSchema(**data).
+The corpus has a game of every type, compact and indented, plus a fenced
+response and a large quiz; the last column is the path the processor took:
+
+    python -m benchmarks.response_parse --iterations 2000
+"""
+
+import argparse
+import json
+import random
+import timeit
+from typing import Callable, Dict, List, Optional
+
+from app.core.metrics import get_metrics
+from app.services.response_processor import ResponseProcessor
+from tools.sample_games import CONTENT_BUILDERS, sample_game
+
+
+class LegacyResponseProcessor(ResponseProcessor):
+    """process_response as it was before the fast path: always a dict first"""
+
+    def process_response(self, raw_response: str):
+        return self._validate_game_schema(self._parse_json(raw_response))
+
+
+def inputs() -> Dict[str, str]:
+    corpus = {}
+    for game_type in CONTENT_BUILDERS:
+        game = sample_game(game_type, random.Random(1))
+        corpus[game_type] = json.dumps(game)
+        corpus[f"{game_type} (indented)"] = json.dumps(game, indent=2)
+    quiz = sample_game("quiz", random.Random(2))
+    corpus["fenced"] = f"```json\n{json.dumps(quiz, indent=2)}\n```"
+    corpus["large quiz"] = json.dumps({**quiz, "content": {"questions": [
+        sample_game("quiz", random.Random(i))["content"]["questions"][0] for i in range(500)]}})
+    return corpus
+
+
+def measure(case: Callable[[], object], iterations: int, repeat: int) -> float:
+    """Best-of-repeat microseconds per call"""
+    return min(timeit.repeat(case, number=iterations, repeat=repeat)) / iterations * 1e6
+
+
+def path_taken(processor: ResponseProcessor, text: str) -> str:
+    metrics = get_metrics()
+    fast = metrics.get_counter("response.parse", path="fast")
+    processor.process_response(text)
+    return "fast" if metrics.get_counter("response.parse", path="fast") > fast else "repair"
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    legacy, processor = LegacyResponseProcessor(), ResponseProcessor()
+    # Both share the module logger: keep its per-response lines out of the timings
+    legacy.logger.disabled = True
+    total_before = total_after = 0.0
+    print(f"{'input':<30}{'chars':>8}{'before (us)':>14}{'after (us)':>12}{'speedup':>9}  path")
+    for name, text in inputs().items():
+        assert processor.process_response(text).dict(exclude={"generatedAt"}) == \
+            legacy.process_response(text).dict(exclude={"generatedAt"}), name
+        before = measure(lambda: legacy.process_response(text), args.iterations, args.repeat)
+        after = measure(lambda: processor.process_response(text), args.iterations, args.repeat)
+        total_before += before
+        total_after += after
+        print(f"{name:<30}{len(text):>8}{before:>14.1f}{after:>12.1f}{before / after:>8.1f}x  "
+              f"{path_taken(processor, text)}")
+    print(f"{'total':<38}{total_before:>14.1f}{total_after:>12.1f}{total_before / total_after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,24 +4,32 @@ Converts n8n workflow logic into modular Python FastAPI application
 Uses Google Gemini as the only LLM provider
 """
 
+import asyncio
+import hmac
 import json
 import re
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import logging
 
-from fastapi import FastAPI, HTTPException, Request, Depends
+from fastapi import FastAPI, HTTPException, Request, Response, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 import httpx
 from dotenv import load_dotenv
 import os
 
 # Import custom modules
-from app.models.game_schemas import GameGenerationRequest, GameSchema
+from app.models.game_schemas import GameGenerationRequest, BatchGenerationRequest, GameSchema
 from app.core.container import get_service_container, ServiceContainer
 from app.core.config import get_settings
 from app.core.logging_config import setup_logging
+from app.core.metrics import get_metrics
+from app.core.deadline import Deadline
+from app.core.disconnect import cancel_on_disconnect, record_cancelled
+from app.services.stream_parser import GameHeaderParser
+from app.services.token_estimator import estimate_tokens
 from app.core.exceptions import (
     handle_service_error, 
     handle_validation_error, 
@@ -70,6 +78,7 @@ async def startup_event():
     logger.info("Starting GameGPT Backend API...")
     container = get_service_container()
     container.initialize()
+    await container.start()
     logger.info("Service container initialized successfully")
 
 
@@ -78,7 +87,7 @@ async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Shutting down GameGPT Backend API...")
     container = get_service_container()
-    container.shutdown()
+    await container.shutdown()
     logger.info("Shutdown complete")
 
 
@@ -94,26 +103,37 @@ async def root():
 
 
 @app.get("/health")
+@app.get("/health/live")
 async def health_check():
-    """Health check endpoint"""
+    """Liveness check: the process is up and serving requests (no dependency calls)"""
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
-async def health_check(services: ServiceContainer = Depends(get_services)):
-    """Detailed health check with dependency injection"""
-    try:
-        health_status = await services.health_check_all()
-        return health_status
-    except Exception as e:
-        logger.error(f"Health check failed: {str(e)}")
-        return {
-            "status": "unhealthy",
-            "timestamp": datetime.now().isoformat(),
-            "error": str(e)
-        }
+
+
+@app.get("/health/ready")
+async def readiness_check(services: ServiceContainer = Depends(get_services)):
+    """
+    Readiness check with per-service detail
+    Serves the snapshot kept fresh by the background health monitor; returns 503
+    when a service is unhealthy or the snapshot is older than HEALTH_STALE_AFTER
+    """
+    snapshot = services.health_snapshot()
+    ready = services.health_monitor is not None and services.health_monitor.is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={**snapshot, "ready": ready}
+    )
+
+
+def _server_timing(timings: Dict[str, float]) -> str:
+    """Format stage timings (seconds) as a Server-Timing header value in milliseconds"""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
 
 
 @app.post("/generate", response_model=GameSchema)
 async def generate_game(
     request: GameGenerationRequest,
+    http_request: Request,
+    response: Response,
     services: ServiceContainer = Depends(get_services)
 ):
     """
@@ -124,33 +144,25 @@ async def generate_game(
     2. Edit Fields builds the full prompt
     3. LLM Chain processes the prompt
     4. Code cleans and parses the response
+    
+    If the client disconnects first, the in-flight LLM call is cancelled and
+    the response is never processed. Stage times are reported in the
+    Server-Timing header
     """
     try:
         logger.info(f"Received game generation request: {request.prompt[:100]}...")
         
-        # Step 1: Build the full therapeutic prompt (equivalent to Edit Fields node)
-        logger.info("Building therapeutic prompt...")
-        try:
-            full_prompt = services.get_prompt_builder().build_full_prompt(request.prompt)
-        except Exception as e:
-            raise handle_service_error(e, "prompt_builder", "build_full_prompt")
-        
-        # Step 2: Process through LLM (equivalent to Basic LLM Chain node)
-        logger.info("Processing through LLM...")
-        try:
-            raw_response = await services.get_llm_service().generate_response(full_prompt)
-        except Exception as e:
-            raise handle_external_service_error(e, "gemini", getattr(e, 'status_code', None))
-        
-        # Step 3: Clean and parse response (equivalent to Code node)
-        logger.info("Processing LLM response...")
-        try:
-            game_schema = services.get_response_processor().process_response(raw_response)
-        except Exception as e:
-            raise handle_service_error(e, "response_processor", "process_response")
+        deadline = Deadline(settings.REQUEST_TIMEOUT)
+        result = await cancel_on_disconnect(
+            http_request,
+            services.get_game_pipeline().generate(request.prompt, deadline=deadline, game_type=request.gameType),
+            endpoint="generate",
+            deadline=deadline
+        )
         
-        logger.info(f"Successfully generated game: {game_schema.id}")
-        return game_schema
+        logger.info(f"Successfully generated game: {result.game.id}")
+        response.headers["Server-Timing"] = _server_timing(result.timings)
+        return result.game
         
     except HTTPException:
         # Re-raise HTTP exceptions as-is
@@ -165,9 +177,169 @@ async def generate_game(
         )
 
 
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format a server-sent event frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _error_payload(error: HTTPException) -> Dict[str, Any]:
+    """Convert an HTTPException raised by the error handlers into a streamed error body"""
+    detail = error.detail if isinstance(error.detail, dict) else {"message": str(error.detail)}
+    return {"status_code": error.status_code, **detail}
+
+
+@app.post("/generate/stream")
+async def generate_game_stream(
+    request: GameGenerationRequest,
+    services: ServiceContainer = Depends(get_services)
+):
+    """
+    Streaming game generation endpoint (server-sent events)
+    
+    Events emitted, in order:
+    - token: raw text deltas relayed from the LLM provider as they arrive
+    - preview: title, type and description as soon as they are parsed
+    - game: the final validated game schema
+    - error: structured error detail if any stage fails
+    """
+    logger.info(f"Received streaming game generation request: {request.prompt[:100]}...")
+    
+    deadline = Deadline(settings.REQUEST_TIMEOUT)
+    
+    async def event_stream():
+        try:
+            try:
+                deadline.check(stage="prompt_builder")
+                llm_request = services.get_game_pipeline().build_request(
+                    request.prompt, request.gameType, endpoint="generate_stream"
+                )
+            except Exception as e:
+                raise handle_service_error(e, "prompt_builder", "build_full_prompt")
+            
+            header_parser = GameHeaderParser()
+            chunks = []
+            completed = []
+            try:
+                async for text in services.get_llm_service().stream_response(
+                    llm_request, deadline, on_complete=completed.append
+                ):
+                    chunks.append(text)
+                    yield _sse_event("token", {"text": text})
+                    if header_parser.feed(text):
+                        yield _sse_event("preview", header_parser.preview())
+            except Exception as e:
+                raise handle_external_service_error(e, "llm", getattr(e, 'status_code', None))
+            if completed:
+                services.get_game_pipeline().record_truncation(llm_request, request.prompt, completed[0])
+            
+            try:
+                deadline.check(stage="response_processor")
+                text = "".join(chunks)
+                game_schema = services.get_response_processor().process_response(text)
+            except Exception as e:
+                if completed:
+                    services.get_game_pipeline().record_usage(llm_request, completed[0])
+                raise handle_service_error(e, "response_processor", "process_response")
+            llm_result = completed[0] if completed else None
+            if llm_result is not None:
+                services.get_game_pipeline().record_usage(llm_request, llm_result, game_schema)
+            services.get_game_pipeline().record_output(game_schema, text, llm_result)
+            
+            logger.info(f"Successfully streamed game: {game_schema.id}")
+            yield _sse_event("game", game_schema.dict())
+            
+        except asyncio.CancelledError:
+            # Starlette cancels the stream when the client disconnects
+            record_cancelled("generate_stream", deadline)
+            raise
+        except HTTPException as e:
+            yield _sse_event("error", _error_payload(e))
+        except Exception as e:
+            logger.error(f"Unexpected error streaming game: {str(e)}")
+            yield _sse_event("error", _error_payload(create_error_response(
+                error_code=ErrorCode.INTERNAL_ERROR,
+                message="Internal server error during game generation",
+                details={"error": str(e)},
+                status_code=500
+            )))
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _batch_line(index: int, outcome: Any) -> str:
+    """Format one /generate/batch result (a GenerationResult or the item's error) as an NDJSON line"""
+    if isinstance(outcome, HTTPException):
+        line = {"index": index, "status": "error", "error": _error_payload(outcome)}
+    elif isinstance(outcome, Exception):
+        logger.error(f"Unexpected error in batch item {index}: {str(outcome)}")
+        line = {"index": index, "status": "error", "error": _error_payload(create_error_response(
+            error_code=ErrorCode.INTERNAL_ERROR,
+            message="Internal server error during game generation",
+            details={"error": str(outcome)},
+            status_code=500
+        ))}
+    else:
+        line = {
+            "index": index,
+            "status": "ok",
+            "cache_hit": outcome.cache_hit,
+            "game": outcome.game.dict()
+        }
+    return json.dumps(line) + "\n"
+
+
+@app.post("/generate/batch")
+async def generate_game_batch(
+    request: BatchGenerationRequest,
+    services: ServiceContainer = Depends(get_services)
+):
+    """
+    Batch game generation endpoint (NDJSON)
+    
+    Items run concurrently (at most BATCH_MAX_PARALLELISM at a time) through the
+    same pipeline as /generate. One JSON line is written per item as it finishes,
+    in completion order and tagged with the item's index; a failed item produces
+    an error line without aborting the batch. The last line is a summary.
+    """
+    logger.info(f"Received batch generation request with {len(request.items)} items")
+    pipeline = services.get_game_pipeline()
+    prompts = [item.prompt for item in request.items]
+    game_types = [item.gameType for item in request.items]
+    
+    async def ndjson_stream():
+        succeeded = 0
+        completed = 0
+        try:
+            async for index, outcome in pipeline.generate_batch(prompts, settings.BATCH_MAX_PARALLELISM, game_types):
+                completed += 1
+                if not isinstance(outcome, Exception):
+                    succeeded += 1
+                yield _batch_line(index, outcome)
+        except asyncio.CancelledError:
+            # generate_batch cancels the unfinished items on the way out
+            get_metrics().increment("requests.cancelled", value=len(prompts) - completed, endpoint="generate_batch", stage="llm")
+            raise
+        
+        logger.info(f"Batch finished: {succeeded}/{len(prompts)} games generated")
+        yield json.dumps({
+            "status": "done",
+            "total": len(prompts),
+            "succeeded": succeeded,
+            "failed": len(prompts) - succeeded
+        }) + "\n"
+    
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+
+
 @app.post("/generate/debug")
 async def generate_game_debug(
     request: GameGenerationRequest,
+    http_request: Request,
+    response: Response,
     services: ServiceContainer = Depends(get_services)
 ):
     """
@@ -176,29 +348,28 @@ async def generate_game_debug(
     try:
         logger.info(f"Debug generation request: {request.prompt[:100]}...")
         
-        # Step 1: Build prompt
-        try:
-            full_prompt = services.get_prompt_builder().build_full_prompt(request.prompt)
-        except Exception as e:
-            raise handle_service_error(e, "prompt_builder", "build_full_prompt")
-        
-        # Step 2: Get LLM response
-        try:
-            raw_response = await services.get_llm_service().generate_response(full_prompt)
-        except Exception as e:
-            raise handle_external_service_error(e, "gemini", getattr(e, 'status_code', None))
-        
-        # Step 3: Process response
-        try:
-            game_schema = services.get_response_processor().process_response(raw_response)
-        except Exception as e:
-            raise handle_service_error(e, "response_processor", "process_response")
+        deadline = Deadline(settings.REQUEST_TIMEOUT)
+        result = await cancel_on_disconnect(
+            http_request,
+            services.get_game_pipeline().generate(
+                request.prompt, deadline=deadline, use_cache=False, game_type=request.gameType,
+                endpoint="generate_debug"
+            ),
+            endpoint="generate_debug",
+            deadline=deadline
+        )
+        full_prompt = result.full_prompt
+        raw_response = result.raw_response
+        response.headers["Server-Timing"] = _server_timing(result.timings)
         
         return {
             "request": request.dict(),
             "full_prompt": full_prompt[:500] + "..." if len(full_prompt) > 500 else full_prompt,
             "raw_response": raw_response[:500] + "..." if len(raw_response) > 500 else raw_response,
-            "final_game": game_schema.dict()
+            "final_game": result.game.dict(),
+            "prompt_tokens": estimate_tokens(full_prompt),
+            "provider": result.llm.provider if result.llm else None,
+            "timings": result.timings
         }
         
     except HTTPException:
@@ -215,15 +386,110 @@ async def generate_game_debug(
 
 @app.get("/stats")
 async def get_stats():
-    """Get API usage statistics"""
+    """Get API usage statistics (retry, latency and other in-process metrics)"""
     return {
-        "total_requests": "Not implemented",
-        "successful_generations": "Not implemented", 
-        "error_rate": "Not implemented",
-        "avg_response_time": "Not implemented"
+        "timestamp": datetime.now().isoformat(),
+        "metrics": get_metrics().snapshot()
     }
 
 
+@app.get("/stats/usage")
+async def get_usage_stats(
+    group_by: str = "endpoint,game_type,template_version,provider,model",
+    services: ServiceContainer = Depends(get_services)
+):
+    """
+    Token usage and estimated cost of LLM calls since the ledger was started
+    group_by is a comma-separated subset of endpoint, game_type, template_version, provider, model
+    """
+    dimensions = [dimension.strip() for dimension in group_by.split(",") if dimension.strip()]
+    try:
+        report = services.get_usage_ledger().report(dimensions)
+    except ValueError as e:
+        raise create_error_response(
+            error_code=ErrorCode.INVALID_REQUEST,
+            message=str(e),
+            status_code=400
+        )
+    return {"timestamp": datetime.now().isoformat(), **report}
+
+
+class CacheWarmRequest(BaseModel):
+    """Prompts to pre-generate into the game cache"""
+    prompts: List[str] = Field(..., min_length=1, max_length=100)
+
+
+def require_admin(x_admin_key: Optional[str] = Header(None)) -> None:
+    """Guard admin endpoints with ADMIN_API_KEY; without a configured key they are disabled"""
+    if not settings.ADMIN_API_KEY:
+        raise create_error_response(
+            error_code=ErrorCode.INVALID_REQUEST,
+            message="Admin endpoints are disabled (ADMIN_API_KEY is not set)",
+            status_code=403
+        )
+    if not hmac.compare_digest((x_admin_key or "").encode(), settings.ADMIN_API_KEY.encode()):
+        raise create_error_response(
+            error_code=ErrorCode.INVALID_REQUEST,
+            message="Invalid or missing admin key",
+            status_code=401
+        )
+
+
+@app.get("/admin/cache", dependencies=[Depends(require_admin)])
+async def inspect_cache(limit: int = 100, services: ServiceContainer = Depends(get_services)):
+    """Inspect both cache tiers and the hit ratio"""
+    return await services.get_game_cache().stats(limit=limit)
+
+
+@app.get("/admin/cache/{key}", dependencies=[Depends(require_admin)])
+async def get_cache_entry(key: str, services: ServiceContainer = Depends(get_services)):
+    """Return one cached game payload"""
+    payload = await services.get_game_cache().inspect(key)
+    if payload is None:
+        raise create_error_response(
+            error_code=ErrorCode.INVALID_REQUEST,
+            message="Cache entry not found",
+            details={"key": key},
+            status_code=404
+        )
+    return {"key": key, "game": payload}
+
+
+@app.delete("/admin/cache/{key}", dependencies=[Depends(require_admin)])
+async def evict_cache_entry(key: str, services: ServiceContainer = Depends(get_services)):
+    """Evict one cache entry from both tiers"""
+    return {"key": key, "evicted": await services.get_game_cache().delete(key)}
+
+
+@app.delete("/admin/cache", dependencies=[Depends(require_admin)])
+async def clear_cache(services: ServiceContainer = Depends(get_services)):
+    """Evict every cache entry"""
+    return {"evicted": await services.get_game_cache().clear()}
+
+
+@app.post("/admin/cache/warm", dependencies=[Depends(require_admin)])
+async def warm_cache(request: CacheWarmRequest, services: ServiceContainer = Depends(get_services)):
+    """Generate (or confirm cached) games for a list of prompts"""
+    pipeline = services.get_game_pipeline()
+    semaphore = asyncio.Semaphore(max(1, settings.CACHE_WARM_CONCURRENCY))
+    
+    async def warm(prompt: str) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                result = await pipeline.generate(prompt, endpoint="cache_warm")
+                return {
+                    "prompt": prompt,
+                    "key": pipeline.request_key(prompt),
+                    "status": "cached" if result.cache_hit else "generated",
+                    "game_id": result.game.id
+                }
+            except HTTPException as e:
+                return {"prompt": prompt, "status": "error", "error": e.detail}
+    
+    results = await asyncio.gather(*(warm(prompt) for prompt in request.prompts))
+    return {"results": results}
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
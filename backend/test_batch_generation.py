@@ -0,0 +1,77 @@
+"""
+Tests for batch generation with bounded parallelism
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+
+from app.services.game_pipeline import GamePipeline
+
+
+def make_pipeline(generate):
+    pipeline = GamePipeline(SimpleNamespace(template_version="test"), None, None)
+    pipeline.generate = generate
+    return pipeline
+
+
+def test_parallelism_is_capped_and_results_stream_as_they_finish():
+    running = 0
+    peak = 0
+
+    async def generate(prompt, game_type=None, endpoint="generate"):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05 if prompt == "slow" else 0.01)
+        running -= 1
+        return prompt
+
+    pipeline = make_pipeline(generate)
+
+    async def run():
+        prompts = ["slow", "a", "b", "c", "d"]
+        return [item async for item in pipeline.generate_batch(prompts, parallelism=2)]
+
+    results = asyncio.run(run())
+    assert peak == 2
+    assert sorted(index for index, _ in results) == [0, 1, 2, 3, 4]
+    assert results[-1] == (0, "slow")
+
+
+def test_failed_item_does_not_abort_batch():
+    async def generate(prompt, game_type=None, endpoint="generate"):
+        if prompt == "bad":
+            raise HTTPException(status_code=502, detail={"error_code": "LLM_SERVICE_ERROR"})
+        return prompt
+
+    pipeline = make_pipeline(generate)
+
+    async def run():
+        return dict([item async for item in pipeline.generate_batch(["ok", "bad", "fine"], parallelism=3)])
+
+    results = asyncio.run(run())
+    assert results[0] == "ok" and results[2] == "fine"
+    assert isinstance(results[1], HTTPException)
+
+
+def test_stopping_early_cancels_remaining_items():
+    finished = []
+
+    async def generate(prompt, game_type=None, endpoint="generate"):
+        await asyncio.sleep(0.01 if prompt == "fast" else 1)
+        finished.append(prompt)
+        return prompt
+
+    pipeline = make_pipeline(generate)
+
+    async def run():
+        batch = pipeline.generate_batch(["fast", "slow", "slow"], parallelism=3)
+        first = await batch.__anext__()
+        await batch.aclose()
+        await asyncio.sleep(0.05)
+        return first
+
+    assert asyncio.run(run()) == (0, "fast")
+    assert finished == ["fast"]
@@ -0,0 +1,68 @@
+"""
+Tests for the AIMD concurrency limiter
+"""
+
+import asyncio
+
+from app.core.exceptions import ExternalServiceException, ErrorCode
+from app.services.concurrency_limiter import AdaptiveConcurrencyLimiter
+
+
+def test_limits_in_flight_and_serves_fifo():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=2)
+    order = []
+    peak = []
+    
+    async def call(i):
+        async with limiter.slot():
+            order.append(i)
+            peak.append(limiter.in_flight)
+            await asyncio.sleep(0.01)
+    
+    async def run():
+        await asyncio.gather(*(call(i) for i in range(6)))
+    
+    asyncio.run(run())
+    assert order == list(range(6))
+    assert max(peak) == 2
+    assert limiter.in_flight == 0
+
+
+def test_multiplicative_decrease_on_rate_limit():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=16, min_limit=2)
+    
+    async def throttled():
+        async with limiter.slot():
+            raise ExternalServiceException(
+                message="Rate limit", error_code=ErrorCode.GEMINI_RATE_LIMIT,
+                service_name="gemini", status_code=429
+            )
+    
+    try:
+        asyncio.run(throttled())
+    except ExternalServiceException:
+        pass
+    assert limiter.limit == 8
+
+
+def test_additive_increase_while_saturated():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=10)
+    limiter.in_flight = 2
+    for _ in range(4):
+        limiter.on_success(0.1)
+    assert 2.5 < limiter.limit < 4
+
+
+def test_queue_timeout():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+    
+    async def run():
+        await limiter.acquire()
+        try:
+            await limiter.acquire(timeout=0.01)
+        except Exception as e:
+            return e
+    
+    error = asyncio.run(run())
+    assert error.error_code == ErrorCode.TIMEOUT_ERROR
+    assert limiter.queued == 0
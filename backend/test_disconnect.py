@@ -0,0 +1,69 @@
+"""
+Tests for cancelling request work when the client disconnects
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.deadline import Deadline
+from app.core.disconnect import ClientDisconnected, cancel_on_disconnect
+from app.core.metrics import get_metrics
+
+
+class FakeRequest:
+    def __init__(self, disconnect_after: float):
+        self.disconnect_at = None
+        self.disconnect_after = disconnect_after
+
+    async def is_disconnected(self):
+        loop = asyncio.get_running_loop()
+        if self.disconnect_at is None:
+            self.disconnect_at = loop.time() + self.disconnect_after
+        return loop.time() >= self.disconnect_at
+
+
+def test_disconnect_cancels_work_and_counts_it():
+    deadline = Deadline(30)
+    state = {"cancelled": False, "processed": False}
+
+    async def work():
+        deadline.check(stage="llm")
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+        state["processed"] = True
+
+    before = get_metrics().get_counter("requests.cancelled", endpoint="test", stage="llm")
+
+    async def run():
+        await cancel_on_disconnect(FakeRequest(0.02), work(), endpoint="test", deadline=deadline, poll_interval=0.01)
+
+    with pytest.raises(ClientDisconnected) as error:
+        asyncio.run(run())
+
+    assert error.value.status_code == 499 and error.value.stage == "llm"
+    assert state == {"cancelled": True, "processed": False}
+    assert get_metrics().get_counter("requests.cancelled", endpoint="test", stage="llm") == before + 1
+
+
+def test_connected_client_gets_result():
+    async def work():
+        await asyncio.sleep(0.03)
+        return "game"
+
+    async def run():
+        return await cancel_on_disconnect(FakeRequest(10), work(), endpoint="test", poll_interval=0.01)
+
+    assert asyncio.run(run()) == "game"
+
+
+def test_deadline_records_last_stage():
+    deadline = Deadline(30)
+    deadline.check(stage="prompt_builder")
+    deadline.check()
+    assert deadline.stage == "prompt_builder"
+    deadline.check(stage="response_processor")
+    assert deadline.stage == "response_processor"
@@ -0,0 +1,81 @@
+"""
+Tests for the bundled fake LLM provider server
+"""
+
+import asyncio
+import json
+import random
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.core.exceptions import ExternalServiceException
+from app.models.game_schemas import GameSchema
+from app.services.llm_providers import GeminiProvider, LLMRequest, OpenRouterProvider
+from app.services.response_processor import ResponseProcessor
+from tools.fake_llm_server import FakeConfig, create_app
+from tools.sample_games import CONTENT_BUILDERS, sample_game
+
+SETTINGS = SimpleNamespace(GOOGLE_API_KEY="fake", OPENROUTER_API_KEY="fake", TEMPERATURE=0.7, MAX_TOKENS=100)
+
+FAST = dict(latency_ms=0, tokens_per_second=1e6, seed=7)
+
+
+def _provider(cls, app, model):
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+    return cls(client, SETTINGS, model, "http://fake")
+
+
+def test_samples_pass_validation_for_every_type():
+    processor = ResponseProcessor()
+    for game_type in CONTENT_BUILDERS:
+        game = processor.process_response(json.dumps(sample_game(game_type, random.Random(1))))
+        assert isinstance(game, GameSchema) and game.type == game_type
+
+
+def test_gemini_generate_and_stream_honour_required_type():
+    provider = _provider(GeminiProvider, create_app(FakeConfig(**FAST)), "gemini-2.5-flash")
+    request = LLMRequest(
+        prompt="Make a game\nRequired Game Type: sorting (use this type and its content template)", json_output=True
+    )
+
+    async def run():
+        result = await provider.generate(request, timeout=5)
+        streamed = "".join([text async for text in provider.stream(request, timeout=5)])
+        return result, streamed
+
+    result, streamed = asyncio.run(run())
+    assert json.loads(result.text)["type"] == "sorting"
+    assert json.loads(streamed)["type"] == "sorting"
+
+
+def test_openrouter_chat_completions():
+    provider = _provider(OpenRouterProvider, create_app(FakeConfig(**FAST)), "fake/game-model")
+
+    async def run():
+        result = await provider.generate(LLMRequest(prompt='The game type is FIXED to "quiz".', json_output=True), timeout=5)
+        streamed = "".join([text async for text in provider.stream(LLMRequest(prompt="anything"), timeout=5)])
+        return result, streamed
+
+    result, streamed = asyncio.run(run())
+    assert json.loads(result.text)["type"] == "quiz"
+    # Without JSON mode the model answers in a markdown code block
+    assert streamed.startswith("```json") and "content" in json.loads(streamed[7:-3])
+
+
+def test_error_and_malformed_injection():
+    app = create_app(FakeConfig(rate_limit_rate=1.0, retry_after=3, **FAST))
+    provider = _provider(GeminiProvider, app, "gemini-2.5-flash")
+
+    with pytest.raises(ExternalServiceException) as error:
+        asyncio.run(provider.generate(LLMRequest(prompt="game"), timeout=5))
+    assert error.value.details["external_status_code"] == 429
+    assert app.state.fake.stats["gemini.rate_limit"] == 1
+
+    app.state.fake.configure(FakeConfig(malformed_rate=1.0, **FAST))
+    texts = [asyncio.run(provider.generate(LLMRequest(prompt="game", json_output=True), timeout=5)).text
+             for _ in range(8)]
+    for text in texts:
+        with pytest.raises(ValueError):
+            json.loads(text)
@@ -0,0 +1,128 @@
+"""
+Tests for the two-tier generated game cache
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from app.models.game_schemas import GameSchema
+from app.services.game_cache import GameCache, MemoryLRUCache, SQLiteGameStore
+
+
+GAME = {
+    "id": "game-20241203-1234",
+    "title": "Test Game",
+    "description": "A test game",
+    "type": "quiz",
+    "difficulty": "easy",
+    "category": "mental-wellness",
+    "estimatedTime": 10,
+    "config": {},
+    "content": {"questions": []},
+    "scoring": {"maxScore": 100, "pointsPerCorrect": 10},
+    "ui": {},
+    "theme": "test-theme",
+}
+
+
+def _settings(tmp_path, **overrides):
+    values = dict(
+        CACHE_ENABLED=True,
+        CACHE_MEMORY_MAX_ENTRIES=2,
+        CACHE_MEMORY_TTL=60,
+        CACHE_DISK_TTL=60,
+        CACHE_DISK_MAX_ENTRIES=100,
+        CACHE_DB_PATH=str(tmp_path / "games.sqlite3"),
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def test_lru_evicts_oldest_and_expires():
+    cache = MemoryLRUCache(max_entries=2, ttl=60)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    cache.get("a")
+    cache.set("c", {"v": 3})
+    assert cache.keys() == ["a", "c"]
+    
+    cache.set("d", {"v": 4}, ttl=0)
+    assert cache.get("d") is None
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    async def run():
+        first = GameCache(_settings(tmp_path))
+        await first.set("key", "a quiz", GameSchema(**GAME))
+        first.close()
+        
+        second = GameCache(_settings(tmp_path))
+        game = await second.get("key")
+        assert game is not None and game.id == GAME["id"]
+        # Promoted into memory on the disk hit
+        assert second.memory.get("key") is not None
+        assert await second.get("missing") is None
+        stats = await second.stats()
+        second.close()
+        return stats
+    
+    stats = asyncio.run(run())
+    assert stats["hits"] == 1 and stats["lookups"] == 2
+    assert stats["disk"]["entries"] == 1
+
+
+def test_delete_and_clear(tmp_path):
+    async def run():
+        cache = GameCache(_settings(tmp_path))
+        await cache.set("a", "p", GameSchema(**GAME))
+        await cache.set("b", "p", GameSchema(**GAME))
+        assert await cache.delete("a")
+        assert await cache.get("a") is None
+        assert await cache.clear() >= 1
+        assert await cache.get("b") is None
+        cache.close()
+    
+    asyncio.run(run())
+
+
+def test_disk_entries_that_no_longer_validate_are_dropped(tmp_path):
+    async def run():
+        cache = GameCache(_settings(tmp_path))
+        cache.disk.set("stale", "a quiz", {**GAME, "content": {"questions": [{"id": "q1"}]}})
+        game = await cache.get("stale")
+        entries = cache.disk.count()
+        cache.close()
+        return game, entries
+    
+    game, entries = asyncio.run(run())
+    assert game is None and entries == 0
+
+
+def test_disk_tier_is_pruned_on_open_and_every_few_writes(tmp_path):
+    path = str(tmp_path / "games.sqlite3")
+    store = SQLiteGameStore(path, ttl=60, max_entries=3, prune_every=2)
+    for index in range(5):
+        store.set(f"k{index}", "p", GAME)
+    # Pruned after the fourth write; the fifth waits for the next prune
+    assert store.count() == 4 and store.get("k0") is None
+    store.ttl = 0
+    store.set("expired", "p", GAME)
+    store.close()
+
+    reopened = SQLiteGameStore(path, ttl=60, max_entries=3)
+    assert [entry["key"] for entry in reopened.entries()] == ["k4", "k3", "k2"]
+    reopened.close()
+
+
+def test_admin_endpoints_fail_closed_without_a_key(monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    monkeypatch.setattr(main.settings, "ADMIN_API_KEY", "")
+    assert client.delete("/admin/cache").status_code == 403
+    assert client.post("/admin/cache/warm", json={"prompts": ["a quiz"]}).status_code == 403
+
+    monkeypatch.setattr(main.settings, "ADMIN_API_KEY", "secret")
+    assert client.delete("/admin/cache", headers={"X-Admin-Key": "wrong"}).status_code == 401
+    assert client.get("/admin/cache", headers={"X-Admin-Key": "secret"}).status_code == 200
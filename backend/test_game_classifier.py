@@ -0,0 +1,85 @@
+"""
+Tests for the local game type classifier
+"""
+
+import asyncio
+import json
+import random
+
+from app.core.deadline import Deadline
+from app.services.game_classifier import GameClassifier
+from app.services.game_pipeline import GamePipeline
+from app.services.llm_providers import LLMResult
+from app.services.output_budget import OutputBudgetModel
+from app.services.prompt_builder import PromptBuilder
+from app.services.response_processor import ResponseProcessor
+from tools.sample_games import sample_game
+
+
+def test_clear_prompts_are_classified_with_confidence():
+    classifier = GameClassifier(min_confidence=0.6)
+
+    result = classifier.classify("Choose your own adventure about handling social anxiety at a party")
+    assert result.game_type == "anxiety-adventure" and result.confident
+    assert result.category == "anxiety-management"
+
+    assert classifier.classify("Fill in the blanks for positive self-talk statements").game_type == "fill-blank"
+    assert classifier.classify("Crossword about self-care vocabulary for adults").game_type == "word-puzzle"
+    assert classifier.classify("Flip cards with daily gratitude prompts").category == "self-care"
+
+
+def test_vague_or_mixed_prompts_fall_back():
+    classifier = GameClassifier(min_confidence=0.6)
+
+    nothing = classifier.classify("Something nice for me today")
+    assert nothing.game_type is None and nothing.type_confidence == 0.0 and not nothing.confident
+    assert not classifier.classify("A quiz or a crossword or a jigsaw about feelings").confident
+    assert classifier.resolve_type("Something nice for me today") is None
+    assert classifier.resolve_type("Something nice", "quiz") == "quiz"
+    assert GameClassifier(enabled=False).resolve_type("Fill in the blanks") is None
+
+
+
+def test_a_single_common_keyword_is_not_confident():
+    classifier = GameClassifier(min_confidence=0.6)
+
+    for prompt, game_type in [("Something fun to help my kid sort out their feelings", "sorting"),
+                              ("Help me know how to calm down before a test", "quiz"),
+                              ("Put together something for my bedtime routine", "story-sequence")]:
+        result = classifier.classify(prompt)
+        assert result.game_type == game_type and not result.confident, prompt
+        assert classifier.resolve_type(prompt) is None
+
+
+def test_confident_prompt_sends_one_content_template(monkeypatch):
+    pipeline = GamePipeline(PromptBuilder(), None, None)
+    pipeline.classifier = GameClassifier(min_confidence=0.6)
+    monkeypatch.setattr(pipeline.settings, "PROMPT_CACHE_ENABLED", False)
+    monkeypatch.setattr(pipeline.settings, "STRUCTURED_OUTPUT", True)
+
+    typed = pipeline.build_request("Sort thoughts into facts and feelings for cognitive behavioural practice")
+    assert "SORTING CONTENT:" in typed.full_prompt and "QUIZ CONTENT:" not in typed.full_prompt
+    assert typed.labels["game_type"] == "sorting"
+    assert typed.response_schema["properties"]["type"]["enum"] == ["sorting"]
+
+    untyped = pipeline.build_request("Something nice for me today")
+    assert "SORTING CONTENT:" in untyped.full_prompt and "QUIZ CONTENT:" in untyped.full_prompt
+    assert untyped.labels["game_type"] == "auto"
+
+
+def test_truncation_is_recorded_under_the_classified_type(monkeypatch):
+    class TruncatingLLM:
+        async def generate(self, request, deadline, validator=None):
+            text = json.dumps(sample_game("sorting", random.Random(1)))
+            return LLMResult(text=text, provider="gemini", model="m", latency=0.1, finish_reason="MAX_TOKENS")
+
+    pipeline = GamePipeline(PromptBuilder(), TruncatingLLM(), ResponseProcessor())
+    pipeline.classifier = GameClassifier(min_confidence=0.6)
+    pipeline.output_budget = OutputBudgetModel(min_samples=1, headroom=1.0, min_tokens=1, max_tokens=8192)
+    monkeypatch.setattr(pipeline.settings, "CACHE_ENABLED", False)
+
+    prompt = "Sort thoughts into facts and feelings for cognitive behavioural practice"
+    asyncio.run(pipeline._run(prompt, Deadline(5)))
+    # Both the truncation and the finished game's size land in the sorting bucket
+    truncated, finished = pipeline.output_budget.tokens[("sorting", None)]
+    assert truncated > finished
@@ -0,0 +1,43 @@
+"""
+Tests for typed validation of game content
+"""
+
+import json
+import random
+
+import pytest
+from pydantic import ValidationError
+
+from app.models.game_schemas import CONTENT_MODELS, GameSchema
+from app.services.response_processor import ResponseProcessor
+from tools.sample_games import sample_game
+
+
+@pytest.mark.parametrize("game_type", sorted(CONTENT_MODELS))
+def test_every_game_type_validates_and_keeps_its_content(game_type):
+    game = sample_game(game_type, random.Random(1))
+    game["content"]["note"] = "extra keys pass through"
+    assert GameSchema(**game).content == game["content"]
+
+
+def test_content_violations_name_the_field():
+    game = sample_game("quiz", random.Random(1))
+    del game["content"]["questions"][0]["explanation"]
+    with pytest.raises(ValidationError, match=r"questions\.0\.explanation: Field required"):
+        GameSchema(**game)
+
+    # Content of another type does not validate
+    with pytest.raises(ValidationError, match="content"):
+        GameSchema(**{**game, "content": sample_game("sorting", random.Random(1))["content"]})
+
+    # An unknown type is reported once, on the type field
+    with pytest.raises(ValidationError) as excinfo:
+        GameSchema(**{**game, "type": "trivia"})
+    assert [error["loc"] for error in excinfo.value.errors()] == [("type",)]
+
+
+def test_processor_rejects_invalid_content():
+    game = sample_game("anxiety-adventure", random.Random(2))
+    game["content"]["scenarios"]["s1"]["anxietyLevel"] = 42
+    with pytest.raises(Exception, match=r"scenarios\.s1\.anxietyLevel"):
+        ResponseProcessor().process_response(json.dumps(game))
@@ -0,0 +1,79 @@
+"""
+Tests for background health probing
+"""
+
+import asyncio
+import time
+
+from app.core.health import HealthMonitor
+
+
+def test_probes_run_concurrently_with_timeouts():
+    async def slow():
+        await asyncio.sleep(0.2)
+        return {"status": "healthy"}
+
+    async def hung():
+        await asyncio.sleep(10)
+        return {"status": "healthy"}
+
+    monitor = HealthMonitor(
+        {"a": slow, "b": slow, "c": hung, "d": lambda: {"status": "healthy"}},
+        probe_timeout=0.3
+    )
+
+    started = time.monotonic()
+    snapshot = asyncio.run(monitor.refresh())
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.6
+    assert snapshot["status"] == "unhealthy"
+    assert "timed out" in snapshot["services"]["c"]["error"]
+    assert snapshot["services"]["a"]["status"] == "healthy"
+
+
+def test_worst_status_wins_and_errors_are_captured():
+    def broken():
+        raise RuntimeError("boom")
+
+    monitor = HealthMonitor({"ok": lambda: {"status": "healthy"}, "llm": lambda: {"status": "degraded"}})
+    assert asyncio.run(monitor.refresh())["status"] == "degraded"
+
+    monitor = HealthMonitor({"ok": lambda: {"status": "healthy"}, "broken": broken})
+    snapshot = asyncio.run(monitor.refresh())
+    assert snapshot["status"] == "unhealthy"
+    assert snapshot["services"]["broken"]["error"] == "boom"
+
+
+def test_snapshot_reports_age_and_staleness():
+    monitor = HealthMonitor({"ok": lambda: {"status": "healthy"}}, stale_after=0.05)
+    assert monitor.snapshot()["status"] == "unknown"
+    assert not monitor.is_ready()
+
+    asyncio.run(monitor.refresh())
+    snapshot = monitor.snapshot()
+    assert snapshot["age"] < 0.05 and not snapshot["stale"]
+    assert monitor.is_ready()
+
+    time.sleep(0.06)
+    assert monitor.snapshot()["stale"]
+    assert not monitor.is_ready()
+
+
+def test_background_task_refreshes_snapshot():
+    calls = []
+
+    def probe():
+        calls.append(1)
+        return {"status": "healthy"}
+
+    monitor = HealthMonitor({"ok": probe}, interval=0.01)
+
+    async def run():
+        monitor.start()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    asyncio.run(run())
+    assert len(calls) >= 2
+    assert monitor.snapshot()["status"] == "healthy"
@@ -0,0 +1,96 @@
+"""
+Tests for hedged LLM requests
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+from app.core.deadline import Deadline
+from app.core.metrics import get_metrics
+from app.services.hedging import HedgePolicy
+from app.services.llm_providers import LLMResult
+from app.services.llm_service import LLMService
+
+
+class StandInRouter:
+    """Router whose providers answer after a set delay with set text"""
+
+    def __init__(self, behaviour):
+        self.behaviour = behaviour
+        self.calls = []
+        self.cancelled = []
+
+    def ranked(self, exclude=None):
+        return [SimpleNamespace(name=name) for name in self.behaviour if name not in (exclude or [])]
+
+    async def generate(self, request, deadline, exclude=None):
+        name = self.ranked(exclude)[0].name
+        delay, text = self.behaviour[name].pop(0)
+        self.calls.append(name)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(name)
+            raise
+        return LLMResult(text=text, provider=name, model="m", latency=delay)
+
+
+def _service(router, **policy):
+    service = LLMService()
+    service.router = router
+    service.hedging = HedgePolicy(**{"enabled": True, "min_samples": 1, "min_delay": 0.05, "burst": 5, **policy})
+    service.hedging.record(0.05)
+    return service
+
+
+def _validate(text):
+    json.loads(text)
+
+
+def test_slow_primary_loses_to_hedge_on_other_provider():
+    router = StandInRouter({"gemini": [(2.0, '{"from": "gemini"}')], "openrouter": [(0.01, '{"from": "openrouter"}')]})
+    service = _service(router, budget_ratio=1.0)
+    before = get_metrics().get_counter("hedge.won", winner="hedge")
+
+    async def run():
+        result = await service.generate("prompt", Deadline(10), validator=_validate)
+        await asyncio.sleep(0)
+        return result
+
+    result = asyncio.run(run())
+    assert result.provider == "openrouter"
+    assert router.calls == ["gemini", "openrouter"]
+    assert router.cancelled == ["gemini"]
+    assert get_metrics().get_counter("hedge.won", winner="hedge") == before + 1
+
+
+def test_invalid_primary_triggers_immediate_hedge():
+    router = StandInRouter({"gemini": [(0.0, "not json")], "openrouter": [(0.0, '{"ok": true}')]})
+    service = _service(router, budget_ratio=1.0, min_delay=5.0)
+
+    result = asyncio.run(service.generate("prompt", Deadline(10), validator=_validate))
+    assert result.provider == "openrouter"
+
+
+def test_budget_caps_hedges():
+    router = StandInRouter({"gemini": [(0.3, '{"a": 1}')] * 10, "openrouter": [(0.0, '{"b": 2}')] * 10})
+    service = _service(router, budget_ratio=0.2, burst=1, percentile=50)
+    for _ in range(50):
+        service.hedging.record(0.05)
+
+    async def run():
+        return [await service.generate("prompt", Deadline(10), validator=_validate) for _ in range(10)]
+
+    results = asyncio.run(run())
+    hedged = sum(1 for result in results if result.provider == "openrouter")
+    assert hedged == 2
+
+
+def test_no_hedging_without_latency_history():
+    policy = HedgePolicy(enabled=True, min_samples=3)
+    policy.record(1.0)
+    assert policy.delay() is None
+    policy.record(2.0)
+    policy.record(3.0)
+    assert policy.delay() == 3.0
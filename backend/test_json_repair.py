@@ -0,0 +1,74 @@
+"""
+Tests for single-pass JSON extraction and repair of LLM output
+"""
+
+import json
+import random
+
+import pytest
+
+from app.services.json_repair import MAX_DEPTH, loads, repair_json
+from app.services.response_processor import ResponseProcessor
+from tools.fake_llm_server import FakeLLM, FakeConfig
+from tools.sample_games import sample_game
+
+
+@pytest.mark.parametrize("text, expected, repairs", [
+    ('{"a": 1}', {"a": 1}, []),
+    ('```json\n{"a": [1, 2,],}\n```', {"a": [1, 2]}, ["fence", "trailing_comma"]),
+    ("Here's the JSON:\n{\"a\": True, 'b': None}\nHope this helps!", {"a": True, "b": None},
+     ["preamble", "trailing_text", "python_literal", "single_quotes"]),
+    ('{{"a": {"b": 1}}}', {"a": {"b": 1}}, ["doubled_brace"]),
+    ('{"a": 1 "b": ["x" "y" {"c": 3}]}', {"a": 1, "b": ["x", "y", {"c": 3}]}, ["missing_comma"]),
+    ('{title: "line\nbreak"}', {"title": "line\nbreak"}, ["unquoted_key", "control_char"]),
+    ('{"a": [1, 2, {"b": "cut\\', {"a": [1, 2, {"b": "cut"}]}, ["truncated"]),
+    ('{"a": 1, "b"', {"a": 1, "b": None}, ["truncated"]),
+    ('note {not this} ```json\n{"a": "x\\"y é"}\n```', {"a": 'x"y é'}, ["fence", "preamble"]),
+])
+def test_repairs_are_applied_and_reported(text, expected, repairs):
+    repaired = repair_json(text)
+    assert json.loads(repaired.text) == expected
+    assert repaired.repairs == repairs
+    assert loads(text) == (expected, repairs)
+
+
+def test_valid_json_is_untouched_and_no_object_is_an_error():
+    game = json.dumps(sample_game("quiz", random.Random(1)), indent=2)
+    assert repair_json(game) == (game, [])
+    with pytest.raises(ValueError):
+        loads("I could not make a game")
+
+
+
+def test_brace_floods_stop_at_max_depth():
+    nested = '{"a": ' * MAX_DEPTH + "1" + "}" * MAX_DEPTH
+    assert loads(nested[:-1])[1] == ["truncated"]
+    for flood in ("{" * 20000, "note {" * 5000 + '{"a": 1}', '{"a": ' + "[" * 20000):
+        with pytest.raises(ValueError, match="nested deeper"):
+            repair_json(flood)
+        with pytest.raises(ValueError):
+            loads(flood)
+
+
+def test_processor_accepts_every_malformed_fake_response():
+    fake = FakeLLM(FakeConfig(malformed_rate=1.0, seed=3))
+    processor = ResponseProcessor()
+    for seed in range(12):
+        text = json.dumps(sample_game("sorting", random.Random(seed)), indent=2)
+        kind = fake.rng.choice(["preamble", "trailing_text", "trailing_comma"])
+        game = processor.process_response(fake._malform(text, kind))
+        assert game.type == "sorting"
+
+
+def test_well_formed_responses_skip_the_repair_path():
+    processor = ResponseProcessor()
+    game = sample_game("matching", random.Random(4))
+    fast = processor.metrics.get_counter("response.parse", path="fast")
+    repair = processor.metrics.get_counter("response.parse", path="repair")
+
+    assert processor.process_response(json.dumps(game)).type == "matching"
+    assert processor.process_response(f"```json\n{json.dumps(game)}\n```").type == "matching"
+    clamped = processor.process_response(json.dumps({**game, "scoring": {**game["scoring"], "maxScore": 500}}))
+    assert clamped.scoring.maxScore == 200
+    assert processor.metrics.get_counter("response.parse", path="fast") == fast + 1
+    assert processor.metrics.get_counter("response.parse", path="repair") == repair + 2
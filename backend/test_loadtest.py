@@ -0,0 +1,52 @@
+"""
+Tests for the load test harness
+"""
+
+import httpx
+
+from tools.loadtest import (
+    RequestOutcome,
+    error_code,
+    parse_args,
+    parse_server_timing,
+    plan_requests,
+    summarize,
+)
+
+
+def test_plan_is_reproducible_for_a_seed():
+    args = parse_args(["--endpoint", "generate=3", "--endpoint", "analyze", "--arrivals", "poisson",
+                       "--requests", "30", "--seed", "5"])
+    first, second = plan_requests(args), plan_requests(args)
+    assert [spec.dict() for spec in first] == [spec.dict() for spec in second]
+    assert {spec.endpoint for spec in first} == {"generate", "analyze"}
+
+    other = plan_requests(parse_args(["--requests", "30", "--seed", "6"]))
+    assert [spec.payload for spec in other] != [spec.payload for spec in first]
+
+
+def test_server_timing_and_error_codes():
+    assert parse_server_timing("prompt_builder;dur=1.5, llm;dur=2000") == {"prompt_builder": 0.0015, "llm": 2.0}
+    assert parse_server_timing(None) == {}
+
+    structured = httpx.Response(503, json={"detail": {"code": "SERVICE_UNAVAILABLE", "message": "down"}})
+    assert error_code(structured) == "SERVICE_UNAVAILABLE"
+    assert error_code(httpx.Response(502, text="bad gateway")) == "HTTP_502"
+
+
+def test_summary_percentiles_errors_and_stages():
+    outcomes = [
+        RequestOutcome(index=i, endpoint="generate", game_type="quiz", status=200, latency=(i + 1) / 100,
+                       stages={"llm": 0.009, "response_processor": 0.001})
+        for i in range(100)
+    ]
+    outcomes.append(RequestOutcome(index=100, endpoint="generate", game_type="quiz", status=504,
+                                   latency=5.0, error_code="TIMEOUT_ERROR"))
+
+    report = summarize(outcomes, wall=2.0, args=parse_args([]))
+
+    assert report["succeeded"] == 100 and report["failed"] == 1
+    assert report["throughput"] == 50.0
+    assert report["latency"]["p50"] == 500.0 and report["latency"]["p999"] == report["latency"]["max"] == 1000.0
+    assert report["errors"] == {"TIMEOUT_ERROR": 1}
+    assert report["stages"]["llm"]["share"] == 0.9
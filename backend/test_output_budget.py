@@ -0,0 +1,83 @@
+"""
+Tests for per-type output token budgets
+"""
+
+from types import SimpleNamespace
+
+from app.services.game_pipeline import GamePipeline
+from app.services.llm_providers import GeminiProvider, LLMRequest, LLMResult
+from app.services.output_budget import OutputBudgetModel, infer_difficulty
+from app.services.prompt_builder import PromptBuilder
+
+
+def test_defaults_until_enough_history():
+    model = OutputBudgetModel(default_tokens=4000, min_samples=3)
+    model.record("quiz", "easy", 500, 2.0)
+    model.record("quiz", "easy", 600, 2.0)
+    assert model.budget("quiz", "easy").max_output_tokens == 4000
+    assert model.budget("quiz", "easy").timeout is None
+
+
+def test_budget_is_percentile_with_headroom_and_bounds():
+    model = OutputBudgetModel(min_samples=5, percentile=99, headroom=1.5, min_tokens=1024,
+                              max_tokens=4096, timeout_headroom=2.0, min_timeout=1.0)
+    for tokens in (900, 1000, 1100, 1200, 2000):
+        model.record("story-adventure", "hard", tokens, 3.0)
+    for _ in range(5):
+        model.record("quiz", "easy", 100, 0.2)
+
+    budget = model.budget("story-adventure", "hard")
+    assert budget.max_output_tokens == 3000
+    assert budget.timeout == 6.0
+    assert budget.key == "story-adventure/hard"
+
+    small = model.budget("quiz", "easy")
+    assert small.max_output_tokens == 1024
+    assert small.timeout == 1.0
+
+
+def test_falls_back_to_broader_buckets():
+    model = OutputBudgetModel(min_samples=2, headroom=1.0, min_tokens=1)
+    model.record("quiz", "easy", 300)
+    model.record("quiz", "hard", 400)
+
+    assert model.budget("quiz", "medium").key == "quiz/any"
+    assert model.budget("riddle", None).key == "any/any"
+    assert model.budget("riddle", None).max_output_tokens == 400
+
+
+def test_truncation_grows_budget():
+    model = OutputBudgetModel(min_samples=1, headroom=1.0, min_tokens=1, max_tokens=8192)
+    model.record("quiz", None, 1000)
+    assert model.budget("quiz").max_output_tokens == 1000
+    model.record_truncated("quiz", None, 1000)
+    assert model.budget("quiz").max_output_tokens == 2000
+
+    assert LLMResult(text="", provider="gemini", model="m", latency=0, finish_reason="MAX_TOKENS").truncated
+
+
+def test_streamed_truncation_is_recorded_under_the_request_type():
+    pipeline = GamePipeline(PromptBuilder(), None, None)
+    pipeline.output_budget = OutputBudgetModel(min_samples=1, headroom=1.0, min_tokens=1, max_tokens=8192)
+    request = LLMRequest(prompt="p", max_output_tokens=1000, labels={"game_type": "quiz"})
+    streamed = LLMResult(text="{", provider="openrouter", model="m", latency=0, finish_reason="length")
+
+    pipeline.record_truncation(request, "An easy quiz", streamed)
+    pipeline.record_truncation(request.model_copy(update={"labels": {"game_type": "auto"}}), "A quiz", streamed)
+    tokens = pipeline.output_budget.tokens
+    assert list(tokens[("quiz", "easy")]) == [2000]
+    # An untyped ("auto") request lands in the typeless buckets only
+    assert len(tokens[("quiz", None)]) == 1 and len(tokens[(None, None)]) == 2
+
+
+def test_difficulty_from_prompt_and_gemini_limit():
+    assert infer_difficulty("An easy quiz about breathing") == "easy"
+    assert infer_difficulty("An advanced puzzle") == "hard"
+    assert infer_difficulty("Easy or hard, you pick") is None
+    assert infer_difficulty("A calming story") is None
+
+    settings = SimpleNamespace(MAX_TOKENS=4000, TEMPERATURE=0.7, TOP_P=0.9, TOP_K=40, STRUCTURED_OUTPUT=False)
+    provider = GeminiProvider(None, settings, "gemini-2.0-flash", "http://fake")
+    payload = provider._build_payload(LLMRequest(prompt="p", max_output_tokens=1500))
+    assert payload["generationConfig"]["maxOutputTokens"] == 1500
+    assert provider._build_payload(LLMRequest(prompt="p"))["generationConfig"]["maxOutputTokens"] == 4000
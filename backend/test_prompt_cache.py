@@ -0,0 +1,183 @@
+"""
+Tests for provider-side prompt prefix caching against a stand-in Gemini server
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+
+from app.core.deadline import Deadline
+from app.core.exceptions import ErrorCode, ExternalServiceException
+from app.services.llm_providers import GeminiProvider, LLMProvider, LLMRequest
+from app.services.prompt_cache import PromptPrefixCache
+from app.services.provider_router import ProviderRouter
+
+SETTINGS = SimpleNamespace(
+    GOOGLE_API_KEY="test-key",
+    TEMPERATURE=0.7,
+    MAX_TOKENS=100,
+    LLM_PROVIDERS="gemini",
+    ROUTER_EWMA_ALPHA=0.2,
+    ROUTER_ERROR_PENALTY=4.0,
+    CIRCUIT_FAILURE_THRESHOLD=5,
+    CIRCUIT_RECOVERY_TIMEOUT=30.0,
+)
+
+PREFIX = "STATIC THERAPEUTIC INSTRUCTIONS"
+
+
+class StandInGemini:
+    """Minimal cachedContents + generateContent server"""
+
+    def __init__(self, create_status=200):
+        self.create_status = create_status
+        self.contexts = {}
+        self.requests = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content) if request.content else {}
+        self.requests.append((request.method, request.url.path, body))
+
+        if request.url.path == "/v1beta/cachedContents":
+            if self.create_status != 200:
+                return httpx.Response(self.create_status, json={"error": {"message": "too small"}})
+            name = f"cachedContents/c{len(self.contexts) + 1}"
+            self.contexts[name] = body["contents"][0]["parts"][0]["text"]
+            return httpx.Response(200, json={"name": name, "model": body["model"]})
+
+        if request.method == "PATCH":
+            name = request.url.path[len("/v1beta/"):]
+            return httpx.Response(200 if name in self.contexts else 404, json={"name": name})
+
+        cached = body.get("cachedContent")
+        if cached is not None and cached not in self.contexts:
+            return httpx.Response(404, json={"error": {"message": "CachedContent not found"}})
+        prefix = self.contexts.get(cached, "")
+        text = prefix + "|" + body["contents"][0]["parts"][0]["text"]
+        chunk = {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+        if request.url.path.endswith(":streamGenerateContent"):
+            return httpx.Response(200, text=f"data: {json.dumps(chunk)}\n\n")
+        return httpx.Response(200, json=chunk)
+
+    def generate_bodies(self):
+        return [body for method, path, body in self.requests if path.endswith(":generateContent")]
+
+
+def make_router(server, **cache_options):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(server.handler))
+    provider = GeminiProvider(client, SETTINGS, "gemini-test", "http://stand-in")
+    cache = PromptPrefixCache(**cache_options)
+    return ProviderRouter([provider], SETTINGS, cache), cache, provider
+
+
+def test_sends_only_suffix_once_prefix_is_cached():
+    server = StandInGemini()
+    router, cache, _ = make_router(server)
+
+    async def run():
+        request = LLMRequest(prompt="User Request: calm breathing", prefix=PREFIX)
+        results = [await router.generate(request, Deadline(5)) for _ in range(3)]
+        await cache.close()
+        return results
+
+    results = asyncio.run(run())
+
+    creates = [r for r in server.requests if r[1] == "/v1beta/cachedContents"]
+    assert len(creates) == 1
+    assert creates[0][2]["model"] == "models/gemini-test"
+    for body in server.generate_bodies():
+        assert body["cachedContent"] == "cachedContents/c1"
+        assert PREFIX not in body["contents"][0]["parts"][0]["text"]
+    assert results[0].text == f"{PREFIX}|User Request: calm breathing"
+
+
+def test_refreshes_before_expiry():
+    server = StandInGemini()
+    router, cache, provider = make_router(server, ttl=100, refresh_margin=10)
+
+    async def run():
+        first = await cache.get(provider, PREFIX)
+        cache._contexts[next(iter(cache._contexts))] = first.model_copy(update={"expires_at": first.expires_at - 95})
+        assert await cache.refresh_expiring() == 1
+        await cache.close()
+
+    asyncio.run(run())
+
+    methods = [method for method, path, body in server.requests]
+    assert methods == ["POST", "PATCH", "DELETE"]
+    assert server.requests[1][2] == {"ttl": "100s"}
+
+
+def test_falls_back_to_full_prompt_when_cache_unavailable():
+    server = StandInGemini(create_status=400)
+    router, cache, _ = make_router(server, retry_interval=600)
+
+    async def run():
+        request = LLMRequest(prompt="User Request: focus game", prefix=PREFIX)
+        for _ in range(2):
+            await router.generate(request, Deadline(5))
+
+    asyncio.run(run())
+
+    creates = [r for r in server.requests if r[1] == "/v1beta/cachedContents"]
+    assert len(creates) == 1  # not retried within retry_interval
+    for body in server.generate_bodies():
+        assert "cachedContent" not in body
+        assert body["contents"][0]["parts"][0]["text"] == f"{PREFIX}\n\nUser Request: focus game"
+
+
+def test_rejected_context_is_dropped_and_full_prompt_resent():
+    server = StandInGemini()
+    router, cache, _ = make_router(server)
+
+    async def run():
+        request = LLMRequest(prompt="User Request: memory", prefix=PREFIX)
+        await router.generate(request, Deadline(5))
+        server.contexts.clear()  # expired upstream
+        return await router.generate(request, Deadline(5))
+
+    result = asyncio.run(run())
+
+    assert result.text == f"|{PREFIX}\n\nUser Request: memory"
+    assert cache.snapshot()["contexts"] == []
+
+
+def test_rejected_context_is_dropped_on_the_stream_path():
+    server = StandInGemini()
+    router, cache, _ = make_router(server)
+
+    async def run():
+        request = LLMRequest(prompt="User Request: memory", prefix=PREFIX)
+        first = [text async for text in router.stream(request, Deadline(5))]
+        server.contexts.clear()  # expired upstream
+        second = [text async for text in router.stream(request, Deadline(5))]
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first == [f"{PREFIX}|User Request: memory"]
+    assert second == [f"|{PREFIX}\n\nUser Request: memory"]
+    streamed = [body for method, path, body in server.requests if path.endswith(":streamGenerateContent")]
+    assert [body.get("cachedContent") for body in streamed] == ["cachedContents/c1", "cachedContents/c1", None]
+    assert cache.snapshot()["contexts"] == []
+
+
+def test_providers_without_context_caching_are_skipped():
+    server = StandInGemini()
+    router, cache, provider = make_router(server)
+    provider.supports_context_cache = False
+
+    async def run():
+        assert await cache.get(provider, PREFIX) is None
+        assert await LLMProvider.create_cached_context(provider, PREFIX, 60, 5) is None
+        return await router.generate(LLMRequest(prompt="User Request: calm", prefix=PREFIX), Deadline(5))
+
+    result = asyncio.run(run())
+    assert result.text == f"|{PREFIX}\n\nUser Request: calm"
+    assert not [r for r in server.requests if r[1] == "/v1beta/cachedContents"]
+
+    # A 403 on a cached request is a bad key, not an expired context
+    forbidden = ExternalServiceException("denied", ErrorCode.LLM_SERVICE_ERROR, "gemini", status_code=403)
+    assert not router._cached_context_rejected(LLMRequest(prompt="x", cached_context="cachedContents/c1"), forbidden)
@@ -0,0 +1,68 @@
+"""
+Tests for compiled prompt assembly
+"""
+
+from types import SimpleNamespace
+
+from benchmarks.prompt_assembly import LegacyPromptBuilder
+from app.services.llm_providers import GeminiProvider, LLMRequest
+from app.services.prompt_templates import PromptBuilder, PromptTemplates
+from tools.prompt_tokens import load_pyserver
+
+
+def test_compiled_prompt_matches_per_request_assembly():
+    legacy, compiled = LegacyPromptBuilder(), PromptBuilder()
+    for prompt in ["calm breathing", "sort feelings {x}", ""]:
+        assert compiled.build_full_prompt(prompt) == legacy.build_full_prompt(prompt)
+        assert compiled.build_prompt_parts(prompt) == legacy.build_prompt_parts(prompt)
+
+
+def test_known_type_gets_only_its_content_template():
+    compiled = PromptBuilder()
+    full = compiled.build_full_prompt("sort feelings", "sorting")
+    assert "SORTING CONTENT:" in full and "QUIZ CONTENT:" not in full
+    assert "Required Game Type: sorting" in full
+    assert len(full) < len(compiled.build_full_prompt("sort feelings")) * 0.7
+
+    prefix, suffix = compiled.build_prompt_parts("sort feelings", "sorting")
+    assert full == prefix.replace("\n\nANALYSIS REQUIRED", "\n\n\n" + suffix + "\n\nANALYSIS REQUIRED", 1)
+    assert compiled.build_full_prompt("x", "not-a-type") == compiled.build_full_prompt("x", None).replace(
+        "User Request: x", "User Request: x\nRequired Game Type: not-a-type (use this type and its content template)")
+
+
+def test_segment_versions_follow_template_content(monkeypatch):
+    before = PromptBuilder()
+    monkeypatch.setattr(PromptTemplates, "THERAPEUTIC_GUIDELINES", PromptTemplates.THERAPEUTIC_GUIDELINES + "\n- New rule")
+    after = PromptBuilder()
+
+    changed = [name for name in before.segments if before.segments[name].version != after.segments[name].version]
+    assert changed == ["therapeutic_guidelines"]
+    assert after.template_version != before.template_version
+    assert PromptBuilder().template_version == after.template_version
+
+
+def test_prefix_is_stable_and_request_comes_last():
+    compiled = PromptBuilder()
+    for game_type in [None, "quiz", "sorting"]:
+        prefix, suffix = compiled.build_prompt_parts("calm breathing", game_type)
+        other_prefix, other_suffix = compiled.build_prompt_parts("a very different {request}\n\nwith lines", game_type)
+        assert prefix == other_prefix and "calm breathing" not in prefix
+        assert suffix.startswith("User Request: calm breathing") and other_suffix != suffix
+
+    pyserver = load_pyserver()
+    prefix, request = pyserver.prompt_parts("calm breathing", "quiz")
+    assert pyserver.prompt_parts("anything else", "quiz")[0] == prefix
+    assert request == "**User Request:** calm breathing" and "User Request" not in prefix
+
+
+def test_prefix_goes_to_system_instruction_unless_cached():
+    provider = GeminiProvider(None, SimpleNamespace(TEMPERATURE=0.7, MAX_TOKENS=100), "m", "http://x")
+    request = LLMRequest(prompt="User Request: calm", prefix="STATIC", system_prefix=True)
+    payload = provider._build_payload(request)
+    assert payload["systemInstruction"] == {"parts": [{"text": "STATIC"}]}
+    assert payload["contents"][0]["parts"][0]["text"] == "User Request: calm"
+
+    cached = provider._build_payload(request.model_copy(update={"cached_context": "cachedContents/1"}))
+    assert "systemInstruction" not in cached and cached["cachedContent"] == "cachedContents/1"
+    inline = provider._build_payload(request.model_copy(update={"system_prefix": False}))
+    assert inline["contents"][0]["parts"][0]["text"] == "STATIC\n\nUser Request: calm"
@@ -0,0 +1,81 @@
+"""
+Tests for provider routing, failover and circuit breaking
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from app.core.deadline import Deadline
+from app.core.exceptions import ExternalServiceException, ErrorCode
+from app.services.llm_providers import LLMProvider, LLMResult
+from app.services.provider_router import CircuitBreaker, ProviderRouter
+
+SETTINGS = SimpleNamespace(
+    LLM_PROVIDERS="a,b",
+    ROUTER_EWMA_ALPHA=0.5,
+    ROUTER_ERROR_PENALTY=4.0,
+    CIRCUIT_FAILURE_THRESHOLD=2,
+    CIRCUIT_RECOVERY_TIMEOUT=60.0,
+)
+
+
+class FakeProvider(LLMProvider):
+    def __init__(self, name, latency=0.01, fail=False):
+        super().__init__(client=None, settings=SETTINGS, model=f"{name}-model", base_url="http://fake")
+        self.name = name
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+
+    @property
+    def enabled(self):
+        return True
+
+    async def generate(self, prompt, timeout):
+        self.calls += 1
+        if self.fail:
+            raise ExternalServiceException(
+                message="unavailable", error_code=ErrorCode.GEMINI_API_ERROR,
+                service_name=self.name, status_code=503
+            )
+        return LLMResult(text=f"{self.name}:{prompt}", provider=self.name, model=self.model, latency=self.latency)
+
+    async def stream(self, prompt, timeout, usage=None, outcome=None):
+        yield prompt
+
+    async def health_check(self):
+        return {"status": "healthy", "provider": self.name}
+
+
+def test_fails_over_and_opens_circuit():
+    primary, secondary = FakeProvider("a", fail=True), FakeProvider("b")
+    router = ProviderRouter([primary, secondary], SETTINGS)
+    
+    async def run():
+        return [await router.generate("hi", Deadline(5)) for _ in range(3)]
+    
+    results = asyncio.run(run())
+    assert [r.provider for r in results] == ["b", "b", "b"]
+    assert router.breakers["a"].state == CircuitBreaker.OPEN
+    # Once open, the failing provider is no longer called
+    assert primary.calls == 2
+
+
+def test_prefers_lower_latency_provider():
+    slow, fast = FakeProvider("a", latency=2.0), FakeProvider("b", latency=0.1)
+    router = ProviderRouter([slow, fast], SETTINGS)
+    router.stats["a"].record(2.0, success=True)
+    router.stats["b"].record(0.1, success=True)
+    
+    result = asyncio.run(router.generate("hi", Deadline(5)))
+    assert result.provider == "b"
+
+
+def test_half_open_allows_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
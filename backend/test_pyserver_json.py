@@ -0,0 +1,37 @@
+"""
+Tests for pyserver's extraction of the JSON object from model output
+"""
+
+import json
+
+from benchmarks.code_fences import fuzz
+from tools.prompt_tokens import load_pyserver
+
+
+def test_first_complete_object_is_extracted():
+    pyserver = load_pyserver()
+    game = json.dumps({"title": "Calm {breathing}", "text": 'say "\\"}{"', "content": {"steps": [{}]}})
+    for text in [game, f"```json\n{game}\n```", f"Use {{name}} here:\n{game}\nDone {{x}}",
+                 f"Template: {{ name\n{game}", "{" * 100 + "\n" + game]:
+        assert pyserver.strip_code_fences(text) == game
+    assert pyserver.find_json_object(f"{game} {{\"second\": 1}}") == game
+
+
+def test_no_object_returns_the_text():
+    pyserver = load_pyserver()
+    assert pyserver.find_json_object('{"title": "cut off') is None
+    assert pyserver.find_json_object('{"title": "t", "content": {"steps": [{"a": 1}, {"b"') is None
+    assert pyserver.strip_code_fences("```json\n[1, 2]\n```") == "[1, 2]"
+    assert pyserver.strip_code_fences("  {" + "x" * 40 + "  ") == "{" + "x" * 40
+
+
+def test_deeply_nested_output_is_not_an_object():
+    pyserver = load_pyserver()
+    deep = '{"a":' * 2000
+    for text in [deep, "Here you go:\n" + deep, deep + "1" + "}" * 2000]:
+        assert pyserver.find_json_object(text) is None
+        assert pyserver.strip_code_fences(text) == text
+
+
+def test_fuzzed_model_output():
+    assert fuzz(load_pyserver().find_json_object, 500) < 50
@@ -0,0 +1,99 @@
+"""
+Tests for single-flight request coalescing
+"""
+
+import asyncio
+
+from app.services.game_pipeline import GamePipeline, normalize_prompt
+from app.services.prompt_builder import PromptBuilder
+from app.services.request_coalescer import RequestCoalescer
+
+
+def test_concurrent_callers_share_one_call():
+    coalescer = RequestCoalescer("test")
+    calls = []
+    
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"game": len(calls)}
+    
+    async def run():
+        return await asyncio.gather(*(coalescer.run("k", work) for _ in range(5)))
+    
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert coalescer.in_flight == 0
+
+
+def test_follower_cancellation_does_not_break_shared_call():
+    coalescer = RequestCoalescer("test")
+    
+    async def work():
+        await asyncio.sleep(0.02)
+        return "done"
+    
+    async def run():
+        leader = asyncio.ensure_future(coalescer.run("k", work))
+        follower = asyncio.ensure_future(coalescer.run("k", work))
+        await asyncio.sleep(0)
+        follower.cancel()
+        return await leader, follower.cancelled()
+    
+    assert asyncio.run(run()) == ("done", True)
+
+
+def test_shared_call_cancelled_when_all_callers_leave():
+    coalescer = RequestCoalescer("test")
+    started = []
+    
+    async def work():
+        started.append(1)
+        await asyncio.sleep(10)
+    
+    async def run():
+        callers = [asyncio.ensure_future(coalescer.run("k", work)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        return coalescer.in_flight
+    
+    assert asyncio.run(run()) == 0
+    assert started == [1]
+
+
+def test_normalize_prompt():
+    assert normalize_prompt("  A Quiz\n about   STRESS ") == "a quiz about stress"
+
+
+def test_key_tracks_model_settings_and_uncached_calls_run_alone(monkeypatch):
+    pipeline = GamePipeline(PromptBuilder(), None, None)
+    key = pipeline.request_key("A calm quiz")
+    for name, value in [("OPENROUTER_MODEL", "other/model"), ("STRUCTURED_OUTPUT", False), ("PROMPT_LAYOUT", "inline")]:
+        with monkeypatch.context() as patch:
+            patch.setattr(pipeline.settings, name, value)
+            assert pipeline.request_key("A calm quiz") != key
+    for target, name, value in [(pipeline.prompt_builder, "token_budget", 1500),
+                                (pipeline.classifier, "enabled", not pipeline.classifier.enabled),
+                                (pipeline.classifier, "min_confidence", 0.9)]:
+        with monkeypatch.context() as patch:
+            patch.setattr(target, name, value)
+            assert pipeline.request_key("A calm quiz") != key
+
+    runs = []
+
+    async def fake_run(prompt, deadline, game_type=None, endpoint="generate"):
+        runs.append(prompt)
+        await asyncio.sleep(0.01)
+        return prompt
+
+    pipeline._run = fake_run
+    pipeline.cache = None
+
+    async def run():
+        return await asyncio.gather(*(pipeline.generate("A calm quiz", use_cache=False) for _ in range(3)))
+
+    asyncio.run(run())
+    assert len(runs) == 3 and pipeline.coalescer.in_flight == 0
@@ -0,0 +1,85 @@
+"""
+Tests for response schemas generated from the game models
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+
+from app.models.game_schemas import CONTENT_MODELS
+from app.services.llm_providers import GeminiProvider, LLMRequest
+from app.services.response_schema import game_response_schema
+
+SETTINGS = SimpleNamespace(GOOGLE_API_KEY="test-key", TEMPERATURE=0.7, MAX_TOKENS=100)
+
+
+def test_known_type_pins_type_and_content_model():
+    schema = game_response_schema("quiz")
+    properties = schema["properties"]
+
+    assert properties["type"]["enum"] == ["quiz"]
+    question = properties["content"]["properties"]["questions"]["items"]
+    assert question["propertyOrdering"][:2] == ["id", "question"]
+    assert question["properties"]["hint"] == {"type": "STRING", "nullable": True}
+    assert question["properties"]["correctAnswer"]["anyOf"][1]["type"] == "ARRAY"
+    assert "generatedAt" not in properties and "generatedAt" not in schema["propertyOrdering"]
+    assert properties["estimatedTime"] == {"type": "INTEGER", "minimum": 5, "maximum": 30}
+
+
+def _objects(node):
+    """Every OBJECT node in a schema"""
+    if isinstance(node, dict):
+        if node.get("type") == "OBJECT":
+            yield node
+        for value in node.values():
+            yield from _objects(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _objects(value)
+
+
+def test_every_object_lists_its_properties():
+    schemas = [game_response_schema(game_type) for game_type in [None, *CONTENT_MODELS]]
+    for schema in filter(None, schemas):
+        encoded = json.dumps(schema)
+        assert "$ref" not in encoded and "additionalProperties" not in encoded
+        assert all(node.get("properties") for node in _objects(schema))
+    assert game_response_schema("sorting") is game_response_schema("sorting")
+
+
+def test_maps_need_listed_keys():
+    piece = game_response_schema("puzzle-assembly")["properties"]["content"]["properties"]["pieces"]["items"]
+    assert piece["properties"]["correctPosition"]["required"] == ["x", "y"]
+    # Scenarios are keyed by id: the type, and any schema that could pick it, go without one
+    assert game_response_schema("anxiety-adventure") is None
+    assert game_response_schema() is None
+
+
+def test_gemini_drops_rejected_schema_and_keeps_json_mode():
+    bodies = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        bodies.append(body)
+        if "responseSchema" in body["generationConfig"]:
+            return httpx.Response(400, json={"error": {"message": "Invalid JSON payload: response_schema"}})
+        return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": "{}"}]}}]})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    provider = GeminiProvider(client, SETTINGS, "gemini-test", "http://stand-in")
+    request = LLMRequest(prompt="p", json_output=True, response_schema=game_response_schema("quiz"))
+    other = LLMRequest(prompt="p", json_output=True, response_schema=game_response_schema("sorting"))
+
+    async def run():
+        return [await provider.generate(request, timeout=5) for _ in range(2)]
+
+    results = asyncio.run(run())
+    assert [result.text for result in results] == ["{}", "{}"]
+    assert len(bodies) == 3  # one rejected call, then the schema is no longer sent
+    assert all(body["generationConfig"]["responseMimeType"] == "application/json" for body in bodies)
+
+    # Another game type's schema is still tried on its own
+    assert asyncio.run(provider.generate(other, timeout=5)).text == "{}"
+    assert len(bodies) == 5 and "responseSchema" in bodies[3]["generationConfig"]
@@ -0,0 +1,88 @@
+"""
+Tests for the upstream retry policy
+"""
+
+import asyncio
+import random
+
+import httpx
+
+from app.core.deadline import Deadline
+from app.core.exceptions import ExternalServiceException, ErrorCode
+from app.core.retry import RetryPolicy, parse_retry_after, retry_reason
+
+
+def _rate_limited(retry_after=None):
+    details = {"retry_after": retry_after} if retry_after is not None else {}
+    return ExternalServiceException(
+        message="Rate limit exceeded for Gemini API",
+        error_code=ErrorCode.GEMINI_RATE_LIMIT,
+        service_name="gemini",
+        status_code=429,
+        details=details
+    )
+
+
+def test_parse_retry_after_formats():
+    assert parse_retry_after("12") == 12.0
+    assert parse_retry_after("1.5s") == 1.5
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+
+
+def test_classification():
+    assert retry_reason(_rate_limited()) == "rate_limit"
+    quota = ExternalServiceException(
+        message="quota", error_code=ErrorCode.GEMINI_QUOTA_EXCEEDED,
+        service_name="gemini", status_code=403
+    )
+    assert retry_reason(quota) is None
+    assert retry_reason(ValueError("boom")) is None
+
+
+def test_retries_until_success_and_honours_retry_after():
+    policy = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.01, rng=random.Random(1))
+    calls = []
+    
+    async def operation(timeout):
+        calls.append(timeout)
+        if len(calls) < 3:
+            raise _rate_limited(retry_after=0.02)
+        return "ok"
+    
+    async def run():
+        started = asyncio.get_running_loop().time()
+        result = await policy.run(operation, Deadline(5), name="test")
+        return result, asyncio.get_running_loop().time() - started
+    
+    result, elapsed = asyncio.run(run())
+    assert result == "ok"
+    assert len(calls) == 3
+    assert elapsed >= 0.04
+
+
+def test_gives_up_when_backoff_exceeds_deadline():
+    policy = RetryPolicy(max_attempts=5, base_delay=0.001, max_delay=0.01)
+    calls = []
+    
+    async def operation(timeout):
+        calls.append(timeout)
+        raise _rate_limited(retry_after=30)
+    
+    try:
+        asyncio.run(policy.run(operation, Deadline(1), name="test"))
+    except ExternalServiceException as e:
+        assert e.error_code == ErrorCode.GEMINI_RATE_LIMIT
+    else:
+        raise AssertionError("expected rate limit error")
+    assert len(calls) == 1
+
+
+def test_gemini_provider_reads_retry_info():
+    from app.core.config import get_settings
+    from app.services.llm_providers import GeminiProvider
+    
+    service = GeminiProvider(httpx.AsyncClient(), get_settings(), "gemini-test", "http://fake")
+    body = '{"error": {"details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "7s"}]}}'
+    assert service._retry_after(httpx.Headers(), body) == 7.0
+    assert service._retry_after(httpx.Headers({"Retry-After": "3"}), body) == 3.0
@@ -0,0 +1,32 @@
+"""
+Tests for the streaming game header parser
+"""
+
+from app.services.stream_parser import GameHeaderParser
+
+
+def test_preview_fields_split_across_chunks():
+    text = (
+        '```json\n{"id": "game-20241203-1234", "title": "Calm \\"Breaths\\"",'
+        ' "description": "Learn box breathing", "type": "quiz", "content": {}}\n```'
+    )
+    parser = GameHeaderParser()
+    completed_at = None
+    for i in range(0, len(text), 7):
+        if parser.feed(text[i:i + 7]):
+            completed_at = i
+    
+    assert completed_at is not None
+    assert parser.preview() == {
+        "title": 'Calm "Breaths"',
+        "type": "quiz",
+        "description": "Learn box breathing",
+    }
+
+
+def test_nested_fields_are_ignored():
+    parser = GameHeaderParser()
+    parser.feed('{"content": {"title": "Nested", "type": "inner"}, "title": "Outer"')
+    
+    assert parser.values == {"title": "Outer"}
+    assert not parser.complete
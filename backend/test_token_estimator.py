@@ -0,0 +1,68 @@
+"""
+Tests for prompt token estimation and budget enforcement
+"""
+
+from app.services.prompt_builder import PromptBuilder
+from app.services.token_estimator import compact, estimate_tokens, fit_sections
+from tools.prompt_tokens import backend_variants, pyserver_variants
+
+
+def test_estimate_counts_words_digits_and_punctuation():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("calm breathing") == 3
+    assert estimate_tokens("4-6 items.\n\n") == 6
+    assert estimate_tokens("a  b") == estimate_tokens("a b")
+
+
+def test_compact_keeps_first_clauses():
+    text = "HEADING\n\n- Easy: 4-6 items, basic concepts, hints\n- Use compassionate, non-judgmental language"
+    assert compact(text) == "HEADING\n- Easy: 4-6 items\n- Use compassionate, non-judgmental language"
+
+
+def test_fit_compacts_before_dropping_and_keeps_required():
+    sections = [
+        ("system", "You generate games."),
+        ("notes", "NOTES\n\n- first clause of the note, with a long tail of detail words here"),
+        ("extra", "extra words " * 20),
+        ("schema", "{ \"id\": \"string\" }"),
+    ]
+    untouched, size = fit_sections(sections, None, ("notes", "extra"))
+    assert untouched == sections and not size.trimmed
+    assert size.total == sum(size.sections.values()) + 3
+
+    _, size = fit_sections(sections, size.total - 5, ("notes", "extra"))
+    assert size.compacted == ["notes"] and size.dropped == []
+
+    fitted, size = fit_sections(sections, 20, ("notes", "extra"))
+    assert [name for name, _ in fitted] == ["system", "schema"]
+    assert size.dropped == ["notes", "extra"] and size.compacted == []
+    assert size.over_budget is False
+
+    _, size = fit_sections(sections, 1, ("notes", "extra"))
+    assert size.over_budget
+
+
+def test_prompt_builder_enforces_budget():
+    unlimited = PromptBuilder(token_budget=0)
+    full = unlimited.build_full_prompt("A stress quiz", "quiz")
+    _, size = unlimited.fit("A stress quiz", "quiz")
+    assert size.budget is None and not size.trimmed
+
+    limited = PromptBuilder(token_budget=size.total - 300)
+    trimmed = limited.build_full_prompt("A stress quiz", "quiz")
+    assert len(trimmed) < len(full)
+    assert "User Request: A stress quiz" in trimmed
+    assert limited.modular_builder.segments["json_schema"].text in trimmed
+    assert estimate_tokens(trimmed) <= size.total - 300 + 20
+
+    prefix, suffix = limited.build_prompt_parts("A stress quiz", "quiz")
+    assert suffix.startswith("User Request: A stress quiz")
+    assert "User Request" not in prefix
+
+
+def test_breakdown_covers_every_variant_of_both_servers():
+    backend = dict(backend_variants("A stress quiz", None))
+    pyserver = dict(pyserver_variants("A stress quiz", None))
+    assert set(backend) == set(pyserver) and len(backend) == 12
+    for rows in (backend, pyserver):
+        assert all(rows["auto"].total > size.total for name, size in rows.items() if name != "auto")
@@ -0,0 +1,95 @@
+"""
+Tests for token usage accounting
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+
+from app.core.deadline import Deadline
+from app.services.llm_providers import GeminiProvider, LLMRequest, LLMResult
+from app.services.provider_router import ProviderRouter
+from app.services.usage_ledger import UsageLedger, parse_prices
+
+SETTINGS = SimpleNamespace(
+    GOOGLE_API_KEY="test-key",
+    TEMPERATURE=0.7,
+    MAX_TOKENS=100,
+    STRUCTURED_OUTPUT=False,
+    ROUTER_EWMA_ALPHA=0.2,
+    ROUTER_ERROR_PENALTY=4.0,
+    CIRCUIT_FAILURE_THRESHOLD=5,
+    CIRCUIT_RECOVERY_TIMEOUT=30.0,
+)
+
+USAGE_METADATA = {"promptTokenCount": 1200, "candidatesTokenCount": 300,
+                  "cachedContentTokenCount": 1000, "totalTokenCount": 1500}
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    if request.url.path.endswith(":streamGenerateContent"):
+        body = (
+            'data: {"candidates": [{"content": {"parts": [{"text": "{\\"a\\""}]}}]}\n\n'
+            'data: {"candidates": [{"content": {"parts": [{"text": ": 1}"}]}, "finishReason": "MAX_TOKENS"}], '
+            '"usageMetadata": {"promptTokenCount": 10, "candidatesTokenCount": 4, "totalTokenCount": 14}}\n\n'
+        )
+        return httpx.Response(200, text=body, headers={"Content-Type": "text/event-stream"})
+    return httpx.Response(200, json={
+        "candidates": [{"content": {"parts": [{"text": "{}"}]}, "finishReason": "STOP"}],
+        "usageMetadata": USAGE_METADATA,
+    })
+
+
+def test_gemini_usage_and_finish_reason_are_parsed_for_generate_and_stream():
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    provider = GeminiProvider(client, SETTINGS, "gemini-2.0-flash", "http://stand-in")
+    router = ProviderRouter([provider], SETTINGS)
+    completed = []
+
+    async def run():
+        result = await provider.generate(LLMRequest(prompt="p"), timeout=5)
+        chunks = [text async for text in router.stream("p", Deadline(5), on_complete=completed.append)]
+        return result, chunks
+
+    result, chunks = asyncio.run(run())
+    assert result.usage == {"input_tokens": 1200, "output_tokens": 300, "cached_tokens": 1000, "total_tokens": 1500}
+    assert "".join(chunks) == '{"a": 1}'
+    assert completed[0].text == '{"a": 1}'
+    assert completed[0].usage == {"input_tokens": 10, "output_tokens": 4, "total_tokens": 14}
+    assert completed[0].finish_reason == "MAX_TOKENS" and completed[0].truncated
+
+
+def test_ledger_costs_and_groups_calls():
+    ledger = UsageLedger(prices=parse_prices('{"paid-model": {"input": 1.0, "cached": 0.25, "output": 4.0}}'))
+    usage = {"input_tokens": 1_000_000, "cached_tokens": 400_000, "output_tokens": 100_000, "total_tokens": 1_100_000}
+    labels = {"endpoint": "generate", "game_type": "quiz", "template_version": "v1"}
+
+    ledger.record(labels, LLMResult(text="", provider="gemini", model="paid-model", latency=2.0, usage=usage))
+    ledger.record({**labels, "game_type": "sorting"},
+                  LLMResult(text="", provider="openrouter", model="x:free", latency=1.0, usage=usage))
+
+    assert ledger.cost("paid-model", usage) == 0.6 + 0.1 + 0.4
+    report = ledger.report(["game_type"])
+    assert [row["game_type"] for row in report["rows"]] == ["quiz", "sorting"]
+    assert report["rows"][0]["cost"] == 1.1 and report["rows"][1]["cost"] == 0.0
+    assert report["totals"]["calls"] == 2 and report["totals"]["output_tokens"] == 200_000
+    assert report["totals"]["avg_latency"] == 1.5
+
+
+def test_ledger_persists_and_rejects_unknown_dimensions(tmp_path):
+    path = str(tmp_path / "usage.json")
+    ledger = UsageLedger(path=path)
+    ledger.record({"endpoint": "generate"}, LLMResult(text="", provider="gemini", model="m",
+                                                      usage={"input_tokens": 5, "output_tokens": 7}))
+    asyncio.run(ledger.flush())
+
+    restored = UsageLedger(path=path)
+    assert restored.report(["endpoint", "provider"])["rows"][0]["output_tokens"] == 7
+    assert restored.since == ledger.since
+
+    try:
+        restored.report(["prompt"])
+        assert False, "expected ValueError"
+    except ValueError as e:
+        assert "prompt" in str(e)
@@ -0,0 +1,390 @@
+"""
+Fake LLM Provider
+A local stand-in for the Gemini and OpenRouter APIs used for load and latency
+testing. Replays schema-valid sample games with configurable latency,
+error injection (429/500/hangs), malformed output and token-rate streaming.
+
+Run it and point either server at it through the existing base URL settings:
+
+    python -m tools.fake_llm_server --port 8090 --latency lognormal --latency-ms 1500
+    GEMINI_BASE_URL=http://127.0.0.1:8090 OPENROUTER_BASE_URL=http://127.0.0.1:8090 uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import uuid
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+
+from tools.sample_games import sample_analysis, sample_game
+
+# How each server's prompt pins the game type
+GAME_TYPE_PATTERNS = [
+    re.compile(r"Required Game Type:\s*([a-z-]+)"),
+    re.compile(r'game type is FIXED to "([a-z-]+)"'),
+]
+ANALYSIS_MARKER = "Analyze the player's game performance"
+
+MALFORMED_KINDS = ["truncated", "preamble", "trailing_text", "trailing_comma"]
+
+
+class FakeConfig(BaseModel):
+    """Runtime behaviour of the fake provider (updatable via POST /_fake/config)"""
+    latency: Literal["fixed", "uniform", "normal", "lognormal"] = "fixed"
+    latency_ms: float = Field(default=200.0, ge=0, description="Fixed/mean/median latency")
+    latency_spread_ms: float = Field(default=100.0, ge=0, description="Uniform half-width or normal stddev")
+    latency_sigma: float = Field(default=0.5, ge=0, description="Lognormal shape parameter")
+    rate_limit_rate: float = Field(default=0.0, ge=0, le=1)
+    server_error_rate: float = Field(default=0.0, ge=0, le=1)
+    timeout_rate: float = Field(default=0.0, ge=0, le=1)
+    malformed_rate: float = Field(default=0.0, ge=0, le=1)
+    retry_after: int = Field(default=2, ge=0)
+    hang_seconds: float = Field(default=300.0, ge=0, description="How long an injected timeout holds the request")
+    tokens_per_second: float = Field(default=200.0, gt=0)
+    chunk_tokens: int = Field(default=8, ge=1)
+    indent: Optional[int] = Field(default=2, ge=0, description="JSON indent of generated games (0 for one line)")
+    seed: Optional[int] = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return max(1, math.ceil(len(text) / 4))
+
+
+class FakeLLM:
+    """Produces responses, latencies and faults according to a FakeConfig"""
+
+    def __init__(self, config: Optional[FakeConfig] = None):
+        self.stats: Counter = Counter()
+        self.cached_contents: Dict[str, str] = {}
+        self.configure(config or FakeConfig())
+
+    def configure(self, config: FakeConfig) -> None:
+        self.config = config
+        self.rng = random.Random(config.seed)
+
+    def sample_latency(self) -> float:
+        """Seconds to wait before answering (time to first token when streaming)"""
+        config = self.config
+        mean = config.latency_ms / 1000
+        if config.latency == "uniform":
+            spread = config.latency_spread_ms / 1000
+            value = self.rng.uniform(mean - spread, mean + spread)
+        elif config.latency == "normal":
+            value = self.rng.gauss(mean, config.latency_spread_ms / 1000)
+        elif config.latency == "lognormal":
+            value = self.rng.lognormvariate(math.log(max(mean, 1e-6)), config.latency_sigma)
+        else:
+            value = mean
+        return max(0.0, value)
+
+    def pick_fault(self) -> Optional[str]:
+        """One of rate_limit / server_error / timeout, or None for a normal answer"""
+        roll = self.rng.random()
+        for fault, rate in (
+            ("rate_limit", self.config.rate_limit_rate),
+            ("server_error", self.config.server_error_rate),
+            ("timeout", self.config.timeout_rate),
+        ):
+            if roll < rate:
+                return fault
+            roll -= rate
+        return None
+
+    def answer(self, prompt: str, json_mode: bool = False) -> str:
+        """
+        Response text for a prompt, malformed at the configured rate
+        Like the real models, output is fenced as a markdown code block unless
+        the caller asked for JSON mode
+        """
+        if ANALYSIS_MARKER in prompt:
+            text = json.dumps(sample_analysis(self.rng))
+        else:
+            game_type = None
+            for pattern in GAME_TYPE_PATTERNS:
+                match = pattern.search(prompt)
+                if match:
+                    game_type = match.group(1)
+                    break
+            text = json.dumps(sample_game(game_type, self.rng), indent=self.config.indent or None)
+        if not json_mode:
+            text = f"```json\n{text}\n```"
+
+        if self.rng.random() < self.config.malformed_rate:
+            kind = self.rng.choice(MALFORMED_KINDS)
+            self.stats[f"malformed.{kind}"] += 1
+            return self._malform(text, kind)
+        return text
+
+    def _malform(self, text: str, kind: str) -> str:
+        if kind == "truncated":
+            return text[: self.rng.randint(len(text) // 3, len(text) - 2)]
+        if kind == "preamble":
+            return f"Here is your game:\n\n{text}"
+        if kind == "trailing_text":
+            return f"{text}\n\nLet me know if you want another game!"
+        return re.sub(r"\n(\s*)\}", r",\n\1}", text, count=1)
+
+    def chunks(self, text: str) -> List[str]:
+        size = self.config.chunk_tokens * 4
+        return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+    async def hang(self) -> None:
+        await asyncio.sleep(self.config.hang_seconds)
+
+    async def pace(self, chunk: str) -> None:
+        """Sleep long enough to emit chunk at the configured token rate"""
+        await asyncio.sleep(estimate_tokens(chunk) / self.config.tokens_per_second)
+
+
+def _gemini_error(status: int, message: str, reason: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    return JSONResponse(
+        status_code=status,
+        content={"error": {"code": status, "message": message, "status": reason}},
+        headers=headers
+    )
+
+
+def _openrouter_error(status: int, message: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    return JSONResponse(status_code=status, content={"error": {"code": status, "message": message}}, headers=headers)
+
+
+def _gemini_prompt(body: Dict[str, Any], fake: FakeLLM) -> str:
+    """All text the model would see: cached context, system instruction and contents"""
+    texts = []
+    cached = body.get("cachedContent")
+    if cached:
+        texts.append(fake.cached_contents.get(cached, ""))
+    blocks = [body.get("systemInstruction") or {}] + list(body.get("contents") or [])
+    for block in blocks:
+        for part in block.get("parts", []):
+            texts.append(part.get("text", ""))
+    return "\n\n".join(texts)
+
+
+def _openrouter_prompt(body: Dict[str, Any]) -> str:
+    return "\n\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+
+
+def _gemini_usage(prompt: str, text: str, cached: int = 0) -> Dict[str, int]:
+    prompt_tokens, output_tokens = estimate_tokens(prompt), estimate_tokens(text)
+    usage = {
+        "promptTokenCount": prompt_tokens,
+        "candidatesTokenCount": output_tokens,
+        "totalTokenCount": prompt_tokens + output_tokens,
+    }
+    if cached:
+        usage["cachedContentTokenCount"] = cached
+    return usage
+
+
+def create_app(config: Optional[FakeConfig] = None) -> FastAPI:
+    """Build the fake provider app; fake state is available as app.state.fake"""
+    app = FastAPI(title="Fake LLM Provider", docs_url=None, redoc_url=None)
+    fake = FakeLLM(config)
+    app.state.fake = fake
+
+    async def fault_response(fault: Optional[str], provider: str) -> Optional[Response]:
+        """Error response for an injected fault (after hanging, for timeouts)"""
+        if fault is None:
+            return None
+        fake.stats[f"{provider}.{fault}"] += 1
+        if fault == "rate_limit":
+            headers = {"Retry-After": str(fake.config.retry_after)}
+            if provider == "gemini":
+                return _gemini_error(429, "Resource has been exhausted (e.g. check quota).", "RESOURCE_EXHAUSTED", headers)
+            return _openrouter_error(429, "Rate limit exceeded", headers)
+        if fault == "server_error":
+            if provider == "gemini":
+                return _gemini_error(500, "An internal error has occurred.", "INTERNAL")
+            return _openrouter_error(500, "Internal server error")
+        await fake.hang()
+        if provider == "gemini":
+            return _gemini_error(504, "The request timed out.", "DEADLINE_EXCEEDED")
+        return _openrouter_error(504, "Upstream timed out")
+
+    # ------------------------------------------------------------------
+    # Gemini
+    # ------------------------------------------------------------------
+    @app.post("/v1beta/cachedContents")
+    async def create_cached_content(body: Dict[str, Any]):
+        name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+        fake.cached_contents[name] = _gemini_prompt({"contents": body.get("contents", [])}, fake)
+        fake.stats["gemini.cache_create"] += 1
+        return {"name": name, "model": body.get("model"), "ttl": body.get("ttl")}
+
+    @app.patch("/v1beta/cachedContents/{cache_id}")
+    async def update_cached_content(cache_id: str, body: Dict[str, Any]):
+        name = f"cachedContents/{cache_id}"
+        if name not in fake.cached_contents:
+            return _gemini_error(404, f"CachedContent not found: {name}", "NOT_FOUND")
+        fake.stats["gemini.cache_refresh"] += 1
+        return {"name": name, "ttl": body.get("ttl")}
+
+    @app.delete("/v1beta/cachedContents/{cache_id}")
+    async def delete_cached_content(cache_id: str):
+        fake.cached_contents.pop(f"cachedContents/{cache_id}", None)
+        fake.stats["gemini.cache_delete"] += 1
+        return {}
+
+    @app.get("/v1beta/models/{model:path}")
+    async def get_model(model: str):
+        fake.stats["gemini.models_get"] += 1
+        return {"name": model if model.startswith("models/") else f"models/{model}", "displayName": "Fake Gemini"}
+
+    @app.post("/v1beta/models/{target:path}")
+    async def gemini_generate(target: str, request: Request):
+        model, _, method = target.rpartition(":")
+        if method not in ("generateContent", "streamGenerateContent"):
+            return _gemini_error(404, f"Unknown method {method}", "NOT_FOUND")
+        body = await request.json()
+        cached = body.get("cachedContent")
+        if cached and cached not in fake.cached_contents:
+            return _gemini_error(404, f"CachedContent not found: {cached}", "NOT_FOUND")
+        fake.stats[f"gemini.{method}"] += 1
+
+        error = await fault_response(fake.pick_fault(), "gemini")
+        if error is not None:
+            return error
+
+        prompt = _gemini_prompt(body, fake)
+        json_mode = (body.get("generationConfig") or {}).get("responseMimeType") == "application/json"
+        text = fake.answer(prompt, json_mode)
+        cached_tokens = estimate_tokens(fake.cached_contents[cached]) if cached else 0
+        latency = fake.sample_latency()
+
+        if method == "generateContent":
+            await asyncio.sleep(latency + estimate_tokens(text) / fake.config.tokens_per_second)
+            return {
+                "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+                "usageMetadata": _gemini_usage(prompt, text, cached_tokens),
+                "modelVersion": model,
+            }
+
+        async def events() -> AsyncIterator[str]:
+            await asyncio.sleep(latency)
+            pieces = fake.chunks(text)
+            for index, piece in enumerate(pieces):
+                await fake.pace(piece)
+                chunk: Dict[str, Any] = {"candidates": [{"content": {"role": "model", "parts": [{"text": piece}]}}]}
+                if index == len(pieces) - 1:
+                    chunk["candidates"][0]["finishReason"] = "STOP"
+                    chunk["usageMetadata"] = _gemini_usage(prompt, text, cached_tokens)
+                yield f"data: {json.dumps(chunk)}\r\n\r\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    # ------------------------------------------------------------------
+    # OpenRouter
+    # ------------------------------------------------------------------
+    @app.get("/api/v1/models")
+    async def list_models():
+        fake.stats["openrouter.models"] += 1
+        return {"data": [{"id": "fake/game-model", "name": "Fake game model"}]}
+
+    @app.post("/api/v1/chat/completions")
+    async def chat_completions(body: Dict[str, Any]):
+        stream = bool(body.get("stream"))
+        fake.stats["openrouter.stream" if stream else "openrouter.completions"] += 1
+
+        error = await fault_response(fake.pick_fault(), "openrouter")
+        if error is not None:
+            return error
+
+        prompt = _openrouter_prompt(body)
+        text = fake.answer(prompt, (body.get("response_format") or {}).get("type") == "json_object")
+        model = body.get("model", "fake/game-model")
+        usage = {
+            "prompt_tokens": estimate_tokens(prompt),
+            "completion_tokens": estimate_tokens(text),
+            "total_tokens": estimate_tokens(prompt) + estimate_tokens(text),
+        }
+        completion_id = f"gen-{uuid.uuid4().hex[:12]}"
+        latency = fake.sample_latency()
+
+        if not stream:
+            await asyncio.sleep(latency + estimate_tokens(text) / fake.config.tokens_per_second)
+            return {
+                "id": completion_id,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        async def events() -> AsyncIterator[str]:
+            await asyncio.sleep(latency)
+            for piece in fake.chunks(text):
+                await fake.pace(piece)
+                chunk = {"id": completion_id, "model": model, "choices": [{"index": 0, "delta": {"content": piece}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            final = {"id": completion_id, "model": model,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage}
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    # ------------------------------------------------------------------
+    # Control
+    # ------------------------------------------------------------------
+    @app.get("/_fake/config")
+    async def get_config():
+        return fake.config.dict()
+
+    @app.post("/_fake/config")
+    async def update_config(changes: Dict[str, Any]):
+        """Merge changes into the running config (reseeds the RNG)"""
+        fake.configure(FakeConfig(**{**fake.config.dict(), **changes}))
+        return fake.config.dict()
+
+    @app.get("/_fake/stats")
+    async def get_stats():
+        return {"stats": dict(fake.stats), "cached_contents": len(fake.cached_contents)}
+
+    @app.post("/_fake/reset")
+    async def reset_stats():
+        fake.stats.clear()
+        return {"stats": {}}
+
+    return app
+
+
+def parse_args(argv: Optional[List[str]] = None) -> Tuple[argparse.Namespace, FakeConfig]:
+    parser = argparse.ArgumentParser(description="Fake Gemini/OpenRouter server for load and latency testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    defaults = FakeConfig()
+    for name, field in FakeConfig.model_fields.items():
+        flag = "--" + name.replace("_", "-")
+        if name == "latency":
+            parser.add_argument(flag, choices=["fixed", "uniform", "normal", "lognormal"], default=defaults.latency)
+        elif name == "seed":
+            parser.add_argument(flag, type=int, default=None)
+        elif name == "indent":
+            parser.add_argument(flag, type=int, default=defaults.indent, help=field.description)
+        else:
+            parser.add_argument(flag, type=type(getattr(defaults, name)), default=getattr(defaults, name),
+                                help=field.description)
+    args = parser.parse_args(argv)
+    config = FakeConfig(**{name: getattr(args, name) for name in FakeConfig.model_fields})
+    return args, config
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import uvicorn
+
+    args, config = parse_args(argv)
+    print(f"Fake LLM provider on http://{args.host}:{args.port} with {config.dict()}")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
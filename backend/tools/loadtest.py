@@ -0,0 +1,368 @@
+"""
+Load Test Harness
+Drives the backend (/generate, /generate/debug) and pyserver
+(/api/games/generate, /api/analyze/game) with open-loop (constant or Poisson
+arrival rate) or closed-loop (fixed concurrency) workloads and reports
+throughput, latency percentiles, errors by ErrorCode and the per-stage time
+split read from the Server-Timing header.
+
+The request sequence and arrival schedule are derived from --seed, so runs
+against the fake provider (tools/fake_llm_server.py, also seeded) can be
+compared between releases:
+
+    python -m tools.loadtest --base-url http://127.0.0.1:8000 --endpoint generate=3 \\
+        --endpoint generate-debug=1 --mode open --rate 20 --requests 500 --seed 1 --output run.json
+    python -m tools.loadtest ... --compare run.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from pydantic import BaseModel, Field
+
+from app.core.metrics import percentile
+from tools.sample_games import CONTENT_BUILDERS, sample_game
+
+# Realistic user prompts per game type
+PROMPT_MIX: Dict[str, List[str]] = {
+    "quiz": [
+        "A quiz about healthy ways to cope with exam stress for high school students",
+        "Test what I know about mindfulness basics",
+        "Quiz for teens on recognising signs of burnout",
+    ],
+    "drag-drop": [
+        "Drag and drop activity sorting helpful and unhelpful coping strategies",
+        "Help kids place feelings into the right body sensations",
+    ],
+    "memory-match": [
+        "Memory game matching emotions to their facial expressions for young children",
+        "Match relaxation techniques with what they do",
+    ],
+    "word-puzzle": [
+        "Word search with calming words for a bedtime routine",
+        "Crossword about self-care vocabulary for adults",
+    ],
+    "sorting": [
+        "Sort thoughts into facts and feelings for cognitive behavioural practice",
+        "Categorise daily activities by how much energy they give or take",
+    ],
+    "matching": [
+        "Match common cognitive distortions with balanced alternative thoughts",
+        "Pair stressful situations with a coping skill that fits",
+    ],
+    "story-sequence": [
+        "Put the steps of calming down after an argument in order",
+        "Story about a child preparing for their first day at a new school",
+    ],
+    "fill-blank": [
+        "Fill in the blanks for positive self-talk statements",
+        "Complete sentences about how breathing affects anxiety",
+    ],
+    "card-flip": [
+        "Flashcards of grounding techniques for panic moments",
+        "Flip cards with daily gratitude prompts",
+    ],
+    "puzzle-assembly": [
+        "A calming nature puzzle that reveals a mindfulness message",
+        "Assemble a picture of a safe place for visualisation practice",
+    ],
+    "anxiety-adventure": [
+        "Choose your own adventure about handling social anxiety at a party",
+        "An adventure where a student manages worry before a presentation",
+    ],
+}
+
+# Endpoint name -> path (payloads are built by build_payload)
+ENDPOINTS = {
+    "generate": "/generate",
+    "generate-debug": "/generate/debug",
+    "games": "/api/games/generate",
+    "analyze": "/api/analyze/game",
+}
+
+PERCENTILES = [("p50", 50), ("p95", 95), ("p99", 99), ("p999", 99.9)]
+
+
+class RequestSpec(BaseModel):
+    """One planned request: what to send and when (open loop)"""
+    index: int
+    endpoint: str
+    game_type: str
+    payload: Dict[str, Any]
+    at: float = 0.0
+
+
+class RequestOutcome(BaseModel):
+    """What happened to one request"""
+    index: int
+    endpoint: str
+    game_type: str
+    status: int = 0
+    latency: float = 0.0
+    error_code: Optional[str] = None
+    stages: Dict[str, float] = Field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return self.error_code is None
+
+
+def parse_weights(values: List[str]) -> List[Tuple[str, float]]:
+    """--endpoint name[=weight] values to (name, weight) pairs"""
+    weights = []
+    for value in values:
+        name, _, weight = value.partition("=")
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint {name!r}; choose from {', '.join(ENDPOINTS)}")
+        weights.append((name, float(weight or 1)))
+    return weights
+
+
+def build_payload(endpoint: str, game_type: str, prompt: str, rng: random.Random) -> Dict[str, Any]:
+    if endpoint in ("generate", "generate-debug"):
+        return {"prompt": prompt, "gameType": game_type}
+    if endpoint == "games":
+        return {"description": prompt, "gameType": game_type}
+    game = sample_game(game_type, rng)
+    max_score = game["scoring"]["maxScore"]
+    return {
+        "gameContext": game,
+        "userInputs": [{"question": f"Step {i + 1}", "answer": rng.choice(["yes", "no", "not sure"])} for i in range(3)],
+        "score": rng.randint(0, max_score),
+        "max_score": max_score,
+        "time_spent": rng.randint(30, 600),
+        "accuracy": round(rng.uniform(20, 100), 1),
+    }
+
+
+def plan_requests(args: argparse.Namespace) -> List[RequestSpec]:
+    """The seeded request sequence (and open-loop arrival times)"""
+    rng = random.Random(args.seed)
+    names, weights = zip(*parse_weights(args.endpoint or ["generate"]))
+    game_types = sorted(CONTENT_BUILDERS)
+    count = args.requests if args.duration is None else max(1, int(args.rate * args.duration))
+
+    specs, at = [], 0.0
+    for index in range(count):
+        endpoint = rng.choices(names, weights)[0]
+        game_type = rng.choice(game_types)
+        prompt = rng.choice(PROMPT_MIX[game_type])
+        if not args.allow_cache_hits:
+            # Unique per run index so the game cache cannot answer; same across runs
+            prompt = f"{prompt} (session {args.seed}-{index})"
+        specs.append(RequestSpec(index=index, endpoint=endpoint, game_type=game_type,
+                                 payload=build_payload(endpoint, game_type, prompt, rng), at=at))
+        at += rng.expovariate(args.rate) if args.arrivals == "poisson" else 1.0 / args.rate
+    return specs
+
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    """Server-Timing header to {stage: seconds}"""
+    stages = {}
+    for entry in (header or "").split(","):
+        name, *params = [part.strip() for part in entry.split(";")]
+        for param in params:
+            if param.startswith("dur="):
+                try:
+                    stages[name] = float(param[4:]) / 1000
+                except ValueError:
+                    pass
+    return stages
+
+
+def error_code(response: httpx.Response) -> str:
+    """ErrorCode from a structured error body, else HTTP_<status>"""
+    try:
+        detail = response.json().get("detail")
+    except (ValueError, AttributeError):
+        detail = None
+    if isinstance(detail, dict) and detail.get("code"):
+        return str(detail["code"])
+    return f"HTTP_{response.status_code}"
+
+
+async def send(client: httpx.AsyncClient, spec: RequestSpec, started: float) -> RequestOutcome:
+    """Send one request; latency counts from `started` (the scheduled time in open loop)"""
+    outcome = RequestOutcome(index=spec.index, endpoint=spec.endpoint, game_type=spec.game_type)
+    try:
+        response = await client.post(ENDPOINTS[spec.endpoint], json=spec.payload)
+        outcome.status = response.status_code
+        outcome.stages = parse_server_timing(response.headers.get("server-timing"))
+        if response.status_code >= 400:
+            outcome.error_code = error_code(response)
+    except httpx.TimeoutException:
+        outcome.error_code = "CLIENT_TIMEOUT"
+    except httpx.HTTPError as e:
+        outcome.error_code = f"CLIENT_{type(e).__name__}"
+    outcome.latency = time.perf_counter() - started
+    return outcome
+
+
+async def run_open_loop(client: httpx.AsyncClient, specs: List[RequestSpec]) -> List[RequestOutcome]:
+    """Start each request at its scheduled time regardless of how many are in flight"""
+    origin = time.perf_counter()
+    tasks = []
+    for spec in specs:
+        delay = origin + spec.at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # Measured from the intended start, so a stalled client does not hide queueing
+        tasks.append(asyncio.create_task(send(client, spec, origin + spec.at)))
+    return list(await asyncio.gather(*tasks))
+
+
+async def run_closed_loop(client: httpx.AsyncClient, specs: List[RequestSpec],
+                          concurrency: int, think_time: float) -> List[RequestOutcome]:
+    """Each of `concurrency` virtual users sends its next request once the last one finishes"""
+    queue: asyncio.Queue = asyncio.Queue()
+    for spec in specs:
+        queue.put_nowait(spec)
+    outcomes: List[RequestOutcome] = []
+
+    async def user() -> None:
+        while not queue.empty():
+            spec = queue.get_nowait()
+            outcomes.append(await send(client, spec, time.perf_counter()))
+            if think_time:
+                await asyncio.sleep(think_time)
+
+    await asyncio.gather(*(user() for _ in range(max(1, concurrency))))
+    return sorted(outcomes, key=lambda outcome: outcome.index)
+
+
+def latency_stats(latencies: List[float]) -> Dict[str, float]:
+    """Count, mean, percentiles and max in milliseconds"""
+    if not latencies:
+        return {"count": 0}
+    stats = {"count": len(latencies), "mean": round(1000 * sum(latencies) / len(latencies), 1)}
+    for label, pct in PERCENTILES:
+        stats[label] = round(1000 * percentile(latencies, pct), 1)
+    stats["max"] = round(1000 * max(latencies), 1)
+    return stats
+
+
+def summarize(outcomes: List[RequestOutcome], wall: float, args: argparse.Namespace) -> Dict[str, Any]:
+    succeeded = [outcome for outcome in outcomes if outcome.ok]
+    by_endpoint: Dict[str, List[float]] = defaultdict(list)
+    for outcome in succeeded:
+        by_endpoint[outcome.endpoint].append(outcome.latency)
+
+    stage_samples: Dict[str, List[float]] = defaultdict(list)
+    for outcome in succeeded:
+        for stage, seconds in outcome.stages.items():
+            stage_samples[stage].append(seconds)
+    stage_total = sum(sum(samples) for samples in stage_samples.values()) or 1.0
+
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "wall_seconds": round(wall, 3),
+        "requests": len(outcomes),
+        "succeeded": len(succeeded),
+        "failed": len(outcomes) - len(succeeded),
+        "throughput": round(len(succeeded) / wall, 3) if wall else 0.0,
+        "latency": latency_stats([outcome.latency for outcome in succeeded]),
+        "latency_by_endpoint": {name: latency_stats(values) for name, values in sorted(by_endpoint.items())},
+        "errors": dict(Counter(outcome.error_code for outcome in outcomes if not outcome.ok).most_common()),
+        "stages": {
+            stage: {**latency_stats(samples), "share": round(sum(samples) / stage_total, 3)}
+            for stage, samples in sorted(stage_samples.items())
+        },
+    }
+
+
+COLUMNS = ["count", "mean"] + [label for label, _ in PERCENTILES] + ["max"]
+
+
+def format_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    """Plain-text report; with a baseline each value shows its relative change"""
+    width = 16 if baseline else 9
+
+    def row(label: str, stats: Dict[str, Any], base: Optional[Dict[str, Any]] = None) -> str:
+        cells = []
+        for key in COLUMNS:
+            value = stats.get(key, "-")
+            cell = str(value)
+            if base and key != "count" and isinstance(value, float) and base.get(key):
+                cell += f" ({(value - base[key]) / base[key]:+.0%})"
+            cells.append(f"{cell:>{width}}")
+        return f"{label:<24}" + " ".join(cells)
+
+    header = f"{'':<24}" + " ".join(f"{key:>{width}}" for key in COLUMNS)
+    lines = [
+        f"{report['requests']} requests in {report['wall_seconds']}s: "
+        f"{report['succeeded']} ok, {report['failed']} failed, {report['throughput']} req/s",
+        "",
+        "Latency (ms)",
+        header,
+        row("all", report["latency"], baseline and baseline.get("latency")),
+    ]
+    for name, stats in report["latency_by_endpoint"].items():
+        base = baseline and baseline.get("latency_by_endpoint", {}).get(name)
+        lines.append(row(name, stats, base))
+    if report["stages"]:
+        lines += ["", "Stages (ms, from Server-Timing)", header]
+        for stage, stats in report["stages"].items():
+            base = baseline and baseline.get("stages", {}).get(stage)
+            lines.append(row(f"{stage} {stats['share']:.0%}", stats, base))
+    if report["errors"]:
+        lines += ["", "Errors"] + [f"  {code:<30}{count}" for code, count in report["errors"].items()]
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load test the GameGPT servers")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", action="append",
+                        help=f"name[=weight], repeatable; one of {', '.join(ENDPOINTS)} (default: generate)")
+    parser.add_argument("--mode", choices=["open", "closed"], default="open")
+    parser.add_argument("--rate", type=float, default=5.0, help="Open loop: arrivals per second")
+    parser.add_argument("--arrivals", choices=["constant", "poisson"], default="constant")
+    parser.add_argument("--concurrency", type=int, default=8, help="Closed loop: virtual users")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Closed loop: pause between requests")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=None, help="Open loop: run for rate * duration requests")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--allow-cache-hits", action="store_true",
+                        help="Reuse prompts verbatim so the game cache can answer repeats")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--compare", help="Earlier JSON report to show relative changes against")
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    specs = plan_requests(args)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        if args.mode == "open":
+            outcomes = await run_open_loop(client, specs)
+        else:
+            outcomes = await run_closed_loop(client, specs, args.concurrency, args.think_time)
+        wall = time.perf_counter() - started
+    return summarize(outcomes, wall, args)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report = asyncio.run(run(args))
+    print(format_report(report, baseline))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Prompt Token Breakdown
+Prints the estimated input tokens of every section of the generation prompt,
+for every game-type variant of the backend (app/services/prompt_templates.py)
+and of pyserver (the PROMPT_* constants in pyserver/main.py), and with
+--budget what each variant would have compacted or dropped to fit:
+
+    python -m tools.prompt_tokens
+    python -m tools.prompt_tokens --budget 5000 --server backend
+    python -m tools.prompt_tokens --summary
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.services.prompt_templates import PromptBuilder
+from app.services.token_estimator import PromptSize, Section, fit_sections
+
+PYSERVER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "pyserver")
+
+# pyserver sections the CLI would give up first under a budget (pyserver itself does not trim)
+PYSERVER_OPTIONAL = ("therapeutic_educational", "quality_intro", "difficulty")
+
+DEFAULT_PROMPT = "A quiz about recognizing and managing stress for teens"
+
+
+def load_pyserver() -> Any:
+    """pyserver/main.py as a module, without starting its app"""
+    if PYSERVER_DIR not in sys.path:
+        sys.path.insert(0, PYSERVER_DIR)
+    spec = importlib.util.spec_from_file_location("pyserver_main", os.path.join(PYSERVER_DIR, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def backend_variants(prompt: str, budget: Optional[int]) -> List[Tuple[str, PromptSize]]:
+    builder = PromptBuilder()
+    variants: List[Optional[str]] = [None] + [game_type.value for game_type in builder.templates.CONTENT_TEMPLATES]
+    return [(game_type or "auto", builder.fit(prompt, game_type, budget)[1]) for game_type in variants]
+
+
+def pyserver_variants(prompt: str, budget: Optional[int]) -> List[Tuple[str, PromptSize]]:
+    pyserver = load_pyserver()
+    rows = []
+    for game_type in [None] + list(pyserver.ALL_GAME_TYPES):
+        sections: Sequence[Section] = pyserver.prompt_sections(prompt, game_type)
+        # pyserver concatenates its sections without separators
+        rows.append((game_type or "auto", fit_sections(sections, budget, PYSERVER_OPTIONAL, separator_tokens=0)[1]))
+    return rows
+
+
+def format_variant(server: str, variant: str, size: PromptSize) -> str:
+    lines = [f"{server} {variant}: ~{size.total} tokens" + (f" (budget {size.budget})" if size.budget else "")]
+    lines += [f"  {name:<28}{tokens:>7}" for name, tokens in size.sections.items()]
+    if size.compacted:
+        lines.append(f"  compacted: {', '.join(size.compacted)}")
+    if size.dropped:
+        lines.append(f"  dropped: {', '.join(size.dropped)}")
+    if size.over_budget:
+        lines.append("  still over budget")
+    return "\n".join(lines)
+
+
+def format_summary(server: str, rows: List[Tuple[str, PromptSize]]) -> str:
+    lines = [f"{server:<20}{'tokens':>8}  trimmed"]
+    for variant, size in rows:
+        trimmed = ", ".join([f"~{name}" for name in size.compacted] + [f"-{name}" for name in size.dropped])
+        if size.over_budget:
+            trimmed += " (still over budget)"
+        lines.append(f"{variant:<20}{size.total:>8}  {trimmed}")
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Estimated prompt tokens per section and game-type variant")
+    parser.add_argument("--prompt", default=DEFAULT_PROMPT, help="User request to size the prompts with")
+    parser.add_argument("--budget", type=int, default=None, help="Show what this input token budget would trim")
+    parser.add_argument("--server", choices=["backend", "pyserver", "both"], default="both")
+    parser.add_argument("--summary", action="store_true", help="Only the total per variant")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    servers: Dict[str, List[Tuple[str, PromptSize]]] = {}
+    if args.server in ("backend", "both"):
+        servers["backend"] = backend_variants(args.prompt, args.budget)
+    if args.server in ("pyserver", "both"):
+        servers["pyserver"] = pyserver_variants(args.prompt, args.budget)
+
+    blocks = []
+    for server, rows in servers.items():
+        if args.summary:
+            blocks.append(format_summary(server, rows))
+        else:
+            blocks.extend(format_variant(server, variant, size) for variant, size in rows)
+    print("\n\n".join(blocks))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Sample games for the fake LLM provider
+Small but schema-valid game JSON for every game type, varied by a seeded RNG
+"""
+
+import random
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+TOPICS = [
+    ("Calm Breathing", "mindfulness", "Practice slowing down with box breathing"),
+    ("Stress Busters", "stress-reduction", "Spot everyday stressors and healthy responses"),
+    ("Feelings Detective", "emotional-intelligence", "Name emotions and what they are telling you"),
+    ("Thought Check", "cognitive-behavioral", "Catch unhelpful thoughts and reframe them"),
+    ("Kind to Me", "self-care", "Build a small self-care routine"),
+    ("Brave Steps", "anxiety-management", "Face worries one small step at a time"),
+]
+
+TECHNIQUES = [
+    ("Box breathing", "Breathe in, hold, out and hold for four counts each"),
+    ("5-4-3-2-1 grounding", "Notice five things you see, four you hear, three you feel"),
+    ("Reframing", "Replace an all-or-nothing thought with a balanced one"),
+    ("Journaling", "Write down what happened and how you felt"),
+    ("Progressive relaxation", "Tense and release each muscle group"),
+    ("Asking for help", "Tell a trusted person what you need"),
+]
+
+
+def _quiz(rng: random.Random) -> Dict[str, Any]:
+    questions = []
+    for index, (name, description) in enumerate(rng.sample(TECHNIQUES, 4), start=1):
+        options = [name] + [other for other, _ in rng.sample(TECHNIQUES, 3) if other != name][:3]
+        questions.append({
+            "id": f"q{index}",
+            "question": f"Which technique is this: {description}?",
+            "type": "multiple-choice",
+            "options": options,
+            "correctAnswer": name,
+            "explanation": f"{name} works by focusing attention on the present moment.",
+            "hint": "Think about what you do with your body."
+        })
+    return {"questions": questions}
+
+
+def _drag_drop(rng: random.Random) -> Dict[str, Any]:
+    items = [
+        {"id": f"i{index}", "content": name, "correctZone": "helpful" if index % 2 else "unhelpful",
+         "explanation": description}
+        for index, (name, description) in enumerate(rng.sample(TECHNIQUES, 4), start=1)
+    ]
+    return {
+        "items": items,
+        "dropZones": [
+            {"id": "helpful", "label": "Helps me calm down", "accepts": [i["id"] for i in items if i["correctZone"] == "helpful"]},
+            {"id": "unhelpful", "label": "Try another time", "accepts": [i["id"] for i in items if i["correctZone"] == "unhelpful"]},
+        ],
+        "instructions": "Drag each strategy to where it fits best for you."
+    }
+
+
+def _memory_match(rng: random.Random) -> Dict[str, Any]:
+    pairs = [
+        {"id": f"p{index}", "content1": name, "content2": description, "explanation": description}
+        for index, (name, description) in enumerate(rng.sample(TECHNIQUES, 4), start=1)
+    ]
+    return {"pairs": pairs, "gridSize": "4x4"}
+
+
+def _sorting(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "items": [
+            {"id": f"s{index}", "content": name, "correctCategory": "body" if index % 2 else "mind", "difficulty": 2}
+            for index, (name, _) in enumerate(rng.sample(TECHNIQUES, 4), start=1)
+        ],
+        "categories": [
+            {"id": "body", "name": "Body", "description": "Calms the body", "color": "blue"},
+            {"id": "mind", "name": "Mind", "description": "Calms the mind", "color": "green"},
+        ],
+        "instructions": "Sort each strategy into the right group."
+    }
+
+
+def _matching(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "pairs": [
+            {"id": f"m{index}", "left": name, "right": description, "explanation": description}
+            for index, (name, description) in enumerate(rng.sample(TECHNIQUES, 4), start=1)
+        ],
+        "instructions": "Match each strategy with what it involves."
+    }
+
+
+def _story_sequence(rng: random.Random) -> Dict[str, Any]:
+    steps = ["Notice the worry", "Pause and breathe", "Name the feeling", "Choose a next step"]
+    return {
+        "events": [
+            {"id": f"e{index}", "content": step, "order": index, "description": step,
+             "explanation": "Each step builds on the one before."}
+            for index, step in enumerate(steps, start=1)
+        ],
+        "title": "Handling a Worry",
+        "theme": rng.choice(["school", "friends", "home"])
+    }
+
+
+def _fill_blank(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "passages": [{
+            "id": "passage1",
+            "text": "When I feel ___ I can try ___ to feel calmer.",
+            "blanks": [
+                {"id": "b1", "position": 0, "correctAnswer": "anxious", "options": ["anxious", "sleepy"], "hint": "A worried feeling"},
+                {"id": "b2", "position": 1, "correctAnswer": rng.choice(TECHNIQUES)[0],
+                 "options": [name for name, _ in TECHNIQUES[:3]], "hint": "A coping skill"},
+            ]
+        }]
+    }
+
+
+def _card_flip(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "cards": [
+            {"id": f"c{index}", "front": name, "back": description}
+            for index, (name, description) in enumerate(rng.sample(TECHNIQUES, 4), start=1)
+        ],
+        "instructions": "Flip each card to learn a new strategy."
+    }
+
+
+def _word_puzzle(rng: random.Random) -> Dict[str, Any]:
+    words = ["CALM", "BREATHE", "FOCUS", "REST"]
+    return {
+        "words": [
+            {"word": word, "hint": f"A word about {word.lower()}", "direction": "horizontal" if index % 2 else "vertical",
+             "startRow": index * 2, "startCol": rng.randint(0, 4)}
+            for index, word in enumerate(words)
+        ],
+        "gridSize": 12,
+        "theme": "Calm words"
+    }
+
+
+def _puzzle_assembly(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "pieces": [
+            {"id": f"piece{index}", "image": f"piece-{index}.png", "correctPosition": {"x": index % 2, "y": index // 2}}
+            for index in range(4)
+        ],
+        "targetImage": rng.choice(["calm-lake.png", "forest-path.png"]),
+        "gridSize": 4
+    }
+
+
+def _anxiety_adventure(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "startId": "s1",
+        "scenarios": {
+            "s1": {
+                "id": "s1",
+                "title": "The Big Presentation",
+                "description": "Your heart races before speaking in class.",
+                "anxietyLevel": rng.randint(5, 8),
+                "choices": [
+                    {"id": "c1", "text": "Take three slow breaths", "outcome": "positive", "anxietyChange": -2,
+                     "points": 20, "explanation": "Slow breathing calms the body.", "nextScenario": "s2"},
+                    {"id": "c2", "text": "Skip class", "outcome": "negative", "anxietyChange": 2,
+                     "points": 0, "explanation": "Avoidance keeps the fear going."},
+                ],
+                "tips": ["Breathe out longer than you breathe in."]
+            },
+            "s2": {
+                "id": "s2",
+                "title": "Speaking Up",
+                "description": "You begin your talk.",
+                "anxietyLevel": 4,
+                "choices": [
+                    {"id": "c3", "text": "Focus on one friendly face", "outcome": "positive", "anxietyChange": -1,
+                     "points": 15, "explanation": "Grounding in one point helps."}
+                ],
+                "tips": ["It is okay to pause."]
+            }
+        }
+    }
+
+
+CONTENT_BUILDERS: Dict[str, Callable[[random.Random], Dict[str, Any]]] = {
+    "quiz": _quiz,
+    "drag-drop": _drag_drop,
+    "memory-match": _memory_match,
+    "word-puzzle": _word_puzzle,
+    "sorting": _sorting,
+    "matching": _matching,
+    "story-sequence": _story_sequence,
+    "fill-blank": _fill_blank,
+    "card-flip": _card_flip,
+    "puzzle-assembly": _puzzle_assembly,
+    "anxiety-adventure": _anxiety_adventure,
+}
+
+
+def sample_game(game_type: Optional[str] = None, rng: Optional[random.Random] = None) -> Dict[str, Any]:
+    """A complete game payload of the given (or a random) type"""
+    rng = rng or random.Random()
+    game_type = game_type if game_type in CONTENT_BUILDERS else rng.choice(sorted(CONTENT_BUILDERS))
+    title, category, description = rng.choice(TOPICS)
+    return {
+        "id": f"game-{datetime.now():%Y%m%d}-{rng.randint(0, 9999):04d}",
+        "title": title,
+        "description": description,
+        "type": game_type,
+        "difficulty": rng.choice(["easy", "medium", "hard"]),
+        "category": category,
+        "estimatedTime": rng.choice([5, 10, 15]),
+        "config": {"maxAttempts": 3, "timeLimit": 600, "showProgress": True, "allowRetry": True,
+                   "shuffleOptions": True, "showHints": True, "autoNext": False},
+        "content": CONTENT_BUILDERS[game_type](rng),
+        "scoring": {"maxScore": 100, "pointsPerCorrect": 10, "pointsPerIncorrect": 0,
+                    "bonusForSpeed": 5, "bonusForStreak": 5},
+        "ui": {"theme": "colorful", "layout": "grid", "animations": True, "sounds": False, "particles": True},
+        "theme": title.lower()
+    }
+
+
+def sample_analysis(rng: Optional[random.Random] = None) -> Dict[str, Any]:
+    """A performance analysis payload in the shape the analyzer prompt asks for"""
+    rng = rng or random.Random()
+    strength = rng.choice(["steady focus", "thoughtful choices", "persistence"])
+    return {
+        "analysis": (
+            f"You showed real {strength} in this game. Notice how taking a moment before answering "
+            "helped you. Keep practising with kindness toward yourself - every round builds the skill."
+        )
+    }
@@ -1,14 +1,20 @@
 from __future__ import annotations
 import os
+import re
 import json
-from typing import Any, Dict, Optional
+import time
+import asyncio
+from collections import Counter
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import httpx
 from dotenv import load_dotenv
 
+from classifier import classify_game_type
+
 load_dotenv()
 
 # -----------------------------------------------------------------------------
@@ -19,6 +25,27 @@ GEMINI_MODEL = os.getenv("GEMINI_MODEL", "models/gemini-2.5-flash-lite")
 PROVIDER = os.getenv("PROVIDER", "gemini").lower()  # openrouter | gemini
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
 OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "qwen/qwen3-coder:free")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com")
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai")
+
+# Shared HTTP connection pool (one client per provider, see lifecycle hooks below)
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "60"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP2_ENABLED = os.getenv("HTTP2", "true").lower() == "true"
+
+# Per-request budget for the upstream model call; work is also cancelled when the client disconnects
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "90"))
+DISCONNECT_POLL_INTERVAL = float(os.getenv("DISCONNECT_POLL_INTERVAL", "0.25"))
+
+# Untyped requests the local classifier is confident about get a single content structure
+CLASSIFIER_ENABLED = os.getenv("CLASSIFIER_ENABLED", "true").lower() == "true"
+CLASSIFIER_MIN_CONFIDENCE = float(os.getenv("CLASSIFIER_MIN_CONFIDENCE", "0.6"))
+
+# Static prompt sections as the system instruction (system), ahead of the request in one message (prefix),
+# or with the request in the middle (inline)
+PROMPT_LAYOUT = os.getenv("PROMPT_LAYOUT", "system").lower()
 
 
 # -----------------------------------------------------------------------------
@@ -34,6 +61,120 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# -----------------------------------------------------------------------------
+# HTTP clients
+# -----------------------------------------------------------------------------
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _http2_available() -> bool:
+    # HTTP/2 needs the optional `h2` package (pip install "httpx[http2]")
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _build_client(base_url: str) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=base_url,
+        timeout=HTTP_TIMEOUT,
+        http2=_http2_available(),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def get_client(provider: str) -> httpx.AsyncClient:
+    client = _clients.get(provider)
+    if client is None or client.is_closed:
+        raise HTTPException(status_code=503, detail=f"HTTP client for {provider} is not initialised")
+    return client
+
+
+def pool_stats(client: httpx.AsyncClient) -> Dict[str, Any]:
+    """Report connection pool occupancy (reads httpcore's pool, which httpx does not expose)."""
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []) or [])
+    idle = sum(1 for c in connections if c.is_idle())
+    return {
+        "http2": _http2_available(),
+        "max_connections": HTTP_MAX_CONNECTIONS,
+        "max_keepalive": HTTP_MAX_KEEPALIVE,
+        "connections": len(connections),
+        "active": len(connections) - idle,
+        "idle": idle,
+        "queued_requests": len(getattr(pool, "_requests", []) or []),
+    }
+
+
+# -----------------------------------------------------------------------------
+# Request lifecycle
+# -----------------------------------------------------------------------------
+_counters: Counter = Counter()
+
+
+async def run_until_disconnect(request: Request, work: Awaitable[Any], endpoint: str, stage: str = "model") -> Any:
+    """
+    Await work (an upstream model call) within REQUEST_DEADLINE while polling the client.
+    If the client goes away the work is cancelled, closing the upstream httpx request,
+    and nothing after it (JSON cleanup/parsing) runs.
+    """
+    task = asyncio.ensure_future(work)
+    deadline = time.monotonic() + REQUEST_DEADLINE
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                _counters[f"timeouts.{endpoint}.{stage}"] += 1
+                raise HTTPException(status_code=504, detail={"message": "Request deadline exceeded", "stage": stage})
+            done, _ = await asyncio.wait({task}, timeout=min(DISCONNECT_POLL_INTERVAL, remaining))
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                _counters[f"cancelled.{endpoint}.{stage}"] += 1
+                # 499: client closed request (never actually delivered)
+                raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+# Token usage per (endpoint, game type, provider, model), from the providers' usage blocks
+_usage: Dict[tuple, Counter] = {}
+
+
+def record_usage(labels: Optional[Dict[str, str]], provider: str, model: str, usage: Dict[str, Any]) -> None:
+    labels = labels or {}
+    key = (labels.get("endpoint", "unknown"), labels.get("game_type") or "auto", provider, model)
+    totals = _usage.setdefault(key, Counter())
+    totals["calls"] += 1
+    totals.update({name: int(count) for name, count in usage.items() if count})
+
+
+def server_timing(timings: Dict[str, float]) -> str:
+    """Stage timings (seconds) as a Server-Timing header value, same stage names as the backend"""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+@app.on_event("startup")
+async def open_http_clients():
+    _clients["gemini"] = _build_client(GEMINI_BASE_URL)
+    _clients["openrouter"] = _build_client(OPENROUTER_BASE_URL)
+
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    for client in _clients.values():
+        await client.aclose()
+    _clients.clear()
+
 # -----------------------------------------------------------------------------
 # Schemas
 # -----------------------------------------------------------------------------
@@ -142,8 +283,9 @@ PROMPT_REQUIRED_JSON = (
 
 PROMPT_TAIL_QUALITY_INTRO = "## CONTENT QUALITY RULES\n\n"
 
-PROMPT_USER_AND_ANALYSIS = (
-    "**User Request:** {user_request}\n\n"
+PROMPT_USER_REQUEST = "**User Request:** {user_request}\n\n"
+
+PROMPT_ANALYSIS = (
     "## ANALYSIS REQUIRED\n"
     "Analyze the user request to determine:\n"
     "- Primary learning objective and subject matter\n"
@@ -482,119 +624,227 @@ ANALYZER_PROMPT_TEMPLATE = (
     "Focus on growth mindset, resilience, and self-compassion. Avoid clinical diagnosis.\n"
     "Keep the tone warm, supportive, and empowering.\n\n"
     "Return ONLY this JSON object (no markdown, no extra text):\n"
-    "{\n  \"analysis\": \"[Therapeutic analysis based on game performance and responses, focusing on growth mindset and encouragement]\"\n}\n"
+    "{{\n  \"analysis\": \"[Therapeutic analysis based on game performance and responses, focusing on growth mindset and encouragement]\"\n}}\n"
+)
+
+
+ALL_GAME_TYPES = (
+    "quiz", "drag-drop", "memory-match", "sorting", "matching", "story-sequence",
+    "fill-blank", "card-flip", "word-puzzle", "puzzle-assembly", "anxiety-adventure",
 )
 
 
+def prompt_sections(user_prompt: str, game_type: Optional[str]) -> List[Tuple[str, str]]:
+    """
+    The generation prompt as (section name, text) in order; the prompt is their concatenation.
+    Without a game type every content structure is included so the model can choose;
+    with one, only that type's structure and difficulty guidance.
+    """
+    if game_type:
+        content = [("content_structures", "## CONTENT STRUCTURES BY GAME TYPE\n" + build_content_structure(game_type))]
+    else:
+        content = [
+            (f"content:{name}", f"### {name.upper()} CONTENT:\n" + build_content_structure(name))
+            for name in ALL_GAME_TYPES
+        ]
+    return [
+        ("intro", PROMPT_INTRO),
+        ("constant_parts", PROMPT_CONSTANT_PARTS),
+        ("user_request", PROMPT_USER_REQUEST.format(user_request=user_prompt)),
+        ("analysis", PROMPT_ANALYSIS),
+        ("game_type_selection", build_game_type_selection(game_type)),
+        ("required_json", PROMPT_REQUIRED_JSON),
+        *content,
+        ("quality_intro", PROMPT_TAIL_QUALITY_INTRO),
+        ("difficulty", build_difficulty_section(game_type)),
+        ("therapeutic_educational", PROMPT_TAIL_THER_EDU),
+        ("validation_output", PROMPT_TAIL_VALIDATION_OUTPUT),
+    ]
+
+
+def prompt_parts(user_prompt: str, game_type: Optional[str]) -> Tuple[str, str]:
+    """
+    The generation prompt as (static prefix, user request): every section but the request,
+    byte-for-byte the same for all requests of a game type, so provider prefix caches match it.
+    """
+    sections = prompt_sections(user_prompt, game_type)
+    prefix = "".join(text for name, text in sections if name != "user_request")
+    return prefix, dict(sections)["user_request"].strip()
+
+
+# Outside strings only runs of braces and quotes matter; inside, only the closing quote and escapes
+_STRUCTURE = re.compile(r'\{+|\}+|"')
+_STRING_TAIL = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+# What an object can start with; other spans ("{name}" in chatter) are not worth decoding
+_OBJECT_START = re.compile(r'\{\s*["}]')
+_decoder = json.JSONDecoder()
+
+
+def _decode_object(text: str, start: int, end: int) -> Optional[str]:
+    """text[start:end] if it is a JSON object"""
+    if not _OBJECT_START.match(text, start):
+        return None
+    # Decoding the slice keeps a failure's line/column bookkeeping within the span
+    span = text[start:end]
+    try:
+        value, _ = _decoder.raw_decode(span)
+    except (ValueError, RecursionError):
+        # RecursionError: nested deeper than the decoder can follow
+        return None
+    return span if isinstance(value, dict) else None
+
+
+def find_json_object(text: str) -> Optional[str]:
+    """
+    The first complete top-level JSON object in text, or None.
+    One left-to-right scan that skips over strings (and the escapes in them) pairs up
+    the braces; only balanced spans that are not inside another balanced span are
+    handed to raw_decode, so every character is decoded at most once. Stray braces
+    that never close do not hide the objects after them, but the fragments of an
+    object cut off by the token limit are not returned as the object.
+    """
+    pos = text.find("{")
+    if pos == -1:
+        return None
+    # The common case, an object with at most text around it, needs no scan
+    try:
+        value, end = _decoder.raw_decode(text, pos)
+        if isinstance(value, dict):
+            return text[pos:end]
+    except (ValueError, RecursionError):
+        pass
+
+    opened: List[int] = []               # braces not closed yet
+    objects: List[int] = []              # those of them that start like an object
+    closed: List[Tuple[int, int]] = []   # balanced spans inside braces not closed yet
+    while True:
+        match = _STRUCTURE.search(text, pos)
+        if match is None:
+            break
+        run, pos = match.group(), match.end()
+        if run == '"':
+            if not opened:
+                continue
+            match = _STRING_TAIL.match(text, pos)
+            if match is None:
+                break
+            pos = match.end()
+        elif run[0] == "{":
+            opened.extend(range(match.start(), pos))
+            if _OBJECT_START.match(text, pos - 1):
+                objects.append(pos - 1)
+        else:
+            for end in range(match.start() + 1, match.start() + min(len(run), len(opened)) + 1):
+                start = opened.pop()
+                if objects and objects[-1] == start:
+                    objects.pop()
+                while closed and closed[-1][0] > start:
+                    closed.pop()
+                if opened:
+                    closed.append((start, end))
+                    continue
+                found = _decode_object(text, start, end)
+                if found is not None:
+                    return found
+
+    # Braces left open that start an object mean the output was cut off: what
+    # closed inside them is a fragment. Other open braces are chatter, and the
+    # spans inside them are top level after all
+    if objects:
+        return None
+    for start, end in closed:
+        found = _decode_object(text, start, end)
+        if found is not None:
+            return found
+    return None
+
+
 def strip_code_fences(text: str) -> str:
     """
     Extract JSON from AI responses that might contain extra text or markdown.
+    Linear in the length of the response (see find_json_object).
     """
-    import re
-    
     t = text.strip()
-    
-    # First, try to extract markdown code blocks
+
+    found = find_json_object(t)
+    if found is not None:
+        return found
+
+    # Nothing decodes: hand back the fenced body (or the text) for json.loads to report on
     if t.startswith("```json") and t.endswith("```"):
         return t[7:-3].strip()
     if t.startswith("```") and t.endswith("```"):
         return t[3:-3].strip()
-    
-    # Look for JSON objects in the text using regex
-    # This will find content between { and } including nested objects
-    json_pattern = r'\{(?:[^{}]*|\{[^{}]*\})*\}'
-    matches = re.findall(json_pattern, t, re.DOTALL)
-    
-    if matches:
-        # Try to find the largest/most complete JSON object
-        for match in sorted(matches, key=len, reverse=True):
-            try:
-                # Test if it's valid JSON
-                json.loads(match)
-                return match
-            except:
-                continue
-    
-    # If no valid JSON found in brackets, try to find JSON starting with {
-    if '{' in t:
-        start_idx = t.find('{')
-        # Find the end by counting braces
-        brace_count = 0
-        end_idx = start_idx
-        for i, char in enumerate(t[start_idx:], start_idx):
-            if char == '{':
-                brace_count += 1
-            elif char == '}':
-                brace_count -= 1
-                if brace_count == 0:
-                    end_idx = i
-                    break
-        
-        potential_json = t[start_idx:end_idx + 1]
-        try:
-            # Test if it's valid JSON
-            json.loads(potential_json)
-            return potential_json
-        except:
-            pass
-    
-    # If all else fails, return the original text
     return t
 
 
-async def call_openrouter(prompt: str) -> str:
+async def call_openrouter(prompt: str, labels: Optional[Dict[str, str]] = None, system: Optional[str] = None) -> str:
     headers = {
         "Authorization": f"Bearer {OPENROUTER_API_KEY}",
         "Content-Type": "application/json",
     }
     body = {
         "model": OPENROUTER_MODEL,
-        "messages": [
+        "messages": ([{"role": "system", "content": system}] if system else []) + [
             {"role": "user", "content": prompt}
         ],
         "temperature": 0.2,
     }
-    async with httpx.AsyncClient(timeout=60) as client:
-        r = await client.post("https://openrouter.ai/api/v1/chat/completions", headers=headers, json=body)
-        if r.status_code != 200:
-            raise HTTPException(status_code=502, detail=f"OpenRouter error: {r.text[:500]}")
-        data = r.json()
-        try:
-            content = data["choices"][0]["message"]["content"]
-        except Exception:
-            raise HTTPException(status_code=502, detail=f"Unexpected OpenRouter response: {data}")
-        return content
-
-
-async def call_gemini(prompt: str) -> str:
+    r = await get_client("openrouter").post("/api/v1/chat/completions", headers=headers, json=body)
+    if r.status_code != 200:
+        raise HTTPException(status_code=502, detail=f"OpenRouter error: {r.text[:500]}")
+    data = r.json()
+    try:
+        content = data["choices"][0]["message"]["content"]
+    except Exception:
+        raise HTTPException(status_code=502, detail=f"Unexpected OpenRouter response: {data}")
+    usage = data.get("usage") or {}
+    record_usage(labels, "openrouter", OPENROUTER_MODEL, {
+        "input_tokens": usage.get("prompt_tokens"),
+        "output_tokens": usage.get("completion_tokens"),
+        "cached_tokens": (usage.get("prompt_tokens_details") or {}).get("cached_tokens"),
+        "total_tokens": usage.get("total_tokens"),
+    })
+    return content
+
+
+async def call_gemini(prompt: str, labels: Optional[Dict[str, str]] = None, system: Optional[str] = None) -> str:
     # Using Google Generative Language API v1beta REST
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent?key={GEMINI_API_KEY}"
+    url = f"/v1beta/models/{GEMINI_MODEL}:generateContent"
     payload = {
         "contents": [{"role": "user", "parts": [{"text": prompt}]}]
     }
-    async with httpx.AsyncClient(timeout=60) as client:
-        r = await client.post(url, json=payload)
-        if r.status_code != 200:
-            raise HTTPException(status_code=502, detail=f"Gemini error: {r.text[:500]}")
-        data = r.json()
-        try:
-            text = data["candidates"][0]["content"]["parts"][0]["text"]
-        except Exception:
-            raise HTTPException(status_code=502, detail=f"Unexpected Gemini response: {data}")
-        return text
-
-
-async def call_model(prompt: str) -> str:
+    if system:
+        payload["systemInstruction"] = {"parts": [{"text": system}]}
+    r = await get_client("gemini").post(url, params={"key": GEMINI_API_KEY}, json=payload)
+    if r.status_code != 200:
+        raise HTTPException(status_code=502, detail=f"Gemini error: {r.text[:500]}")
+    data = r.json()
+    try:
+        text = data["candidates"][0]["content"]["parts"][0]["text"]
+    except Exception:
+        raise HTTPException(status_code=502, detail=f"Unexpected Gemini response: {data}")
+    usage = data.get("usageMetadata") or {}
+    record_usage(labels, "gemini", GEMINI_MODEL, {
+        "input_tokens": usage.get("promptTokenCount"),
+        "output_tokens": usage.get("candidatesTokenCount"),
+        "cached_tokens": usage.get("cachedContentTokenCount"),
+        "total_tokens": usage.get("totalTokenCount"),
+    })
+    return text
+
+
+async def call_model(prompt: str, labels: Optional[Dict[str, str]] = None, system: Optional[str] = None) -> str:
     if PROVIDER == "gemini":
         if not GEMINI_API_KEY:
             raise HTTPException(status_code=500, detail="Missing GOOGLE_API_KEY for Gemini provider")
-        return await call_gemini(prompt)
+        return await call_gemini(prompt, labels, system)
     # default: openrouter
     if OPENROUTER_API_KEY:
-        return await call_openrouter(prompt)
+        return await call_openrouter(prompt, labels, system)
     # Fallback to Gemini if available
     if GEMINI_API_KEY:
-        return await call_gemini(prompt)
+        return await call_gemini(prompt, labels, system)
     raise HTTPException(status_code=500, detail="Missing OPENROUTER_API_KEY and GOOGLE_API_KEY; set one or set PROVIDER=gemini")
 
 
@@ -606,63 +856,60 @@ async def health():
     return {"ok": True}
 
 
+@app.get("/health/pool")
+async def health_pool():
+    return {provider: pool_stats(client) for provider, client in _clients.items()}
+
+
+@app.get("/stats")
+async def stats():
+    """Counters for cancelled (client disconnected) and timed-out requests"""
+    return dict(_counters)
+
+
+@app.get("/stats/usage")
+async def usage_stats():
+    """Token usage per endpoint, game type, provider and model since startup"""
+    rows = [
+        {"endpoint": endpoint, "game_type": game_type, "provider": provider, "model": model, **dict(totals)}
+        for (endpoint, game_type, provider, model), totals in _usage.items()
+    ]
+    return {"rows": sorted(rows, key=lambda row: row.get("total_tokens", 0), reverse=True)}
+
+
 @app.post("/api/games/generate")
-async def generate_game(req: GenerateRequest):
+async def generate_game(req: GenerateRequest, request: Request, response: Response):
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
     user_prompt = build_user_prompt(req)
 
-    # If no gameType, include all schemas and generic selection; else, only the selected type's schema
-    if not req.gameType:
-        # Full original prompt: all schemas, so AI can choose
-        full_prompt = (
-            PROMPT_INTRO
-            + PROMPT_CONSTANT_PARTS
-            + PROMPT_USER_AND_ANALYSIS.format(user_request=user_prompt)
-            + build_game_type_selection(None)
-            + PROMPT_REQUIRED_JSON
-            + "### QUIZ CONTENT:\n"
-            + build_content_structure('quiz')
-            + "### DRAG-DROP CONTENT:\n"
-            + build_content_structure('drag-drop')
-            + "### MEMORY-MATCH CONTENT:\n"
-            + build_content_structure('memory-match')
-            + "### SORTING CONTENT:\n"
-            + build_content_structure('sorting')
-            + "### MATCHING CONTENT:\n"
-            + build_content_structure('matching')
-            + "### STORY-SEQUENCE CONTENT:\n"
-            + build_content_structure('story-sequence')
-            + "### FILL-BLANK CONTENT:\n"
-            + build_content_structure('fill-blank')
-            + "### CARD-FLIP CONTENT:\n"
-            + build_content_structure('card-flip')
-            + "### WORD-PUZZLE CONTENT:\n"
-            + build_content_structure('word-puzzle')
-            + "### PUZZLE-ASSEMBLY CONTENT:\n"
-            + build_content_structure('puzzle-assembly')
-            + "### ANXIETY-ADVENTURE CONTENT:\n"
-            + build_content_structure('anxiety-adventure')
-            + PROMPT_TAIL_QUALITY_INTRO
-            + build_difficulty_section(None)
-            + PROMPT_TAIL_THER_EDU
-            + PROMPT_TAIL_VALIDATION_OUTPUT
-        )
+    # Without a gameType, a confident local classification picks one
+    game_type = req.gameType
+    if not game_type and CLASSIFIER_ENABLED:
+        predicted, confidence = classify_game_type(user_prompt)
+        if predicted and confidence >= CLASSIFIER_MIN_CONFIDENCE:
+            game_type = predicted
+            _counters["classifier.confident"] += 1
+        else:
+            _counters["classifier.fallback"] += 1
+
+    system = None
+    if PROMPT_LAYOUT == "inline":
+        full_prompt = "".join(text for _, text in prompt_sections(user_prompt, game_type))
     else:
-        # Only the selected type's schema
-        full_prompt = (
-            PROMPT_INTRO
-            + PROMPT_CONSTANT_PARTS
-            + PROMPT_USER_AND_ANALYSIS.format(user_request=user_prompt)
-            + build_game_type_selection(req.gameType)
-            + PROMPT_REQUIRED_JSON
-            + "## CONTENT STRUCTURES BY GAME TYPE\n"
-            + build_content_structure(req.gameType)
-            + PROMPT_TAIL_QUALITY_INTRO
-            + build_difficulty_section(req.gameType)
-            + PROMPT_TAIL_THER_EDU
-            + PROMPT_TAIL_VALIDATION_OUTPUT
-        )
+        prefix, user_request = prompt_parts(user_prompt, game_type)
+        if PROMPT_LAYOUT == "system":
+            system, full_prompt = prefix, user_request
+        else:
+            full_prompt = prefix + user_request
 
-    raw = await call_model(full_prompt)
+    timings["prompt_builder"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    raw = await run_until_disconnect(request, call_model(full_prompt, {"endpoint": "generate", "game_type": game_type}, system), "generate")
+    timings["llm"] = time.perf_counter() - started
+
+    started = time.perf_counter()
     cleaned = strip_code_fences(raw)
 
     try:
@@ -684,16 +931,21 @@ async def generate_game(req: GenerateRequest):
     if req.gameType and isinstance(game_json, dict):
         game_json['type'] = req.gameType
 
+    timings["response_processor"] = time.perf_counter() - started
+    response.headers["Server-Timing"] = server_timing(timings)
     return game_json
 
 
 @app.post("/api/analyze/game")
-async def analyze_game_performance(request: Request):
+async def analyze_game_performance(request: Request, response: Response):
     """
     Analyze player performance in any game type with therapeutic insights.
     Handles multiple input formats for flexibility.
     """
     
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+
     # Parse the request body
     body_json: Any = await request.json()
     
@@ -761,7 +1013,13 @@ async def analyze_game_performance(request: Request):
         accuracy=accuracy
     )
 
-    raw = await call_model(prompt)
+    timings["prompt_builder"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    raw = await run_until_disconnect(request, call_model(prompt, {"endpoint": "analyze", "game_type": game_type}), "analyze")
+    timings["llm"] = time.perf_counter() - started
+
+    started = time.perf_counter()
     cleaned = strip_code_fences(raw)
 
     try:
@@ -773,4 +1031,6 @@ async def analyze_game_performance(request: Request):
             "raw_excerpt": cleaned[:500]
         })
 
+    timings["response_processor"] = time.perf_counter() - started
+    response.headers["Server-Timing"] = server_timing(timings)
     return analysis_json
\ No newline at end of file